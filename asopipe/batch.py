@@ -0,0 +1,196 @@
+"""
+여러 전사체를 한 번에 처리하는 배치 실행 모듈입니다.
+
+run_ASOdesign 을 전사체마다 부르면 refFlat / dbSNP / MAF reader 와 워커 풀을 매번 새로 연다.
+run_batch 는 ASOcontext 하나(refFlat, dbSNP 핸들, 워커마다 어셈블리별 MAF reader 를 보관하는 풀)를
+모든 전사체가 함께 쓰고, 큰 전사체부터 처리하며 끝나는 대로 결과 파일을 쓴다.
+
+manifest (텍스트, 한 줄에 전사체 하나, 공백 / 탭 / 쉼표 구분, '#' 뒤는 주석):
+  NM_133379            → k = k_min..k_max (기본값)
+  NM_002415  17        → k = 17
+  NR_000003  18  20    → k = 18..20
+결과 파일 이름에 전사체가 들어가므로 모두 output_path 한 곳에 쓰고,
+<output_path>/batch_status.tsv 에 전사체가 끝날 때마다 (transID, status, k, tiles, seconds, error) 를 한 줄씩 남긴다.
+"""
+import os
+import re
+import time
+import argparse
+import traceback
+import concurrent.futures
+import multiprocessing as mp
+
+from asopipe.main import ASOcontext, check_k_range, design_transcript
+from asopipe.utils.dataset import DATASET_FORMATS
+
+
+def load_manifest(path, k_min=17, k_max=17):
+    """manifest 파일 → [(transID, k_min, k_max), ...] (파일 순서, 같은 전사체가 다시 나오면 뒤의 것이 덮어쓴다)."""
+    entries = {}
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            fields = [x for x in re.split(r'[\s,]+', line.split('#', 1)[0]) if x]
+            if not fields:
+                continue
+            if len(fields) > 3:
+                raise ValueError(f"{path}:{n}: expected 'transID [k_min [k_max]]' (Now: {line.strip()})")
+            lo = int(fields[1]) if len(fields) > 1 else k_min
+            hi = int(fields[2]) if len(fields) > 2 else (lo if len(fields) > 1 else k_max)
+            check_k_range(lo, hi)
+            entries[fields[0]] = (fields[0], lo, hi)
+    return list(entries.values())
+
+
+def _transcript_size(context, transid, k_min, k_max):
+    """전사체 하나의 전체 타일 수 (모든 k 합). refFlat 에 없으면 None."""
+    try:
+        transInfo = [t for t in context.refFlat[transid] if len(t['chrom'].split('_')) == 1][0]
+    except (KeyError, IndexError):
+        return None
+    length = transInfo['txnEnd'] - transInfo['txnSta']
+    return sum(max(0, length - k + 1) for k in range(k_min, k_max + 1))
+
+
+def run_batch(manifest,
+              refFlat_path="/Users/dowonkim/Dropbox/data/UCSC/hg38/refFlat/refFlat_200817.txt",
+              maf_dir='/Users/dowonkim/Dropbox/data/offtarget_test/maf',
+              dbsnp_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf",
+              dbsnp_index_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf.csi",
+              query_assembly=["mm39"],
+              ref_assembly="hg38",
+              k_min=17, k_max=17,
+              chunk_division=5, max_workers=1, transcript_workers=1, wobble=0, gapmer_filtered=True,
+              output_path=None, maf_backend="maf", snp_index_dir=None, snp_mode="records",
+              stream=False, stream_format="csv", stream_chunk_size=20000, output_format="csv",
+              lazy=False, filters=None, features=None, keep_results=False, locus_cache_dir=None,
+              checkpoint_dir=None):
+    """
+    manifest (파일 경로 또는 [(transID, k_min, k_max) | transID, ...]) 의 전사체들을 공유 컨텍스트 하나로 처리한다.
+    - 전사체는 타일 수(전사체 길이 × k 개수)가 큰 것부터 제출한다 (긴 전사체가 마지막에 혼자 도는 꼬리를 줄인다).
+    - transcript_workers > 1 이면 그만큼의 전사체를 스레드로 겹쳐 돌리고, 타일 작업은 모두 같은 워커 풀(max_workers)에 들어간다.
+    - 결과는 전사체마다 끝나는 즉시 output_path 에 쓴다 (to_csv / output_format / stream 은 run_ASOdesign 과 같다).
+    반환: {transID: {"status": "ok" | "error", "k": (k_min, k_max), "tiles": n, "seconds": t, "error": msg, "result": ...}}
+    ("result" 는 keep_results=True 일 때만 — 기본은 메모리에 쌓지 않는다)
+    checkpoint_dir 를 주면 전사체마다 <checkpoint_dir>/<transID>/ 에 조각을 남겨, 실패한 배치를 다시 돌리면 남은 조각만 계산한다
+    (stream=True / lazy=True 와는 함께 쓸 수 없다).
+    locus_cache_dir 를 주면 isoform 처럼 같은 게놈 구간을 타일링하는 전사체들이 MAF 결과를 블록 단위로 공유한다 (LocusCache).
+    """
+    t0 = time.time()
+    if checkpoint_dir is not None and lazy:
+        # 전사체마다 같은 에러로 끝나지 않도록 시작 전에 거른다 (design_transcript 와 같은 조건)
+        raise ValueError("checkpoint_dir is not supported with lazy=True (lazy runs keep no per-chunk results)")
+    if checkpoint_dir is not None and stream:
+        raise ValueError("checkpoint_dir is not supported with stream=True (stream runs keep no per-chunk results)")
+    mp.set_start_method("spawn", force=True)   # macOS/Linux 안전
+    if isinstance(manifest, (str, os.PathLike)):
+        manifest = load_manifest(manifest, k_min=k_min, k_max=k_max)
+    else:
+        manifest = [(m, k_min, k_max) if isinstance(m, str) else tuple(m) for m in manifest]
+        for _, lo, hi in manifest:
+            check_k_range(lo, hi)
+    if output_path is None:
+        output_path = os.path.dirname(os.path.realpath(__file__))
+    os.makedirs(output_path, exist_ok=True)
+
+    design_kwargs = dict(refFlat_path=refFlat_path, maf_dir=maf_dir,
+                         dbsnp_path=dbsnp_path, dbsnp_index_path=dbsnp_index_path,
+                         query_assembly=query_assembly, ref_assembly=ref_assembly,
+                         maf_backend=maf_backend, snp_index_dir=snp_index_dir, snp_mode=snp_mode,
+                         features=features)
+    process_kwargs = dict(chunk_division=chunk_division, wobble=wobble, to_df=False,
+                          gapmer_filtered=gapmer_filtered, to_csv=True, output_path=output_path,
+                          stream=stream, stream_format=stream_format, stream_chunk_size=stream_chunk_size,
+                          output_format=output_format, filters=filters)
+    summary = {}
+    status_path = os.path.join(output_path, "batch_status.tsv")
+    with open(status_path, "w") as f:
+        f.write("transID\tstatus\tk\ttiles\tseconds\terror\n")
+
+    def record(transid, lo, hi, size, status, seconds, error="", result=None):
+        summary[transid] = {"status": status, "k": (lo, hi), "tiles": size, "seconds": seconds, "error": error}
+        if keep_results and result is not None:
+            summary[transid]["result"] = result
+        with open(status_path, "a") as f:
+            f.write(f"{transid}\t{status}\t{lo}-{hi}\t{size}\t{seconds:.1f}\t{error}\n")
+        print(f"[run_batch] {len(summary)}/{len(manifest)} {transid} ({status}, {seconds:.1f} sec)")
+
+    with ASOcontext(refFlat_path=refFlat_path, maf_dir=maf_dir,
+                    dbsnp_path=dbsnp_path, dbsnp_index_path=dbsnp_index_path,
+                    ref_assembly=ref_assembly, maf_backend=maf_backend,
+                    snp_index_dir=snp_index_dir, snp_mode=snp_mode,
+                    max_workers=max_workers, locus_cache_dir=locus_cache_dir) as context:
+        jobs = []
+        for transid, lo, hi in manifest:
+            size = _transcript_size(context, transid, lo, hi)
+            if size is None:
+                record(transid, lo, hi, 0, "error", 0.0, error="transcript not found in refFlat")
+                continue
+            jobs.append((size, transid, lo, hi))
+        jobs.sort(key=lambda job: -job[0])   # 큰 전사체부터 (같은 크기는 manifest 순서)
+
+        def run_one(job):
+            size, transid, lo, hi = job
+            t1 = time.time()
+            result = design_transcript(transid, list(range(lo, hi + 1)), context=context,
+                                       design_kwargs=design_kwargs, max_workers=max_workers,
+                                       lazy=lazy, checkpoint_dir=checkpoint_dir, **process_kwargs)
+            return result, time.time() - t1
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, transcript_workers)) as tex:
+            futures = {tex.submit(run_one, job): job for job in jobs}
+            for fut in concurrent.futures.as_completed(futures):
+                size, transid, lo, hi = futures[fut]
+                try:
+                    result, seconds = fut.result()
+                except Exception as e:
+                    print(traceback.format_exc())
+                    record(transid, lo, hi, size, "error", 0.0, error=repr(e))
+                    continue
+                record(transid, lo, hi, size, "ok", seconds, result=result)
+    n_err = sum(s["status"] != "ok" for s in summary.values())
+    print(f"[run_batch] {len(summary) - n_err} ok / {n_err} error, Elapsed: {time.time() - t0} sec")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run ASOdesign for many transcripts with one shared refFlat / dbSNP / MAF worker pool.")
+    parser.add_argument('--manifest', required=True, help="text file, one 'transID [k_min [k_max]]' per line")
+    parser.add_argument('--refflat', required=True, help="refFlat text file or build_refflat_store() directory")
+    parser.add_argument('--maf-dir', required=True, help="MAF (or maf_track) directory")
+    parser.add_argument('--dbsnp', default=None, help="dbSNP BCF/VCF")
+    parser.add_argument('--dbsnp-index', default=None, help="dbSNP .csi index (default: <dbsnp>.csi)")
+    parser.add_argument('--snp-index-dir', default=None, help="build_snp_index() directory (used instead of the VCF)")
+    parser.add_argument('--snp-mode', default='records', choices=('records', 'count', 'bool'))
+    parser.add_argument('--query-assembly', nargs='+', default=['mm39'])
+    parser.add_argument('--ref-assembly', default='hg38')
+    parser.add_argument('--k-min', type=int, default=17, help="default k_min for manifest lines without k")
+    parser.add_argument('--k-max', type=int, default=17, help="default k_max for manifest lines without k")
+    parser.add_argument('--max-workers', type=int, default=1, help="worker processes shared by all transcripts")
+    parser.add_argument('--transcript-workers', type=int, default=1, help="transcripts processed concurrently")
+    parser.add_argument('--wobble', type=int, default=0)
+    parser.add_argument('--no-gapmer-filter', action='store_true', help="do not write the gapmer-filtered output")
+    parser.add_argument('--output', default='.', help="output directory")
+    parser.add_argument('--output-format', default='csv', choices=('csv',) + DATASET_FORMATS)
+    parser.add_argument('--maf-backend', default='maf', choices=('maf', 'track'))
+    parser.add_argument('--lazy', action='store_true', help="apply cheap filters before MAF / cofold")
+    parser.add_argument('--features', nargs='+', default=None, help="columns / groups to compute (default: all)")
+    parser.add_argument('--checkpoint-dir', default=None, help="directory for resumable per-transcript chunk checkpoints")
+    parser.add_argument('--locus-cache', default=None, help="directory of the genomic-locus MAF cache shared across runs / isoforms")
+    args = parser.parse_args()
+    dbsnp_index = args.dbsnp_index or (f'{args.dbsnp}.csi' if args.dbsnp else None)
+    summary = run_batch(args.manifest, refFlat_path=args.refflat, maf_dir=args.maf_dir,
+                        dbsnp_path=args.dbsnp, dbsnp_index_path=dbsnp_index,
+                        query_assembly=args.query_assembly, ref_assembly=args.ref_assembly,
+                        k_min=args.k_min, k_max=args.k_max,
+                        max_workers=args.max_workers, transcript_workers=args.transcript_workers,
+                        wobble=args.wobble, gapmer_filtered=not args.no_gapmer_filter,
+                        output_path=args.output, maf_backend=args.maf_backend,
+                        snp_index_dir=args.snp_index_dir, snp_mode=args.snp_mode,
+                        output_format=args.output_format, lazy=args.lazy, features=args.features,
+                        locus_cache_dir=args.locus_cache, checkpoint_dir=args.checkpoint_dir)
+    if any(s["status"] != "ok" for s in summary.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,24 +4,33 @@
 import multiprocessing as mp
 
 import concurrent.futures
+import contextlib
 import numpy as np
 import pandas as pd
 from collections import defaultdict
 
 import os
+import threading
 import time
 import traceback
 #import editdistance
 #from functools import partial
-from cyvcf2 import VCF   # pip install cyvcf2
-
-from asopipe.utils.basic import loadBlatOutput
-from asopipe.utils.coverage import average_edit_distance
-from asopipe.utils.csv import save_csv_std, save_csv_pyarrow, save_csv_polars
-from asopipe.utils.align.maf_th import check_wobble
-from asopipe.utils.align.maf_th import MultipleAlignmentReader
-from asopipe.utils.rna import RNAcofold2, containCommonSNP, containGquad2, countCpG, GCcontent
-from asopipe.pipeline.gapmer import gapmer
+
+from asopipe.utils.refflat import loadRefFlat
+from asopipe.utils.coverage import average_edit_distance, average_edit_distance_batch
+from asopipe.utils.csv import save_csv_std, save_csv_pyarrow, save_csv_polars, StreamingTableWriter
+from asopipe.utils.columns import ResultColumns, select_features, FEATURE_COLUMNS, ALL_FEATURES, LOCINFO_COLUMNS
+from asopipe.utils.dataset import write_result_dataset
+from asopipe.utils.locus_cache import LocusCache, maf_fingerprint
+from asopipe.utils.checkpoint import RunCheckpoint, tile_key, path_fingerprint
+from asopipe.utils.align.maf_th import check_wobble, check_wobble_batch, encode_seqs
+from asopipe.utils.align.maf_th import MultipleAlignmentReader, pack_results, unpack_results
+from asopipe.utils.rna import RNAcofold2, RNAcofold_batch, CommonSNPSpan, containCommonSNP, containGquad2, countCpG, GCcontent, sequence_features
+from asopipe.utils.snp_index import SNPIndex
+from asopipe.utils.region import RegionAnnotator, type_flag, region_string
+from asopipe.utils.tiles import TileSet
+from asopipe.pipeline.gapmer import gapmer, gapmer_mask
+from asopipe.pipeline.filters import TileSubset, apply_filters, gap_cpg_filter
 from jklib.genome import locus, getRegionType
 #from jklib.bioDB import CommonSNP
 
@@ -29,19 +38,32 @@ from jklib.genome import locus, getRegionType
 # ──────────────────────────────────────────────────────────────
 # 1) 워커 초기화 & 쿼리 함수  ───────────────────────────────────
 # ──────────────────────────────────────────────────────────────
-_reader = None           # 워커 프로세스 안에서만 쓰는 전역 객체
+_reader = None           # 워커 프로세스 안에서만 쓰는 전역 객체 (단일 어셈블리 풀)
+_readers = {}            # 어셈블리 → MultipleAlignmentReader (여러 어셈블리 풀, 처음 쓸 때 생성)
+_reader_args = None      # (maf_dir, ref_assembly, maf_backend)
 
-def _init_worker(maf_dir, ref_assembly, query_assembly):
+def _init_worker(maf_dir, ref_assembly, query_assembly=None, maf_backend="maf"):
     """
     각 워커가 시작될 때 한 번만 실행.
-    무거운 MultipleAlignmentReader 를 전역으로 만들어 둔다.
+    query_assembly 가 주어지면 무거운 MultipleAlignmentReader 를 전역으로 만들어 둔다.
+    None 이면 작업이 어셈블리를 지정하고, 그 어셈블리의 reader 를 처음 쓸 때 만든다 (_get_reader).
+    maf_backend='track' 이면 bx 인덱스 대신 memory-mapped 트랙을 연다.
     """
-    global _reader
-    _reader = MultipleAlignmentReader(
-        ref_assembly=ref_assembly,
-        query_assembly=query_assembly,
-        maf_dir=maf_dir,
-    )
+    global _reader, _reader_args
+    _reader_args = (maf_dir, ref_assembly, maf_backend)
+    _readers.clear()
+    _reader = _get_reader(query_assembly) if query_assembly is not None else None
+
+def _get_reader(asm):
+    if asm not in _readers:
+        maf_dir, ref_assembly, maf_backend = _reader_args
+        _readers[asm] = MultipleAlignmentReader(
+            ref_assembly=ref_assembly,
+            query_assembly=asm,
+            maf_dir=maf_dir,
+            backend=maf_backend,
+        )
+    return _readers[asm]
 
 def _query_region(region: str):
     """
@@ -50,26 +72,181 @@ def _query_region(region: str):
     """
     return _reader.query(region, verbose=False)
 
+def _pack_keys(asm):
+    # verbose=False 결과의 키 = (ref 어셈블리, query 어셈블리)
+    return (_reader_args[1], asm)
+
+def _query_span(task):
+    """
+    워커가 수행할 span 단위 작업.
+    task = (asm, chrom, start, end, tile_length) 구간의 블록을 한 번만 읽어서 타일별 결과를
+    pack_results() 로 묶어 반환 (부모에서 unpack_results() 로 푼다).
+    """
+    asm, chrom, start, end, tile_length = task
+    return pack_results(_get_reader(asm).query_span(chrom, start, end, tile_length, verbose=False), _pack_keys(asm))
+
+def _query_span_multi(task):
+    """
+    워커가 수행할 다중 tile_length span 작업.
+    task = (asm, chrom, start, end, tile_lengths, n_tiles) 구간의 블록을 한 번만 읽어서
+    {tile_length: pack_results() 로 묶은 타일별 결과} 를 반환. n_tiles 는 길이별로 이 작업이 맡는 (앞쪽) 타일 수.
+    """
+    asm, chrom, start, end, tile_lengths, n_tiles = task
+    result = _get_reader(asm).query_span_multi(chrom, start, end, tile_lengths, verbose=False)
+    return {L: pack_results(result[L][:n], _pack_keys(asm)) for L, n in zip(tile_lengths, n_tiles)}
+
+_snp_handles = {}        # snp_args → 워커 전용 VCF 핸들 / SNPIndex
+
+def _get_snp(snp_args):
+    if snp_args not in _snp_handles:
+        _snp_handles[snp_args] = _open_snp(*snp_args)
+    return _snp_handles[snp_args]
+
+def _locinfo_chunk(task):
+    """
+    워커가 수행할 feature 작업.
+    task = (transInfo, tiles, snp_args, cofold_map, snp_span, feature_map, features) : tiles (TileSet.subset 으로 자른 구간)
+    전체의 getlocInfo 결과를 컬럼(ResultColumns)으로 반환.
+    cofold_map / snp_span / feature_map 은 부모가 이 구간 몫만 잘라 보낸 표이고, None 이면 워커가 계산한다.
+    VCF 핸들은 features 에 CommonSNP 가 있고 snp_span 을 받지 못했을 때만 (워커마다 따로) 연다.
+    """
+    transInfo, tiles, snp_args, cofold_map, snp_span, feature_map, features = task
+    cSNP = _get_snp(snp_args) if "CommonSNP" in features and snp_span is None else None
+    aso = ASOdesign._feature_view(transInfo, cSNP, features)
+    return ResultColumns.from_records(aso._locinfo_range(tiles, 0, len(tiles), cofold_map=cofold_map,
+                                                         snp_span=snp_span, feature_map=feature_map))
+
+def _n_batches(n_tiles, max_workers, max_batch=50000):
+    """
+    타일 n_tiles 개를 나눌 작업 수. 워커마다 몇 개씩 돌아가도록 (부하 분산) 하되,
+    작업 하나가 max_batch 타일을 넘지 않게 (결과 배열 크기 제한) 한다.
+    """
+    return max(1, min(n_tiles, max(4 * max_workers, -(-n_tiles // max_batch))))
+
+def _new_pool(max_workers, maf_dir, ref_assembly, maf_backend="maf"):
+    """모든 어셈블리를 처리하는 워커 풀 (작업이 어셈블리를 지정)."""
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(maf_dir, ref_assembly, None, maf_backend),
+    )
+
+def _open_snp(dbsnp_path, dbsnp_index_path, snp_index_dir=None, snp_mode="records"):
+    if snp_index_dir is not None:
+        return SNPIndex(snp_index_dir, mode=snp_mode)
+    if snp_mode != "records":
+        raise ValueError(f"snp_mode={snp_mode} requires snp_index_dir")
+    from cyvcf2 import VCF   # pip install cyvcf2 (CommonSNP 컬럼을 쓸 때만 필요)
+    cSNP = VCF(dbsnp_path)
+    cSNP.set_index(index_path=dbsnp_index_path)  # .csi 인덱스 자동 사용
+    return cSNP
+
+# ──────────────────────────────────────────────────────────────
+# 2) 공유 자원 (여러 k / 전사체) ────────────────────────────────
+# ──────────────────────────────────────────────────────────────
+class ASOcontext:
+    """
+    여러 tile_length (k) 의 ASOdesign 이 함께 쓰는 자원.
+    refFlat, dbSNP 핸들, 전사체 서열을 한 번만 읽고, 워커 풀 하나(워커마다 어셈블리별 MAF reader 를 lazy 하게 보관)를 살려 둔다.
+    with 문 또는 close() 로 워커 풀을 정리한다.
+    여러 전사체를 스레드로 함께 돌릴 때(batch.run_batch) 부모의 dbSNP / 2bit 읽기는 lock 으로 한 번에 하나씩 한다.
+    locus_cache_dir 가 주어지면 MAF 타일 결과를 게놈 좌표 블록 단위로 디스크에 저장해 겹치는 전사체가 다시 쓴다 (LocusCache).
+    """
+    def __init__(self,
+                 refFlat_path="/Users/dowonkim/Dropbox/data/UCSC/hg38/refFlat/refFlat_200817.txt",
+                 maf_dir='/Users/dowonkim/Dropbox/data/offtarget_test/maf',
+                 dbsnp_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf",
+                 dbsnp_index_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf.csi",
+                 ref_assembly="hg38",
+                 maf_backend="maf",
+                 snp_index_dir=None,
+                 snp_mode="records",
+                 max_workers=1,
+                 locus_cache_dir=None):
+        self.refFlat      = loadRefFlat(refFlat_path, by='transID')
+        self.snp_args     = (dbsnp_path, dbsnp_index_path, snp_index_dir, snp_mode)
+        self._cSNP        = None
+        self.maf_dir      = maf_dir
+        self.ref_asm      = ref_assembly
+        self.maf_backend  = maf_backend
+        self.max_workers  = max_workers
+        self._executor    = None
+        self._seqs        = {}
+        self.lock         = threading.RLock()
+        self.locus_cache  = LocusCache(locus_cache_dir, maf_dir, ref_assembly, maf_backend) if locus_cache_dir else None
+
+    @property
+    def cSNP(self):
+        """dbSNP 핸들. CommonSNP 컬럼을 쓰는 ASOdesign 이 처음 요청할 때 연다."""
+        with self.lock:
+            if self._cSNP is None:
+                self._cSNP = _open_snp(*self.snp_args)
+            return self._cSNP
+
+    def executor(self):
+        """모든 어셈블리 × tile_length (× 전사체) 가 함께 쓰는 워커 풀. 처음 요청할 때 만들고 close() 까지 재사용한다."""
+        with self.lock:
+            if self._executor is None:
+                self._executor = _new_pool(self.max_workers, self.maf_dir, self.ref_asm, self.maf_backend)
+            return self._executor
+
+    def sequence(self, locStr):
+        """2bit 서열 (대문자) 캐시."""
+        with self.lock:
+            if locStr not in self._seqs:
+                self._seqs[locStr] = locus(locStr).twoBitFrag().upper()
+            return self._seqs[locStr]
+
+    def release_sequence(self, locStr):
+        with self.lock:
+            self._seqs.pop(locStr, None)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+        self._executor = None
+        if self.locus_cache is not None:
+            self.locus_cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
 # ──────────────────────────────────────────────────────────────
-# 2) ASOdesign 클래스  ─────────────────────────────────────────
+# 3) ASOdesign 클래스  ─────────────────────────────────────────
 # ──────────────────────────────────────────────────────────────
 class ASOdesign:
     def __init__(self,
                  transid="NM_002415",
-                 refFlat_path="/Users/dowonkim/Dropbox/data/UCSC/hg38/refFlat/refFlat_200817.txt",
+                 refFlat_path="/Users/dowonkim/Dropbox/data/UCSC/hg38/refFlat/refFlat_200817.txt",  # 또는 build_refflat_store() 디렉토리
                  maf_dir='/Users/dowonkim/Dropbox/data/offtarget_test/maf',
                  dbsnp_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf",
                  dbsnp_index_path ="/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf.csi",  # .csi 인덱스 자동 사용
                  query_assembly=["mm39"],      # tuple/리스트 허용
                  ref_assembly="hg38",
-                 tile_length=17):
+                 tile_length=17,
+                 maf_backend="maf",       # 'maf' | 'track'
+                 snp_index_dir=None,      # build_snp_index() 결과. 주어지면 VCF 대신 사용
+                 snp_mode="records",      # 'records' | 'count' | 'bool' (snp_index_dir 필요)
+                 context=None,            # ASOcontext. 주어지면 refFlat/dbSNP/서열/워커 풀을 공유
+                 features=None):          # 계산할 컬럼 / 묶음 (columns.select_features). None 이면 전부
         print(f"[ASOdesign] transid={transid}")
-        self.refFlat      = loadBlatOutput(refFlat_path, by='transID')
-        #self.cSNP = CommonSNP()
-        
-        self.cSNP = VCF(dbsnp_path)
-        self.cSNP.set_index(index_path=dbsnp_index_path)  # .csi 인덱스 자동 사용
+        self.context      = context
+        self.features     = select_features(features)
+        if context is not None:
+            self.refFlat  = context.refFlat
+            self.snp_args = context.snp_args
+        else:
+            self.refFlat  = loadRefFlat(refFlat_path, by='transID')
+            #self.cSNP = CommonSNP()
+            self.snp_args = (dbsnp_path, dbsnp_index_path, snp_index_dir, snp_mode)   # 워커가 자기 핸들을 열 때 사용
+        self.cSNP         = None
+        self._open_features()
         self.maf_dir      = maf_dir
+        self.maf_backend  = maf_backend
         self.query_asm    = query_assembly
         self.ref_asm      = ref_assembly
         self.transid      = transid
@@ -90,27 +267,64 @@ class ASOdesign:
             self.txnEnd   = self.transInfo['txnEnd']
         else:
             raise ValueError("transid is None")
-        self.txn_tiles    = self._tile_region()
-        self.txn_tile_seq = self._tile_txn_seq()
+        txn_locStr        = f"{self.chrom}:{self.txnSta}-{self.txnEnd-1}{self.anti}"
+        self.txn_seq      = context.sequence(txn_locStr) if context is not None else locus(txn_locStr).twoBitFrag().upper()
+        # 타일은 시작 좌표 배열 + 전사체 서열 하나로 들고, locus/서열 문자열은 필요할 때 만든다
+        self.tiles        = self._tileset()
+        self.txn_tiles    = self.tiles.loci()
+        self.txn_tile_seq = self.tiles.seqs()
 
 
     # ───── 내부 헬퍼 ──────────────────────────────────────────
+    def _wants(self, *columns):
+        """선택한 feature 중 columns 에 있는 것이 하나라도 있는지."""
+        return not self.features.isdisjoint(columns)
+
+    def _locinfo_columns(self):
+        """선택한 feature 에 대한 getlocInfo 결과의 컬럼 이름 (결과 딕셔너리의 키 순서)."""
+        return [k for k in LOCINFO_COLUMNS if k not in FEATURE_COLUMNS or k in self.features]
+
+    def _open_features(self, features=None):
+        """features 를 (다시) 정하고, CommonSNP 가 있으면 그때 dbSNP 핸들을 연다."""
+        if features is not None:
+            self.features = select_features(features)
+        if self._wants("CommonSNP") and self.cSNP is None:
+            self.cSNP = self.context.cSNP if self.context is not None else _open_snp(*self.snp_args)
+
     def _get_transInfo(self):
         return [t for t in self.refFlat[self.transid]
                 if len(t['chrom'].split('_')) == 1][0]
 
-    def _tile_region(self):
-        L     = self.tile_length
-        return [locus(f"{self.chrom}:{i}-{i+L-1}{self.anti}")   # inclusive end = i+L-1
-            for i in range(self.txnSta, self.txnEnd-L+1)]
+    def _tileset(self, tile_length=None):
+        return TileSet(self.chrom, self.anti, self.txnSta, self.txnEnd, tile_length or self.tile_length, self.txn_seq)
 
-    def _tile_txn_seq(self):
-        L     = self.tile_length
-        txn_seq = locus(f"{self.chrom}:{self.txnSta}-{self.txnEnd-1}{self.anti}").twoBitFrag().upper()
-        result_array = [ txn_seq[i:i+L] for i in range(0, self.txnEnd-self.txnSta-L+1)]
-        if self.anti == '-':
-            result_array = result_array[::-1]
-        return result_array
+    def _tile_region(self, tile_length=None):
+        return self._tileset(tile_length).loci()
+
+    def _tile_txn_seq(self, tile_length=None):
+        return self._tileset(tile_length).seqs()
+
+    def cofold_table(self, tile_lengths=None, max_workers=1):
+        """
+        주어진 타일 길이들의 모든 타일 서열에 대해 RNAcofold 결과를 한 번에 계산한다.
+        중복 서열은 한 번만 계산하며, 결과는 {서열: (homo, mono)} 딕셔너리.
+        """
+        tile_lengths = tile_lengths or [self.tile_length]
+        seqs = list(dict.fromkeys(seq for L in tile_lengths for seq in self._tile_txn_seq(L)))
+        executor = self.context.executor() if self.context is not None and max_workers > 1 else None
+        return dict(zip(seqs, RNAcofold_batch(seqs, max_workers=max_workers, executor=executor)))
+
+    def feature_table(self, tile_lengths=None):
+        """
+        주어진 타일 길이들의 모든 타일 서열에 대해 (Gquad, CpG, GC_Content) 를 누적합으로 한 번에 계산한다.
+        결과는 {서열: (Gquad, CpG, GC_Content)} 딕셔너리.
+        """
+        return sequence_features(self.txn_seq, tile_lengths or [self.tile_length])
+
+    def snp_span(self):
+        """전사체 전체 구간의 SNP 를 한 번만 읽어둔다 (타일은 txnSta ~ txnEnd-1 안에 있다)."""
+        with self.context.lock if self.context is not None else contextlib.nullcontext():
+            return CommonSNPSpan(f"{self.chrom}:{self.txnSta}-{self.txnEnd}{self.anti}", self.cSNP)
 
     def _chunks(self, seq, n):
         """seq 를 n 등분하여 순차적으로 yield"""
@@ -118,84 +332,476 @@ class ASOdesign:
         for i in range(0, len(seq), k):
             yield seq[i:i+k]
 
+    def _span_tasks(self, chunk_loc, n, asm):
+        """
+        연속된 타일 묶음을 n 개의 span 작업 (asm, chrom, start, end, tile_length) 으로 나눈다.
+        좌표는 MultipleAlignmentReader.query() 와 같은 방식(chrSta-1, chrEnd)으로 환산한다.
+        """
+        tasks = []
+        for sub in self._chunks(chunk_loc, n):
+            first, last = sub[0], sub[-1]
+            tile_length = first.chrEnd - first.chrSta + 1
+            tasks.append((asm, first.chrom, first.chrSta - 1, last.chrEnd, tile_length))
+        return tasks
+
+    def _multi_span_tasks(self, tile_lengths, n):
+        """
+        모든 tile_length 의 타일 시작 좌표(0-base)를 n 개 구간으로 나눠 (chrom, start, end, tile_lengths, n_tiles) 작업을 만든다.
+        구간 [a, b) 는 가장 긴 타일까지 덮는 [a, min(b-1+L_max, txnEnd-1)) 블록을 한 번만 읽고,
+        길이 L 의 타일은 시작 좌표가 txnEnd-L 보다 작은 것만 맡는다.
+        """
+        tile_lengths = sorted(tile_lengths)
+        lo, hi = self.txnSta - 1, self.txnEnd - tile_lengths[0]
+        step = max(1, -(-(hi - lo) // n))
+        tasks = []
+        for a in range(lo, hi, step):
+            b = min(a + step, hi)
+            end = min(b - 1 + tile_lengths[-1], self.txnEnd - 1)
+            n_tiles = [max(0, min(b, self.txnEnd - L) - a) for L in tile_lengths]
+            tasks.append((self.chrom, a, end, tile_lengths, n_tiles))
+        return tasks
+
+    def _executor(self, max_workers):
+        """공유 컨텍스트가 있으면 그 풀을 (닫지 않고) 쓰고, 없으면 모든 어셈블리가 쓸 새 풀을 만든다."""
+        if self.context is not None:
+            return contextlib.nullcontext(self.context.executor())
+        return _new_pool(max_workers, self.maf_dir, self.ref_asm, self.maf_backend)
+
+    @classmethod
+    def _feature_view(cls, transInfo, cSNP, features=None):
+        """워커에서 getlocInfo 만 쓰기 위한 최소 인스턴스 (refFlat/서열/풀 없이 transInfo 와 SNP 핸들만)."""
+        aso = cls.__new__(cls)
+        aso.transInfo = transInfo
+        aso.cSNP = cSNP
+        aso.features = select_features(features) if features is None else features
+        return aso
+
+    def _locinfo_range(self, tiles, lo, hi, cofold_map=None, snp_span=None, feature_map=None):
+        """
+        TileSet 의 [lo, hi) 타일에 대한 getlocInfo 결과 리스트.
+        주어지지 않은 cofold / SNP / GC·CpG·G4 표는 이 구간에 대해서만 계산한다.
+        """
+        locs, seqs = tiles.loci()[lo:hi], tiles.seqs()[lo:hi]
+        if hi <= lo:
+            return []
+        L = tiles.tile_length
+        # 선택하지 않은 feature 의 표는 만들지 않는다
+        if cofold_map is None and self._wants("Homo_Dimer", "Monomer"):
+            uniq = list(dict.fromkeys(seqs))
+            cofold_map = dict(zip(uniq, RNAcofold_batch(uniq)))
+        if snp_span is None and self._wants("CommonSNP"):
+            snp_span = CommonSNPSpan(f"{tiles.chrom}:{int(tiles.starts[lo])}-{int(tiles.starts[hi-1])+L-1}{tiles.strand}", self.cSNP)
+        if feature_map is None and self._wants("Gquad", "CpG", "GC_Content"):
+            a, b = tiles.window_span(lo, hi)
+            feature_map = sequence_features(tiles.txn_seq[a:b], [L])
+        # Type/RegionType 은 구간 단위로 한 번에 (타일 순서 = txn_tiles 순서)
+        regions = RegionAnnotator(self.transInfo).annotate(locs) if self._wants("Type", "RegionType") else [None] * len(locs)
+        cofold_map, feature_map = cofold_map or {}, feature_map or {}
+        return [self.getlocInfo(tile_loc, tile_seq, cofold=cofold_map.get(tile_seq), snp_span=snp_span,
+                                features=feature_map.get(tile_seq), region=tile_region)
+                for tile_loc, tile_seq, tile_region in zip(locs, seqs, regions)]
+
+    def _locinfo_parallel(self, ex, max_workers, cofold_map=None, lo=0, hi=None, checkpoint=None, snp_span=None, feature_map=None):
+        """
+        [lo, hi) 타일을 구간으로 나눠 워커 풀에서 _locinfo_range 를 돌리고, 구간 순서대로 ResultColumns 에 이어 붙인다.
+        워커에는 구간의 타일(TileSet.subset)과 그 구간 몫의 cofold / SNP / (Gquad, CpG, GC_Content) 표만 보낸다.
+        SNP 는 여기서 한 번 읽고 (snp_span 이 없으면), feature 표는 [lo, hi) 구간 서열에서 한 번 계산한다.
+        checkpoint (RunCheckpoint) 가 있으면 끝난 구간은 읽어 오고 나머지 구간만 계산해 끝나는 대로 저장한다.
+        """
+        hi = len(self.tiles) if hi is None else hi
+        n = hi - lo
+        k = -(-n // _n_batches(n, max_workers, max_batch=20000)) if n > 0 else 1
+        if snp_span is None and self._wants("CommonSNP"):
+            snp_span = self.snp_span()
+        if feature_map is None and self._wants("Gquad", "CpG", "GC_Content") and n > 0:
+            a, b = self.tiles.window_span(lo, hi)
+            feature_map = sequence_features(self.txn_seq[a:b], [self.tile_length])
+        L = self.tile_length
+        tasks, bounds = [], []
+        for a in range(lo, hi, k):
+            b = min(a + k, hi)
+            seqs = self.txn_tile_seq[a:b]
+            sub_cofold = sub_features = sub_snp = None
+            if cofold_map is not None:
+                sub_cofold = {seq: cofold_map[seq] for seq in seqs if seq in cofold_map}
+            if feature_map is not None:
+                sub_features = {seq: feature_map[seq] for seq in seqs}
+            if snp_span is not None:
+                sub_snp = snp_span.slice(int(self.tiles.starts[a]) - 1, int(self.tiles.starts[b - 1]) + L - 1)
+            tasks.append((self.transInfo, self.tiles.subset(a, b), self.snp_args, sub_cofold, sub_snp, sub_features, self.features))
+            bounds.append((a, b))
+        if checkpoint is not None:
+            keys = [self._locinfo_key(a, b) for a, b in bounds]
+            parts = checkpoint.map(ex, _locinfo_chunk, tasks, keys)
+        else:
+            parts = ex.map(_locinfo_chunk, tasks)
+        builder = ResultColumns(self.ref_asm)
+        for part in parts:
+            builder.extend(part)
+        return builder
+
+    def _locinfo_key(self, lo, hi):
+        """TileSet [lo, hi) 타일의 getlocInfo 체크포인트 키 (0-base 게놈 좌표)."""
+        start = int(self.tiles.starts[lo]) - 1 if hi > lo else 0
+        return tile_key(self.tile_length, "locinfo", start, start + hi - lo)
+
+    def _locinfo_subset(self, tiles, cofold_map=None, snp_span=None, feature_map=None, max_workers=1):
+        """
+        TileSubset (살아남은 타일) 에 대한 getlocInfo 결과 리스트.
+        cofold 는 cofold_map 에 없는 서열만 한 번에 계산한다.
+        """
+        if not len(tiles):
+            return []
+        cofold_map = dict(cofold_map or {})
+        missing = [seq for seq in dict.fromkeys(tiles.seqs) if seq not in cofold_map] if self._wants("Homo_Dimer", "Monomer") else []
+        if missing:
+            executor = self.context.executor() if self.context is not None and max_workers > 1 else None
+            cofold_map.update(zip(missing, RNAcofold_batch(missing, max_workers=max_workers, executor=executor)))
+        regions = RegionAnnotator(self.transInfo).annotate(tiles.loci) if self._wants("Type", "RegionType") else [None] * len(tiles)
+        return [self.getlocInfo(tile_loc, tile_seq, cofold=cofold_map.get(tile_seq), snp_span=snp_span,
+                                features=feature_map.get(tile_seq), region=tile_region)
+                for tile_loc, tile_seq, tile_region in zip(tiles.loci, tiles.seqs, regions)]
+
+    def _maf_subset(self, ex, idx, asm, max_workers, merge_gap=64):
+        """
+        TileSet 인덱스 idx (오름차순) 타일만 MAF 조회. 간격이 merge_gap 이하인 타일들은 span 작업 하나로 읽고,
+        긴 구간은 워커 수에 맞게 나눈다. 결과는 idx 순서의 query() 결과 리스트.
+        """
+        if not len(idx):
+            return []
+        cache = self.context.locus_cache if self.context is not None else None
+        if cache is not None:
+            # 캐시에 블록이 있는 타일은 꺼내 쓰고, 나머지만 조회한다 (일부 타일만 읽으므로 캐시에 저장하지는 않는다)
+            pos = self.tiles.starts[idx] - 1
+            blk = pos // cache.block_size
+            found = cache.get_maf(asm, self.chrom, self.tile_length, np.unique(blk).tolist())
+            hit = np.isin(blk, list(found))
+            blocks = {b: unpack_results(packed) for b, packed in found.items()}
+            out = [blocks[b][p - b * cache.block_size] if h else None
+                   for b, p, h in zip(blk.tolist(), pos.tolist(), hit.tolist())]
+            for i, res in zip(np.flatnonzero(~hit).tolist(), self._maf_query(ex, idx[~hit], asm, max_workers, merge_gap)):
+                out[i] = res
+            print(f"[locus_cache] {asm}: {int(hit.sum())}/{len(idx)} tiles from cache")
+            return out
+        return self._maf_query(ex, idx, asm, max_workers, merge_gap)
+
+    def _maf_query(self, ex, idx, asm, max_workers, merge_gap=64):
+        """_maf_subset 의 조회 부분: 캐시 없이 idx 타일들을 span 작업으로 읽는다."""
+        if not len(idx):
+            return []
+        L, starts = self.tile_length, self.tiles.starts
+        max_span = max(1, -(-(int(idx[-1]) - int(idx[0]) + 1) // _n_batches(len(idx), max_workers)))
+        groups = []
+        for g in np.split(idx, np.flatnonzero(np.diff(idx) > merge_gap) + 1):
+            groups.extend(np.array_split(g, -(-(int(g[-1]) - int(g[0]) + 1) // max_span)))
+        tasks = [(asm, self.chrom, int(starts[g[0]]) - 1, int(starts[g[-1]]) + L - 1, L) for g in groups]
+        out = []
+        for g, span in zip(groups, ex.map(_query_span, tasks)):
+            res = unpack_results(span)
+            out.extend(res[i] for i in (g - g[0]).tolist())
+        return out
+
+    def process_lazy(self, max_workers=3, wobble=2, to_df=True, gapmer_filtered=True, to_csv=False, output_path=None,
+                     filters=None, cofold_map=None, snp_span=None, feature_map=None, maf_map=None, output_format="csv"):
+        """
+        값싼 필터부터 적용하고 살아남은 타일에만 비싼 단계를 돌리는 모드.
+          1) filters (+ gapmer_filtered 면 gap CpG) 를 비용 순으로 : 서열 / feature 표 / SNP 구간만 본다
+          2) MAF (어셈블리마다) → gapmer_filtered 면 보존성 판정 (한 어셈블리라도 통과)
+          3) 남은 타일만 cofold / dbSNP / RegionType (getlocInfo)
+        결과는 남은 타일만: gapmer_filtered 면 {"gapmer": ...} (process_main 의 "gapmer" 와 같은 값),
+        아니면 {"default": ...}. 파일 이름에는 _gapmer_filtered / _filtered 가 붙는다.
+        """
+        if snp_span is None and self._wants("CommonSNP"):
+            snp_span = self.snp_span()
+        if feature_map is None:
+            feature_map = self.feature_table()      # 값싼 필터도 쓰므로 항상 (누적합 한 번)
+        filters = list(filters or [])
+        if gapmer_filtered:
+            filters.append(gap_cpg_filter())
+        tiles = apply_filters(TileSubset(self.tiles, np.arange(len(self.tiles)), feature_map, snp_span), filters)
+
+        maf = {}
+        assemblies = self.query_asm if self._wants("conservation") else []
+        with (self._executor(max_workers) if maf_map is None and assemblies else contextlib.nullcontext()) as ex:
+            for asm in assemblies:
+                print(f"Assembly: [{asm}] prcessing... ({len(tiles)} tiles)")
+                maf[asm] = self._maf_subset(ex, tiles.idx, asm, max_workers) if maf_map is None else \
+                           [maf_map[asm][i] for i in tiles.idx.tolist()]
+
+        if gapmer_filtered:
+            # 보존성 판정은 서열 / 길이 / coverage / wobble 만으로 (cofold·SNP 전에)
+            cons = ResultColumns.from_records([{"ASO_Sequence": seq, "Length": len(seq)} for seq in tiles.seqs], self.ref_asm,
+                                              columns=("ASO_Sequence", "Length"))
+            for asm in self.query_asm:
+                cons.add_assembly(asm, maf[asm], self._editdistance_batch(maf[asm]))
+                cons.add_wobble(asm, anti_strand=self.anti, wobble=wobble)
+            masks, _ = gapmer_mask(cons.to_dict(), middle_size=10, gapmer_coord='', target_assembly=self.query_asm)
+            keep = np.logical_or.reduce([masks[asm] for asm in self.query_asm])
+            print(f"[filter] conservation (cost 100): {len(tiles)} -> {int(keep.sum())} tiles")
+            tiles = tiles.take(keep)
+            maf = {asm: [r for r, k in zip(maf[asm], keep) if k] for asm in self.query_asm}
+
+        # 남은 타일이 없어도 process_main 과 같은 컬럼의 (빈) 결과를 낸다
+        builder = ResultColumns.from_records(self._locinfo_subset(tiles, cofold_map=cofold_map, snp_span=snp_span,
+                                                                  feature_map=feature_map, max_workers=max_workers),
+                                             self.ref_asm, columns=self._locinfo_columns())
+        for asm in assemblies:
+            builder.add_assembly(asm, maf[asm], self._editdistance_batch(maf[asm]))
+            builder.add_wobble(asm, anti_strand=self.anti, wobble=wobble)
+        data = builder.to_dict()
+        key, suffix = ("gapmer", "_gapmer_filtered") if gapmer_filtered else ("default", "_filtered")
+        if gapmer_filtered:
+            data = gapmer(result=data, middle_size=10, gapmer_coord='', target_assembly=self.query_asm)
+        if to_csv:
+            if output_format == "csv":
+                save_csv_pyarrow(data_dict=data, path=self._output_path(output_path, wobble, suffix=suffix), toString=True)
+            else:
+                if output_path == None:
+                    output_path = os.path.dirname(os.path.realpath(__file__))
+                write_result_dataset(data, root=os.path.join(output_path, f"ASOdesign_wobble_{wobble}{suffix}_{output_format}"),
+                                     transcript=self.transid, tile_length=self.tile_length,
+                                     assemblies=self.query_asm, fmt=output_format)
+        if to_df:
+            data = pd.DataFrame(data) if gapmer_filtered else builder.to_dataframe()
+        return {key: data}
+
+    def maf_table(self, tile_lengths, max_workers=1, checkpoint=None):
+        """
+        주어진 tile_length 들의 MAF 결과를 어셈블리별로 한 번에 구한다.
+        블록은 구간마다 한 번만 읽고 짧은 k 는 같은 구간에서 잘라낸다. 구간 수는 타일 수와 워커 수로 정한다.
+        결과는 {asm: {tile_length: 타일 순서대로 query() 와 같은 결과 리스트}}.
+        checkpoint (RunCheckpoint) 가 있으면 (k, 어셈블리, 구간) 조각을 끝나는 대로 저장하고, 다시 실행하면 끝난 조각은 읽어 온다.
+        LocusCache 가 켜져 있으면 checkpoint 는 MAF 에 쓰지 않는다: 캐시 블록이 끝나는 대로 저장되어 다시 실행할 때
+        체크포인트 조각과 같은 역할을 하므로, 같은 결과를 두 곳에 쓰지 않는다 (getlocInfo 조각은 계속 checkpoint 에 남는다).
+        """
+        tile_lengths = list(tile_lengths)
+        if self.context is not None and self.context.locus_cache is not None:
+            return self._maf_table_cached(tile_lengths, max_workers)
+        n_tiles = self.txnEnd - self.txnSta - min(tile_lengths) + 1
+        tasks = self._multi_span_tasks(tile_lengths, _n_batches(n_tiles, max_workers))
+        # 모든 어셈블리의 작업을 한 풀에 한꺼번에 넣는다
+        all_tasks = [(asm,) + task for asm in self.query_asm for task in tasks]
+        with self._executor(max_workers) as ex:
+            if checkpoint is not None:
+                keys = [{L: tile_key(L, asm, a, a + n) for L, n in zip(Ls, n_tiles)}
+                        for asm, _, a, _, Ls, n_tiles in all_tasks]
+                parts = checkpoint.map(ex, _query_span_multi, all_tasks, keys)
+            else:
+                parts = list(ex.map(_query_span_multi, all_tasks))
+        table = {}
+        for j, asm in enumerate(self.query_asm):
+            asm_parts = parts[j * len(tasks):(j + 1) * len(tasks)]
+            table[asm] = {L: [r for part in asm_parts for r in unpack_results(part[L])] for L in tile_lengths}
+        return table
+
+    def _maf_table_cached(self, tile_lengths, max_workers=1):
+        """
+        maf_table 의 LocusCache 버전. 전사체 타일을 덮는 블록 중 캐시에 없는 (어셈블리, 블록) 만
+        모든 tile_length 를 한 번에 읽어 채우고, 블록들을 이어 붙여 전사체 타일 결과를 잘라낸다.
+        """
+        cache = self.context.locus_cache
+        tile_lengths = sorted(tile_lengths)
+        lo = self.txnSta - 1                                   # 첫 타일의 0-base 시작 좌표
+        blocks = cache.blocks(lo, self.txnEnd - tile_lengths[0])
+        found = {(asm, L): cache.get_maf(asm, self.chrom, L, blocks) for asm in self.query_asm for L in tile_lengths}
+        missing = {}                                           # (asm, block) -> 캐시에 없는 길이들
+        for (asm, L), got in found.items():
+            for b in blocks:
+                if b not in got:
+                    missing.setdefault((asm, b), []).append(L)
+        if missing:
+            tasks = [cache.block_task(asm, self.chrom, b, Ls) for (asm, b), Ls in missing.items()]
+            with self._executor(max_workers) as ex:
+                for (asm, b), part in zip(missing, ex.map(_query_span_multi, tasks)):
+                    cache.set_maf(asm, self.chrom, b, part)
+                    for L, packed in part.items():
+                        found[(asm, L)][b] = packed
+        n_blocks = len(self.query_asm) * len(blocks)
+        print(f"[locus_cache] {self.transid}: {n_blocks - len(missing)}/{n_blocks} (assembly, block) from cache")
+        return {asm: {L: cache.maf_tiles(found[(asm, L)], blocks, lo, self.txnEnd - self.txnSta - L + 1)
+                      for L in tile_lengths}
+                for asm in self.query_asm}
+
     # ───── 퍼블릭 메서드 ─────────────────────────────────────
-    def process_main(self, chunk_division=3, max_workers=3, wobble=2, to_df=True, gapmer_filtered=False, to_csv=False, output_path=None):
+    def process_main(self, chunk_division=3, max_workers=3, wobble=2, to_df=True, gapmer_filtered=False, to_csv=False, output_path=None,
+                     cofold_map=None, snp_span=None, feature_map=None, maf_map=None,
+                     stream=False, stream_format="csv", stream_chunk_size=20000, output_format="csv",
+                     lazy=False, filters=None, features=None, checkpoint=None):
+        """
+        features: 계산할 컬럼 / 묶음 (None 이면 생성자에서 정한 값). 예) ['conservation', 'GC_Content']
+                  선택하지 않은 컬럼은 계산하지 않고 결과에도 없다 (conservation 을 빼면 MAF 조회도 하지 않는다).
+        lazy=True 이면 process_lazy (값싼 필터 먼저, 남은 타일만 MAF / cofold / dbSNP). filters 는 pipeline.filters 의 TileFilter 리스트.
+        output_format: to_csv=True 일 때 파일 형식. "csv" (기존) | "parquet" / "ipc" (write_result_dataset 으로
+        <output_path>/ASOdesign_wobble_<wobble>_<output_format>/transcript=.../k=.../assembly=.../ 에 파티션별로 쓴다)
+        checkpoint: RunCheckpoint. getlocInfo 구간과 (어셈블리, 구간) MAF 조각을 저장 / 재사용한다 (stream / lazy 에서는 쓰지 않는다).
+        """
         print(f"#tiles={len(self.txn_tiles)}, assemblies={self.query_asm}, tile_length={self.tile_length}, wobble={wobble}")     
-        #
-        _all_results_locInfo = []
-        for chunk_loc, chunk_seq in zip(self._chunks(self.txn_tiles, chunk_division), self._chunks(self.txn_tile_seq, chunk_division)):
-            chunk_locInfo = [self.getlocInfo(tile_loc, tile_seq) for tile_loc, tile_seq in zip(chunk_loc, chunk_seq)] 
-            _all_results_locInfo.extend(chunk_locInfo)
-            #print("Elapsed:", self.endtime, "sec")
-        all_results_locInfo = self._flatten_dict(_all_results_locInfo)
+        self._open_features(features)
+        if gapmer_filtered and not self._wants("conservation"):
+            raise ValueError("gapmer_filtered requires the 'conservation' feature")
+        if stream:
+            return self.process_stream(max_workers=max_workers, wobble=wobble, gapmer_filtered=gapmer_filtered,
+                                       output_path=output_path, fmt=stream_format, chunk_size=stream_chunk_size,
+                                       cofold_map=cofold_map, snp_span=snp_span, feature_map=feature_map, maf_map=maf_map)
+        if lazy:
+            return self.process_lazy(max_workers=max_workers, wobble=wobble, to_df=to_df, gapmer_filtered=gapmer_filtered,
+                                     to_csv=to_csv, output_path=output_path, filters=filters, cofold_map=cofold_map,
+                                     snp_span=snp_span, feature_map=feature_map, maf_map=maf_map, output_format=output_format)
+        if max_workers > 1:
+            # feature 단계도 워커 풀에서 타일 구간 단위로 (결과 순서 = 구간 순서)
+            with self._executor(max_workers) as ex:
+                builder = self._locinfo_parallel(ex, max_workers, cofold_map=cofold_map, checkpoint=checkpoint,
+                                                 snp_span=snp_span, feature_map=feature_map)
+        else:
+            # cofold 는 중복을 제거해 한 번에 계산 (run_ASOdesign 은 모든 k 를 미리 넘겨준다)
+            if cofold_map is None and self._wants("Homo_Dimer", "Monomer"):
+                cofold_map = self.cofold_table(max_workers=max_workers)
+            if snp_span is None and self._wants("CommonSNP"):
+                snp_span = self.snp_span()
+            if feature_map is None and self._wants("Gquad", "CpG", "GC_Content"):
+                feature_map = self.feature_table()
+            def locinfo(_):
+                return ResultColumns.from_records(self._locinfo_range(self.tiles, 0, len(self.tiles),
+                                                                      cofold_map=cofold_map, snp_span=snp_span, feature_map=feature_map),
+                                                  self.ref_asm)
+            builder = locinfo(None) if checkpoint is None else \
+                      checkpoint.map(None, locinfo, [None], [self._locinfo_key(0, len(self.tiles))])[0]
 
         #
-        result_dict = {}
-        for asm in self.query_asm:                      # 어셈블리별로 별도 풀
-            print(f"Assembly: [{asm}] prcessing...")
-            with concurrent.futures.ProcessPoolExecutor(
-                    max_workers=max_workers,
-                    initializer=_init_worker,
-                    initargs=(self.maf_dir, self.ref_asm, asm),
-            ) as ex:
+        # 모든 어셈블리가 풀 하나를 공유 (maf_map 이 있거나 conservation 을 빼면 풀이 필요 없다)
+        assemblies = self.query_asm if self._wants("conservation") else []
+        with (self._executor(max_workers) if maf_map is None and assemblies else contextlib.nullcontext()) as ex:
+            for asm in assemblies:
+                print(f"Assembly: [{asm}] prcessing...")
+                if maf_map is not None:
+                    # maf_table() 로 미리 구한 결과 (run_ASOdesign 은 모든 k 를 한 번에 구해 넘겨준다)
+                    all_results_maf = maf_map[asm]
+                    builder.add_assembly(asm, all_results_maf, self._editdistance_batch(all_results_maf))
+                    continue
                 all_results_maf, all_editdist = [], []
                 for chunk_loc, chunk_seq in zip(self._chunks(self.txn_tiles, chunk_division), self._chunks(self.txn_tile_seq, chunk_division)):
                     # region 문자열만 워커에 전달
                     #chunk_locInfo = list(ex.map(self.getlocInfo, chunk))
                     #chunk_locInfo = [self.getlocInfo(tile_loc, tile_seq) for tile_loc, tile_seq in zip(chunk_loc, chunk_seq)]
-                    chunk_maf_results = list(ex.map(_query_region, chunk_loc))
-                    dists   = [self._editdistance_safe(r) for r in chunk_maf_results]
+                    #chunk_maf_results = list(ex.map(_query_region, chunk_loc))
+                    span_tasks = self._span_tasks(chunk_loc, _n_batches(len(chunk_loc), max_workers), asm)
+                    spans = ex.map(_query_span, span_tasks) if checkpoint is None else \
+                            checkpoint.map(ex, _query_span, span_tasks, [tile_key(L, asm, a, b - L + 1) for asm, _, a, b, L in span_tasks])
+                    chunk_maf_results = [r for span in spans for r in unpack_results(span)]
+                    #dists   = [self._editdistance_safe(r) for r in chunk_maf_results]
+                    dists   = self._editdistance_batch(chunk_maf_results)
                     #all_results_locInfo.extend(chunk_locInfo)
                     all_results_maf.extend(chunk_maf_results)
                     all_editdist.extend(dists)
-                result_dict[asm] = {"maf_seq": all_results_maf, "coverage": all_editdist}
+                builder.add_assembly(asm, all_results_maf, all_editdist)
                 #result_dict[asm] = {"maf_seq": all_results_maf, "coverage": all_editdist, "locInfo": all_results_locInfo}
                 #print(asm, result_dict[asm]["maf_seq"][:3])
         #print("finished. first 3 results:", result_dict[self.query_asm[0]]["locInfo"][:1])
         #print("finished. first 3 results:", result_dict[self.query_asm[0]]["maf_seq"][:1])
         #print("finished. first 3 results:", result_dict[self.query_asm[0]]["coverage"][:1])
-        sort_result_dict = self._sort_dict(result_dict)
-        #(zip(result["mm39"]["hg38"], result["mm39"]["mm39"],  
-        #print(sort_result_dict)
-        for _assembly in sort_result_dict.keys():
-            wobble_pair = []
-            #for human, other in zip(sort_result_dict[_assembly]["hg38"], sort_result_dict[_assembly][_assembly]):
-            #human, other = sort_result_dict[_assembly][f"maf_seq_{_assembly}"].split(":")
-            for _maf_seq in sort_result_dict[_assembly][f"maf_seq_{_assembly}"]:
-                _human, _other = _maf_seq.split(":")
-                wobble_pair.append(check_wobble(r=_human, q=_other, wob=wobble, anti_strand=self.anti))
-            #print(wobble_pair, "wobble")
-            sort_result_dict[_assembly].update({f"wobble_{_assembly}": wobble_pair})
-            all_results_locInfo.update(sort_result_dict[_assembly])
-            #all_results_locInfo.update(sort_result_dict[_assembly].update({f"wobble_{_assembly}": wobble_pair}))
-            #sort_result_dict[_assembly]["wobble"] = wobble_pair
-            #sort_result_dict[_assembly].update(all_results_locInfo)
-        #print(all_results_locInfo)
-        all_results_locInfo_copy = all_results_locInfo.copy()
-        result = {"default": all_results_locInfo_copy} 
+        for _assembly in assemblies:
+            # ref / query 서열을 따로 들고 있으므로 "hg38:mm39" 문자열을 다시 나누지 않는다
+            builder.add_wobble(_assembly, anti_strand=self.anti, wobble=wobble)
+        # maf_seq_<asm> 은 여기서만 "ref:query" 로 잇는다
+        all_results_locInfo = builder.to_dict()
+        result = {"default": all_results_locInfo}
         if output_path == None and to_csv:
             output_path = os.path.dirname(os.path.realpath(__file__))
-        if to_csv:
-            save_csv_pyarrow(data_dict=all_results_locInfo_copy,
+        if to_csv and output_format == "csv":
+            save_csv_pyarrow(data_dict=all_results_locInfo,
                              path=os.path.join(output_path,f"{self.transName}_{self.transid}_{self.tile_length}mer_wobble_{wobble}.csv"),
                              toString=True)
+        all_tiles = all_results_locInfo
         if gapmer_filtered:
-            all_results_locInfo= gapmer(result=all_results_locInfo, middle_size=10, gapmer_coord='', target_assembly=self.query_asm)
-            if to_csv:
+            # gapmer 는 입력에 gapmer_filtered_<asm> / gapmer_coords_<asm> 컬럼을 붙인 뒤 행을 거른다
+            # (컬럼은 데이터셋 출력용 all_tiles 에만 붙이고 default 결과에는 붙이지 않는다)
+            all_tiles = dict(all_results_locInfo)
+            all_results_locInfo= gapmer(result=all_tiles, middle_size=10, gapmer_coord='', target_assembly=self.query_asm)
+            if to_csv and output_format == "csv":
                 save_csv_pyarrow(data_dict=all_results_locInfo,
                                  path=os.path.join(output_path,f"{self.transName}_{self.transid}_{self.tile_length}mer_wobble_{wobble}_gapmer_filtered.csv"),
                                  toString=True)
             result["gapmer"] = all_results_locInfo
+        if to_csv and output_format != "csv":
+            # 타입이 있는 데이터셋: 모든 타일 + gapmer_filtered 컬럼 (거르지 않은 행), wobble / CommonSNP 는 중첩 타입
+            write_result_dataset(all_tiles, root=os.path.join(output_path, f"ASOdesign_wobble_{wobble}_{output_format}"),
+                                 transcript=self.transid, tile_length=self.tile_length,
+                                 assemblies=self.query_asm, fmt=output_format)
         if to_df:
             #result_df  = self.apply_df(sort_result_dict)
             #result_df = pd.DataFrame(all_results_locInfo)
-            result["default"] = pd.DataFrame(all_results_locInfo_copy)
+            result["default"] = builder.to_dataframe()
             if gapmer_filtered:
                 result["gapmer"] = pd.DataFrame(all_results_locInfo)
             return result
         else:
             return result
 
+    def _output_path(self, output_path, wobble, suffix="", ext="csv"):
+        if output_path == None:
+            output_path = os.path.dirname(os.path.realpath(__file__))
+        return os.path.join(output_path, f"{self.transName}_{self.transid}_{self.tile_length}mer_wobble_{wobble}{suffix}.{ext}")
+
+    def process_stream(self, max_workers=3, wobble=2, gapmer_filtered=False, output_path=None, fmt="csv",
+                       chunk_size=20000, cofold_map=None, snp_span=None, feature_map=None, maf_map=None):
+        """
+        스트리밍 출력 모드: chunk_size 타일씩 feature → MAF → wobble → gapmer 판정까지 끝내고
+        바로 파일(CSV 또는 Arrow IPC)에 이어 쓴 뒤 버린다. 메모리는 전사체 길이가 아니라 chunk_size 에 비례한다.
+        cofold_map / maf_map 이 없으면 cofold 와 MAF 는 청크마다 그 청크의 타일만 계산한다.
+        SNP 구간과 (Gquad, CpG, GC_Content) 표는 (주어지지 않으면) 청크 루프 전에 한 번만 만든다.
+        파일 이름과 컬럼은 process_main(to_csv=True) 과 같고, 결과 대신 쓴 파일 경로를 반환한다.
+        """
+        ext = "csv" if fmt == "csv" else "arrow"
+        paths = {"default": self._output_path(output_path, wobble, ext=ext)}
+        if gapmer_filtered:
+            paths["gapmer"] = self._output_path(output_path, wobble, suffix="_gapmer_filtered", ext=ext)
+        n = len(self.tiles)
+        assemblies = self.query_asm if self._wants("conservation") else []
+        with contextlib.ExitStack() as stack:
+            ex = stack.enter_context(self._executor(max_workers)) if (max_workers > 1 or (maf_map is None and assemblies)) else None
+            writers = {key: stack.enter_context(StreamingTableWriter(path, fmt=fmt, toString=True)) for key, path in paths.items()}
+            # 전사체 구간의 SNP 와 서열 feature 표는 한 번만 만들어 청크마다 잘라 쓴다
+            if snp_span is None and self._wants("CommonSNP"):
+                snp_span = self.snp_span()
+            if feature_map is None and self._wants("Gquad", "CpG", "GC_Content"):
+                feature_map = self.feature_table()
+            for lo in range(0, n, chunk_size):
+                hi = min(lo + chunk_size, n)
+                if max_workers > 1:
+                    builder = self._locinfo_parallel(ex, max_workers, cofold_map=cofold_map, lo=lo, hi=hi,
+                                                     snp_span=snp_span, feature_map=feature_map)
+                else:
+                    builder = ResultColumns.from_records(self._locinfo_range(self.tiles, lo, hi, cofold_map=cofold_map,
+                                                                             snp_span=snp_span, feature_map=feature_map), self.ref_asm)
+                for asm in assemblies:
+                    if maf_map is not None:
+                        maf_results = maf_map[asm][lo:hi]
+                    else:
+                        tasks = self._span_tasks(self.txn_tiles[lo:hi], _n_batches(hi - lo, max_workers), asm)
+                        maf_results = [r for span in ex.map(_query_span, tasks) for r in unpack_results(span)]
+                    builder.add_assembly(asm, maf_results, self._editdistance_batch(maf_results))
+                    builder.add_wobble(asm, anti_strand=self.anti, wobble=wobble)
+                columns = builder.to_dict()
+                writers["default"].write(columns)
+                if gapmer_filtered:
+                    writers["gapmer"].write(gapmer(result=columns, middle_size=10, gapmer_coord='', target_assembly=self.query_asm))
+                print(f"[stream] {hi}/{n} tiles")
+        return paths
+
+    @staticmethod
+    def _editdistance_batch(results):
+        """_editdistance_safe 의 배치 버전: 컴파일된 커널로 모든 결과의 편집 거리를 한 번에 계산."""
+        humans, mafs = [], []
+        for res in results:
+            try:
+                human, maf = res.values()
+                human, maf = human.upper(), maf.upper()
+            except Exception:
+                human, maf = None, None
+            humans.append(human)
+            mafs.append(maf)
+        return average_edit_distance_batch(humans, mafs)
+
     @staticmethod
     def _editdistance_safe(res):
         try:
@@ -206,31 +812,32 @@ class ASOdesign:
             return None
     
     
-    def getlocInfo(self, loc, sequence):
+    def getlocInfo(self, loc, sequence, cofold=None, snp_span=None, features=None, region=None):
         try:
             #sequence = loc.twoBitFrag().upper()
             
             locStr   = loc.toString()
-            loc_tmp = locus(f'{loc.chrom}:{loc.chrSta+1}-{loc.chrEnd-1}{loc.strand}')
-            #flagL = [ e[3] for e in loc_tmp.regionType()]
-            h_tmp = {self.transInfo['chrom']: [self.transInfo]}
-            flagL = [ e[3] for e in getRegionType(h_tmp, loc_tmp)]
-            flag = []
+            # 선택하지 않은 feature 는 계산하지 않고 결과에서도 뺀다 (self.features)
+            flag = regionT = homo = mono = gquad = cpg = gc = snp_data = None
+            if region is not None:
+                # RegionAnnotator 로 미리 구한 (Type, RegionType)
+                flag, regionT = region
+            elif self._wants("Type", "RegionType"):
+                loc_tmp = locus(f'{loc.chrom}:{loc.chrSta+1}-{loc.chrEnd-1}{loc.strand}')
+                #flagL = [ e[3] for e in loc_tmp.regionType()]
+                h_tmp = {self.transInfo['chrom']: [self.transInfo]}
+                flag = type_flag(getRegionType(h_tmp, loc_tmp))
+                #regionT = '/'.join(map(str, loc.regionType())) #test
+                regionT = region_string(getRegionType(h_tmp, loc)) #test
+            if self._wants("Homo_Dimer", "Monomer"):
+                homo, mono = cofold if cofold is not None else RNAcofold2(sequence)
             
-            for a in flagL:
-                #print(a[0][0])
-                if (('cds' in a[0][0]) or ('utr' in a[0][0])): #exon flag ['cds','utr']
-                    flag.append('e') 
-                elif 'int' in a[0][0] : #intron
-                    flag.append('i')
+            if self._wants("Gquad", "CpG", "GC_Content"):
+                gquad, cpg, gc = features if features is not None else (containGquad2(sequence), countCpG(sequence), GCcontent(sequence))
             
-            #regionT = '/'.join(map(str, loc.regionType())) #test
-            regionT = '/'.join(map(str, getRegionType(h_tmp, loc))) #test
-            homo, mono = RNAcofold2(sequence)
-            
-            flag = ':'.join(flag)
             #self.t0 = time.time()
-            snp_data = containCommonSNP(loc, self.cSNP)
+            if self._wants("CommonSNP"):
+                snp_data = snp_span.query(loc) if snp_span is not None else containCommonSNP(loc, self.cSNP)
             #self.endtime = self.endtime+ (time.time() - self.t0)
             #'type','gene','transcriptID','locus','sequence','length','regionType','commonSNP','Gquad','CpG','GC_content','Homo_dimer','Monomer'
             a = {"Type": flag,
@@ -238,11 +845,13 @@ class ASOdesign:
                     "TranscriptID": self.transInfo['transID'],
                     "ASO_Locus": locStr, "ASO_Sequence": sequence, "Length": len(sequence), "RegionType": regionT,#test
                     "CommonSNP": snp_data,
-                    "Gquad": containGquad2(sequence),
-                    "CpG": countCpG(sequence),
-                    "GC_Content": GCcontent(sequence),
+                    "Gquad": gquad,
+                    "CpG": cpg,
+                    "GC_Content": gc,
                     "Homo_Dimer": homo, "Monomer": mono
                     }
+            if len(self.features) < len(ALL_FEATURES):
+                a = {k: v for k, v in a.items() if k not in FEATURE_COLUMNS or k in self.features}
             
             return a
         except Exception as e:
@@ -250,63 +859,6 @@ class ASOdesign:
             return e.args
         
     
-    def _flatten_dict(self, data):
-        """
-        Flatten a list of dictionaries into a single dictionary.
-        #support to this typo [{type: i:e}, {type: i:i}] -> {type: [i:e, i:i]}
-        """
-        try:
-            if isinstance(data, dict):
-                raise Exception
-            #result = defaultdict(list); [result[k].append(v) for d in data for k, v in d.items()]
-            # ❶ 결과를 담을 defaultdict 생성
-            result = defaultdict(list)
-            # 1) 모든 레코드에서 등장한 키 수집
-            keys, seen = [], set()
-            for rec in data:
-                if rec is None:
-                    continue
-                for k in rec:
-                    if k not in seen:
-                        seen.add(k)
-                        keys.append(k)
-
-            # 2) 각 위치에 맞춰 값 채워 넣기
-            result = defaultdict(list)
-            for rec in data:
-                for k in keys:
-                    value = None if (rec is None) else rec.get(k, None)
-                    result[k].append(value)
-            return dict(result)
-        except Exception as e:
-            #print(traceback.format_exc())
-            #print(e.args)
-            return data
-    
-    def _sort_dict(self, result):
-        remake_output_result = {}
-        for _assembbly in result.keys():
-            remake_output_assembly = {}
-            for _key in result[_assembbly].keys():
-                flattened_result = self._flatten_dict(result[_assembbly][_key]) 
-                if _key == "coverage":
-                    if not flattened_result or isinstance(flattened_result, list):
-                        flattened_result = {f"coverage_{_assembbly}": result[_assembbly][_key]}
-                    else:
-                        flattened_result = {f"coverage_{_assembbly}": flattened_result} # using editdistance
-                elif _key == "maf_seq":
-                    #if isinstance(flattened_result, dict):
-                    if not any(x is not None for x in flattened_result):
-                        flattened_result = {"hg38": result[_assembbly][_key], _assembbly: result[_assembbly][_key]}
-                    flattened_result={f"{_key}_{_assembbly}": (flattened_result["hg38"], flattened_result[_assembbly])}
-                    _list1, _list2 = flattened_result[f"{_key}_{_assembbly}"]  # 튜플을 풀어서 리스트 2개로 나눔
-                    assert len(_list1) == len(_list2), "두 리스트의 길이가 다릅니다."
-                    flattened_result[f"{_key}_{_assembbly}"] = [f"{a}:{b}" for a, b in zip(_list1, _list2)]
-                #print(_assembbly,flattened_result)
-                remake_output_assembly.update(flattened_result)
-            remake_output_result[_assembbly] = remake_output_assembly
-        return remake_output_result
-    
     def apply_df(self, result_dict):
         """
         Convert the result dictionary to a DataFrame.
@@ -322,6 +874,92 @@ class ASOdesign:
             print(e.args)
             return e.args
 
+def check_k_range(k_min, k_max):
+    if k_min > k_max:
+        raise ValueError("k_min should be less than or equal to k_max")
+    if k_min < 17 or k_max < 17:
+        raise ValueError("k_min and k_max should be greater than or equal to 17")
+    if k_max > 25:
+        raise ValueError("k_max should be less than or equal to 25")
+
+
+def _checkpoint_params(transid, design_kwargs):
+    """
+    체크포인트 조각의 값을 정하는 설정. 이 값이 같아야 이전 실행의 조각을 다시 쓴다.
+    입력 파일(refFlat, MAF, dbSNP / SNP 인덱스) 은 경로가 같아도 이름 / 크기 / 수정 시각이 바뀌면 다른 설정으로 본다.
+    """
+    features = select_features(design_kwargs.get("features"))
+    ref_assembly = design_kwargs.get("ref_assembly", "hg38")
+    query_assembly = list(design_kwargs.get("query_assembly", ["mm39"]))
+    maf_backend = design_kwargs.get("maf_backend", "maf")
+    return {"transid": transid, "ref_assembly": ref_assembly, "query_assembly": query_assembly,
+            "features": sorted(features), "maf_backend": maf_backend,
+            "maf_fingerprint": {asm: maf_fingerprint(design_kwargs["maf_dir"], ref_assembly, asm, maf_backend)
+                                for asm in query_assembly} if "conservation" in features else {},
+            "refFlat": path_fingerprint(design_kwargs.get("refFlat_path")),
+            "snp": {"dbsnp": path_fingerprint(design_kwargs.get("dbsnp_path")),
+                    "dbsnp_index": path_fingerprint(design_kwargs.get("dbsnp_index_path")),
+                    "snp_index_dir": path_fingerprint(design_kwargs.get("snp_index_dir")),
+                    "snp_mode": design_kwargs.get("snp_mode", "records")} if "CommonSNP" in features else {}}
+
+
+def design_transcript(transid, tile_lengths, context=None, design_kwargs=None, max_workers=1, lazy=False,
+                      checkpoint_dir=None, **process_kwargs):
+    """
+    전사체 하나의 모든 k (tile_lengths) 를 처리한다. run_ASOdesign / batch.run_batch 가 함께 쓴다.
+    cofold / SNP / 서열 feature / MAF 표는 첫 k 에서 한 번만 만들어 모든 k 가 공유한다.
+    design_kwargs 는 ASOdesign 생성 인자, process_kwargs 는 process_main 인자.
+    checkpoint_dir 가 주어지면 <checkpoint_dir>/<transid>/ 에 MAF / getlocInfo 조각을 남기고,
+    같은 설정으로 다시 실행하면 끝난 조각은 건너뛰고 결과 파일을 조각에서 다시 만든다 (utils.checkpoint).
+    lazy 모드는 살아남은 타일만 계산해서 구간 조각이 없으므로 checkpoint_dir 와 함께 주면 ValueError.
+    stream 모드는 cofold / MAF 를 모든 타일에 대해 미리 구하지 않고 process_stream 이 청크마다 계산한다 (메모리가 청크 크기에 묶이도록).
+    청크 결과는 파일에 쓰고 버리므로 checkpoint_dir 와 함께 주면 역시 ValueError.
+    반환: [{"tile_length": k, "result": process_main 결과}, ...]
+    """
+    design_kwargs = design_kwargs or {}
+    if checkpoint_dir is not None and lazy:
+        raise ValueError("checkpoint_dir is not supported with lazy=True (lazy runs keep no per-chunk results)")
+    stream = process_kwargs.get("stream", False)
+    if checkpoint_dir is not None and stream:
+        raise ValueError("checkpoint_dir is not supported with stream=True (stream runs keep no per-chunk results)")
+    checkpoint = None
+    if checkpoint_dir is not None:
+        checkpoint = RunCheckpoint(os.path.join(checkpoint_dir, transid), _checkpoint_params(transid, design_kwargs))
+    result_list = []
+    cofold_map, snp_span, feature_map, maf_map = None, None, None, None
+    txn_locStr = None
+    for tile_length in tile_lengths:
+        aso = ASOdesign(transid=transid, tile_length=tile_length, context=context, **design_kwargs)
+        txn_locStr = f"{aso.chrom}:{aso.txnSta}-{aso.txnEnd-1}{aso.anti}"
+        if cofold_map is None and not (lazy or stream) and aso._wants("Homo_Dimer", "Monomer"):
+            # 모든 k 의 타일 서열을 모아 cofold 를 한 번에 계산
+            cofold_map = aso.cofold_table(tile_lengths, max_workers=max_workers)
+        if snp_span is None and aso._wants("CommonSNP"):
+            # SNP 도 전사체 구간을 한 번만 읽어서 모든 k 가 공유
+            snp_span = aso.snp_span()
+        if feature_map is None and (lazy or aso._wants("Gquad", "CpG", "GC_Content")):
+            feature_map = aso.feature_table(tile_lengths)
+        if maf_map is None and context is not None and not (lazy or stream) and aso._wants("conservation"):
+            # MAF 블록도 구간마다 한 번만 읽고 모든 k 의 타일을 잘라낸다
+            maf_map = aso.maf_table(tile_lengths, max_workers=max_workers, checkpoint=checkpoint)
+
+        result = aso.process_main(max_workers=max_workers,
+                                  cofold_map=cofold_map,
+                                  snp_span=snp_span,
+                                  feature_map=feature_map,
+                                  maf_map={asm: maf_map[asm][tile_length] for asm in maf_map} if maf_map else None,
+                                  lazy=lazy,
+                                  checkpoint=checkpoint,
+                                  **process_kwargs)
+        if checkpoint is not None:
+            checkpoint.finish(tile_length)
+        result_list.append({"tile_length": tile_length, "result": result})
+    if context is not None and txn_locStr is not None:
+        # 끝난 전사체의 서열은 공유 캐시에서 내린다 (배치 실행에서 메모리가 쌓이지 않도록)
+        context.release_sequence(txn_locStr)
+    return result_list
+
+
 def run_ASOdesign(transid="NM_002415",
                   refFlat_path="/Users/dowonkim/Dropbox/data/UCSC/hg38/refFlat/refFlat_200817.txt",
                   maf_dir='/Users/dowonkim/Dropbox/data/offtarget_test/maf',
@@ -331,39 +969,65 @@ def run_ASOdesign(transid="NM_002415",
                   ref_assembly="hg38",
                   k_min=17, k_max=17,
                   chunk_division=5, max_workers=1, wobble=0, to_df=False, gapmer_filtered=True, to_csv=True,
-                  output_path=None):
+                  output_path=None, maf_backend="maf", snp_index_dir=None, snp_mode="records",
+                  shared_context=True, stream=False, stream_format="csv", stream_chunk_size=20000, output_format="csv",
+                  lazy=False, filters=None, features=None, locus_cache_dir=None, checkpoint_dir=None):
     """
     Run the ASOdesign process with default parameters.
+    shared_context=True 이면 refFlat/dbSNP/서열/워커 풀을 모든 k 가 공유하고,
+    MAF 는 구간마다 블록을 한 번만 읽어 k_min..k_max 결과를 한 번에 구한다.
+    stream=True 이면 결과를 메모리에 모으지 않고 stream_chunk_size 타일씩 파일(csv / ipc)에 이어 쓰고,
+    k 마다 쓴 파일 경로를 result 로 돌려준다.
+    output_format="parquet" / "ipc" 이면 CSV 대신 transcript / k / assembly 로 파티션된 데이터셋을 쓴다.
+    lazy=True 이면 값싼 필터(filters, gapmer_filtered 면 gap CpG) 를 먼저 적용하고 남은 타일만 cofold / MAF 를 계산한다
+    (모든 타일의 cofold / MAF 를 미리 구하지 않는다).
+    features 로 계산할 컬럼을 고르면 나머지 컬럼의 계산과 자원(dbSNP / ViennaRNA / MAF 풀)은 건너뛴다.
+    locus_cache_dir 를 주면 (shared_context=True 일 때) MAF 타일 결과를 게놈 좌표 기준 디스크 캐시에 두고
+    같은 구간을 타일링하는 다른 isoform / 전사체 실행이 다시 쓴다.
+    checkpoint_dir 를 주면 (k, 어셈블리, 구간) MAF 조각과 getlocInfo 구간을 <checkpoint_dir>/<transid>/ 에 끝나는 대로 남기고,
+    실패 후 같은 설정으로 다시 실행하면 남은 조각만 계산한다 (stream=True / lazy=True 와는 함께 쓸 수 없다).
+    locus_cache_dir 와 함께 주면 MAF 결과는 locus 캐시 블록으로만 남기고 체크포인트에는 getlocInfo 조각만 쓴다.
     """
     try:
-        if k_min > k_max:
-            raise ValueError("k_min should be less than or equal to k_max")
-        if k_min < 17 or k_max < 17:
-            raise ValueError("k_min and k_max should be greater than or equal to 17")
-        if k_max > 25:
-            raise ValueError("k_max should be less than or equal to 25")
+        check_k_range(k_min, k_max)
         t0   = time.time()
         mp.set_start_method("spawn", force=True)   # macOS/Linux 안전
-        result_list = []
-        for tile_length in range(k_min, k_max+1):
-            aso = ASOdesign(transid=transid,
-                            refFlat_path=refFlat_path,
-                            maf_dir=maf_dir,
-                            dbsnp_path =dbsnp_path,
-                            dbsnp_index_path=dbsnp_index_path,  # .csi 인덱스 자동 사용
-                            query_assembly=query_assembly,      # tuple/리스트 허용
-                            ref_assembly=ref_assembly,
-                            tile_length=tile_length)
-            
-            result = aso.process_main(chunk_division=chunk_division, max_workers=max_workers, wobble=wobble,
-                                        to_df=to_df,
-                                        gapmer_filtered=gapmer_filtered, 
-                                        to_csv=to_csv,
-                                        output_path=output_path)
-            result_list.append({"tile_length": tile_length, "result": result})
+        tile_lengths = list(range(k_min, k_max+1))
+        if shared_context:
+            context = ASOcontext(refFlat_path=refFlat_path, maf_dir=maf_dir,
+                                 dbsnp_path=dbsnp_path, dbsnp_index_path=dbsnp_index_path,
+                                 ref_assembly=ref_assembly, maf_backend=maf_backend,
+                                 snp_index_dir=snp_index_dir, snp_mode=snp_mode,
+                                 max_workers=max_workers, locus_cache_dir=locus_cache_dir)
+        else:
+            context = None
+        with context if context is not None else contextlib.nullcontext():
+            result_list = design_transcript(transid, tile_lengths, context=context,
+                                            design_kwargs=dict(refFlat_path=refFlat_path,
+                                                               maf_dir=maf_dir,
+                                                               dbsnp_path=dbsnp_path,
+                                                               dbsnp_index_path=dbsnp_index_path,
+                                                               query_assembly=query_assembly,
+                                                               ref_assembly=ref_assembly,
+                                                               maf_backend=maf_backend,
+                                                               snp_index_dir=snp_index_dir,
+                                                               snp_mode=snp_mode,
+                                                               features=features),
+                                            chunk_division=chunk_division, max_workers=max_workers, wobble=wobble,
+                                            to_df=to_df,
+                                            gapmer_filtered=gapmer_filtered,
+                                            to_csv=to_csv,
+                                            output_path=output_path,
+                                            stream=stream,
+                                            stream_format=stream_format,
+                                            stream_chunk_size=stream_chunk_size,
+                                            output_format=output_format,
+                                            lazy=lazy,
+                                            filters=filters,
+                                            checkpoint_dir=checkpoint_dir)
         print("Elapsed:", time.time() - t0, "sec")
         return result_list
     except Exception as e:
         print(traceback.format_exc())
         print(e.args)
-        return e.args
\ No newline at end of file
+        return e.args
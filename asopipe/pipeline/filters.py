@@ -0,0 +1,104 @@
+"""
+process_main(lazy=True) 에서 비싼 단계(MAF / cofold / dbSNP) 전에 타일을 거르는 필터 모듈입니다.
+
+필터마다 비용(cost)을 정해 두고, 값싼 필터부터 앞 필터를 통과한 타일에만 적용한다.
+  - gap_cpg_filter   (cost 1) : gap 에 CpG 가 없는 타일 (gapmer_filtered=True 이면 자동으로 들어간다)
+  - gquad_filter     (cost 2) : G-quadruplex 가 없는 타일
+  - gc_filter        (cost 2) : GC_Content 가 [lo, hi] 인 타일
+  - snp_filter       (cost 5) : CommonSNP 가 없는 타일
+predicate 는 TileSubset 을 받아 타일별 bool 배열(True = 남김)을 돌려준다.
+"""
+import numpy as np
+
+from asopipe.pipeline.gapmer import gap_cpg_mask
+
+
+class TileSubset:
+    """
+    TileSet 에서 살아남은 타일들 (idx = TileSet 인덱스, 오름차순).
+    서열 / locus / (Gquad, CpG, GC_Content) 는 처음 쓸 때 만든다.
+    """
+
+    def __init__(self, tileset, idx, feature_map=None, snp_span=None):
+        self.tileset = tileset
+        self.idx = np.asarray(idx, dtype=np.int64)
+        self.feature_map = feature_map
+        self.snp_span = snp_span
+        self._seqs = None
+        self._loci = None
+
+    def __len__(self):
+        return len(self.idx)
+
+    @property
+    def seqs(self):
+        if self._seqs is None:
+            self._seqs = [self.tileset.seq(i) for i in self.idx.tolist()]
+        return self._seqs
+
+    @property
+    def loci(self):
+        if self._loci is None:
+            self._loci = [self.tileset.locus(i) for i in self.idx.tolist()]
+        return self._loci
+
+    def features(self):
+        """타일별 (Gquad, CpG, GC_Content). feature_map (ASOdesign.feature_table) 에서 꺼낸다."""
+        return [self.feature_map[seq] for seq in self.seqs]
+
+    def take(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        sub = TileSubset(self.tileset, self.idx[mask], self.feature_map, self.snp_span)
+        if self._seqs is not None:
+            sub._seqs = [s for s, keep in zip(self._seqs, mask) if keep]
+        if self._loci is not None:
+            sub._loci = [l for l, keep in zip(self._loci, mask) if keep]
+        return sub
+
+
+class TileFilter:
+    """이름, 비용, predicate(TileSubset) -> bool 배열."""
+
+    def __init__(self, name, cost, predicate):
+        self.name = name
+        self.cost = cost
+        self.predicate = predicate
+
+    def __call__(self, tiles):
+        return np.asarray(self.predicate(tiles), dtype=bool)
+
+    def __repr__(self):
+        return f"TileFilter({self.name!r}, cost={self.cost})"
+
+
+def gap_cpg_filter(middle_size=10, gapmer_coord=''):
+    return TileFilter('gap_cpg', 1, lambda tiles: ~gap_cpg_mask(tiles.seqs, [len(s) for s in tiles.seqs],
+                                                                 middle_size=middle_size, gapmer_coord=gapmer_coord))
+
+
+def gquad_filter():
+    return TileFilter('gquad', 2, lambda tiles: [not gquad for gquad, _, _ in tiles.features()])
+
+
+def gc_filter(lo=0.0, hi=1.0):
+    return TileFilter('gc', 2, lambda tiles: [lo <= gc <= hi for _, _, gc in tiles.features()])
+
+
+def snp_filter():
+    def predicate(tiles):
+        if tiles.snp_span is None:
+            raise ValueError("snp_filter requires the 'CommonSNP' feature")
+        return [not tiles.snp_span.query(loc) for loc in tiles.loci]
+    return TileFilter('snp', 5, predicate)
+
+
+def apply_filters(tiles, filters, verbose=True):
+    """비용이 낮은 필터부터 차례로 적용해 남은 TileSubset 을 반환."""
+    for f in sorted(filters, key=lambda f: f.cost):
+        if not len(tiles):
+            break
+        n = len(tiles)
+        tiles = tiles.take(f(tiles))
+        if verbose:
+            print(f"[filter] {f.name} (cost {f.cost}): {n} -> {len(tiles)} tiles")
+    return tiles
@@ -1,5 +1,9 @@
 import traceback
 
+import numpy as np
+
+from asopipe.utils.align.maf_th import encode_seqs
+
 
 def filter_gapmer(result, species_prefix="gapmer_filtered",
                        keep_rule=None):
@@ -29,19 +33,22 @@ def filter_gapmer(result, species_prefix="gapmer_filtered",
     if not all(isinstance(v, list) and len(v) == n for v in result.values()):
         raise ValueError("모든 리스트의 길이가 일치해야 합니다.")
 
-    # 3) keep_rule 기본값: 한 개라도 True → keep
+    # 3) keep_rule 기본값 (None): 한 개라도 True → keep
+    # 4) keep_mask 계산 (기본 규칙은 종 컬럼을 쌓아서 한 번에)
     if keep_rule is None:
-        keep_rule = lambda vals: any(vals)
+        keep_mask = np.zeros(n, dtype=bool)
+        for k in species_keys:
+            keep_mask |= np.fromiter(map(bool, result[k]), dtype=bool, count=n)
+    else:
+        keep_mask = [
+            bool(keep_rule([result[k][i] for k in species_keys]))
+            for i in range(n)
+        ]
 
-    # 4) keep_mask 계산
-    keep_mask = [
-        bool(keep_rule([result[k][i] for k in species_keys]))
-        for i in range(n)
-    ]
-
-    # 5) 마스킹 적용 후 새 dict 반환
+    # 5) 마스킹 적용 후 새 dict 반환 (남는 행 인덱스만 꺼낸다)
+    keep_idx = np.flatnonzero(keep_mask).tolist()
     return {
-        k: [v for v, keep in zip(lst, keep_mask) if keep]
+        k: [lst[i] for i in keep_idx]
         for k, lst in result.items()
     }
 
@@ -93,51 +100,127 @@ def flaten_list(t):
     # [[a,b], [c,d]] -> [a,b,c,d]
     return [e for st in t for e in st]
 
-def gapmer(result, middle_size=10, gapmer_coord='',target_assembly=["mm39"]):
-    print(f"#gapmer filter start: target_assembly: {target_assembly}")
-    wingcoordL = _getWingCoord(result=result, middle_size=middle_size, gapmer_coord=gapmer_coord)
+def _wing_table(lengths, middle_size=10, gapmer_coord=''):
+    """
+    _getWingCoord 의 배열 버전. 타일마다 최대 두 개의 (wing 좌표, gap 구간) 을 배열로 돌려준다.
+      - wings : [(w0, w1, w2) 배열 3개] 리스트 (두 번째는 홀수 길이 타일만 has2=True)
+      - gaps  : [(gap 시작, gap 끝) 배열] 리스트, sequence[w0:-w2] 와 같은 구간 (w2 == 0 이면 빈 구간)
+    """
+    L = np.asarray(lengths, dtype=np.int64)
+    short = np.flatnonzero(L < middle_size)
+    if short.size:
+        raise ValueError(f"Sequence Length is {L[short[0]]}")
+    if gapmer_coord != '':
+        w0, w1, w2 = (np.full(len(L), int(c), dtype=np.int64) for c in gapmer_coord.split('_'))
+        wings = [(w0, w1, w2)]
+        has2 = np.zeros(len(L), dtype=bool)
+    else:
+        s_size = (L - middle_size) // 2
+        odd = (L % 2 == 1)
+        l_size = s_size + odd                       # 짝수면 양쪽 wing 이 같다
+        m = np.full(len(L), middle_size, dtype=np.int64)
+        wings = [(s_size, m, l_size), (l_size, m, s_size)]
+        has2 = odd
+    gaps = [(w0, np.where(w2 > 0, L - w2, w0)) for w0, _, w2 in wings]
+    return wings, gaps, has2
+
+
+def _gap_cpg(sequences, gaps, has2):
+    """gap 서열 (대소문자 무시) 에 'CG' 가 있는 타일 마스크. CG 시작 위치의 누적 개수로 구간마다 한 번에 센다."""
+    S, _ = encode_seqs(sequences)
+    S = S | 0x20                                    # 소문자로 (C/G 비교만 하므로 다른 문자는 상관없다)
+    cg = (S[:, :-1] == ord('c')) & (S[:, 1:] == ord('g'))
+    P = np.zeros(S.shape, dtype=np.int32)           # P[i, j] = j 보다 앞에서 시작하는 CG 개수
+    P[:, 1:] = np.cumsum(cg, axis=1)
+    rows = np.arange(len(S))
+    mask = np.zeros(len(S), dtype=bool)
+    for n, (a, b) in enumerate(gaps):
+        last = np.clip(b - 1, 0, S.shape[1] - 1)
+        first = np.clip(a, 0, S.shape[1] - 1)
+        hit = (b - 1 > a) & (P[rows, last] - P[rows, first] > 0)
+        mask |= hit if n == 0 else (hit & has2)
+    return mask
+
+
+def _wobble_bits(wobbles, dtype):
+    """
+    wobble dict → (GU_humanC 가 있는지, GU_humanC 위치 비트마스크, 나머지 클래스 위치 비트마스크).
+    wobble 이 False / 빈 dict 이거나 GU_humanC 가 비어 있으면 첫 값이 False.
+    """
+    n = len(wobbles)
+    has_gu = np.zeros(n, dtype=bool)
+    gu = np.zeros(n, dtype=dtype)
+    other = np.zeros(n, dtype=dtype)
+    for i, w in enumerate(wobbles):
+        if not w or not w["GU_humanC"]:
+            continue
+        has_gu[i] = True
+        gu_bits = 0
+        for pos in w["GU_humanC"]:
+            gu_bits |= 1 << pos
+        other_bits = 0
+        for k, v in w.items():
+            if k != 'GU_humanC':
+                for pos in v:
+                    other_bits |= 1 << pos
+        gu[i], other[i] = gu_bits, other_bits
+    return has_gu, gu, other
+
+
+def gap_cpg_mask(sequences, lengths, middle_size=10, gapmer_coord=''):
+    """gap 서열에 CpG 가 있는 타일 마스크 (서열만 보는 값싼 판정, gapmer 에서 항상 탈락)."""
+    _, gaps, has2 = _wing_table(lengths, middle_size=middle_size, gapmer_coord=gapmer_coord)
+    return _gap_cpg(sequences, gaps, has2) if len(lengths) else np.zeros(0, dtype=bool)
+
+
+def gapmer_mask(result, middle_size=10, gapmer_coord='', target_assembly=["mm39"]):
+    """
+    gapmer() 의 판정만: ({asm: gapmer_filtered bool 배열}, gapmer_coords 문자열).
+    result 에는 ASO_Sequence / Length / coverage_<asm> / wobble_<asm> 컬럼만 있으면 된다.
+    """
+    lengths = result["Length"]
+    n = len(lengths)
+    wings, gaps, has2 = _wing_table(lengths, middle_size=middle_size, gapmer_coord=gapmer_coord)
+    gap_cpg = _gap_cpg(result["ASO_Sequence"], gaps, has2) if n else np.zeros(0, dtype=bool)
+
+    # wing 밖 (gap 구간 [w0, w0+w1)) 비트마스크: 어느 wing 좌표에서든 gap 에 GU_humanC 가 있으면 탈락
+    width = int(max(lengths, default=0))
+    dtype = np.uint64 if width < 64 else object
+    gap_bits = np.zeros(n, dtype=dtype)
+    for k, (w0, w1, _) in enumerate(wings):
+        if dtype is object:
+            bits = np.array([((1 << int(b)) - 1) << int(a) for a, b in zip(w0, w1)] or [0] * n, dtype=object)
+        else:
+            bits = ((np.uint64(1) << w1.astype(np.uint64)) - np.uint64(1)) << w0.astype(np.uint64)
+        gap_bits |= bits if k == 0 else np.where(has2, bits, 0).astype(dtype)
+
+    # gapmer_coords 는 (기존과 같이) 마지막 타일의 wing 좌표 문자열
+    coords = ''
+    if n:
+        last_wings = [w for k, w in enumerate(wings) if k == 0 or has2[-1]]
+        coords = ":".join('_'.join(str(int(c[-1])) for c in wing) for wing in last_wings)
 
     # test conservation
+    masks = {}
     for assembly in target_assembly:
-        #print(f"assembly: {assembly}")
-        gapmer_filtered = []
-        for _coverage, _wobble, coords in zip(result[f"coverage_{assembly}"], result[f"wobble_{assembly}"], wingcoordL):
-            # test gap CpG
-            gapL= [True for _item in [item[1].upper() for item in coords if item!=None] if "CG" in _item ]
-            gap_condition = True if True in gapL else False
-            wingL= [item[0] for item in coords if item!=None]
-            
-            if gap_condition:
-                gapmer_filtered.append(False)
-                continue
-            if str(_coverage) == "0"  or str(_coverage) == "None": # coverage값이 없을때만 가능 
-                if not _wobble or not _wobble["GU_humanC"]:
-                    gapmer_filtered.append(False)
-                    continue   
-                # GU_humanC에 값이 있다는 전제조건
-                # no wobble in gap site
-                #elif any([wing_coord[0]<=i<wing_coord[0]+wing_coord[1] for i in _wobble['GU_humanC']]): 
-                if any(
-                    wing_coord[0] <= i < wing_coord[0] + wing_coord[1]
-                    for i in _wobble['GU_humanC']
-                    for wing_coord in wingL
-                    ):
-                    gapmer_filtered.append(False)
-                    continue
-                # GU_humanC외 다른 것을 합쳐서 중복을 제거하고 길이를 GU_humanC의 길이만큼 빼고 측정했을 때 0보다 크다면 contiune 
-                # 그렇다면 두개가 동일한 길이면 0이니까 통과할 수 있음 
-                # no additional wobble site
-                if len(set(flaten_list([v for k,v in _wobble.items() if k != 'GU_humanC'])) - set(_wobble['GU_humanC'])) > 0: 
-                    gapmer_filtered.append(False)
-                    continue    
-                gapmer_filtered.append(True)
-            else:
-                # distnace가 있다는 것이기에 true로 처리
-                gapmer_filtered.append(True)
-                continue
-        result[f"gapmer_filtered_{assembly}"] = gapmer_filtered
-        result[f'gapmer_coords_{assembly}'] = [ ":".join(['_'.join(map(str, wing_coord)) for wing_coord in wingL])] * len(gapmer_filtered)
+        cov_zero = np.fromiter((str(c) == "0" or str(c) == "None" for c in result[f"coverage_{assembly}"]), dtype=bool, count=n)
+        has_gu, gu, other = _wobble_bits(result[f"wobble_{assembly}"], dtype)
+        wobble_ok = has_gu & ((gu & gap_bits) == 0) & ((other & ~gu) == 0)
+        masks[assembly] = ~gap_cpg & (~cov_zero | wobble_ok)
+    return masks, coords
+
+
+def gapmer(result, middle_size=10, gapmer_coord='',target_assembly=["mm39"]):
+    """
+    gap 에 CpG 가 없고, 어셈블리마다 (coverage 가 0 이 아니거나 / GU_humanC wobble 만 wing 에 있는) 타일을 남긴다.
+    gapmer_filtered_<asm> / gapmer_coords_<asm> 컬럼을 result 에 붙이고, 한 어셈블리라도 통과한 행만 남긴 dict 를 반환.
+    모든 타일과 어셈블리를 배열 연산으로 한 번에 판정한다 (gapmer_mask).
+    """
+    print(f"#gapmer filter start: target_assembly: {target_assembly}")
+    masks, coords = gapmer_mask(result, middle_size=middle_size, gapmer_coord=gapmer_coord, target_assembly=target_assembly)
+    n = len(result["Length"])
+    for assembly in target_assembly:
+        result[f"gapmer_filtered_{assembly}"] = masks[assembly].tolist()
+        result[f'gapmer_coords_{assembly}'] = [coords] * n
     result = filter_gapmer(result, species_prefix="gapmer_filtered", keep_rule=None)
     return result
-
-     
\ No newline at end of file
@@ -5,6 +5,7 @@ import os
 import traceback
 import collections
 
+import numpy as np
 from io import TextIOWrapper
 from bx import interval_index_file
 import bx.align.maf
@@ -96,6 +97,101 @@ def check_wobble(r, q, anti_strand="-", wob=2):
         return False
 
 
+_GAP = ord('-')
+_A, _C, _G, _T = (ord(b) for b in 'ACGT')
+# upper() / compl() 에 해당하는 uint8 룩업 테이블
+_UPPER_LUT = np.arange(256, dtype=np.uint8)
+_UPPER_LUT[ord('a'):ord('z') + 1] -= 32
+_COMPL_LUT = np.arange(256, dtype=np.uint8)
+for _b, _c in zip('ACGT', 'TGCA'):
+    _COMPL_LUT[ord(_b)] = ord(_c)
+
+
+def encode_seqs(seqs, width=None):
+    """
+    문자열 리스트를 0 으로 패딩한 고정 폭 uint8 배열로 바꿉니다. (check_wobble_batch 입력용)
+
+    Returns
+    -------
+    (numpy.ndarray[uint8] (N, W), numpy.ndarray[bool] (N,))
+        인코딩된 배열과 None 이 아닌 항목 마스크
+    """
+    valid = np.fromiter((s is not None for s in seqs), dtype=bool, count=len(seqs))
+    encoded = [s.encode('ascii') if s is not None else b'' for s in seqs]
+    if width is None:
+        width = max((len(s) for s in encoded), default=0)
+    arr = np.array(encoded, dtype=f'S{max(width, 1)}')
+    return arr.view(np.uint8).reshape(len(seqs), max(width, 1)), valid
+
+
+def _rstrip_len(arr):
+    """행마다 뒤쪽 '-' 와 패딩을 제외한 길이 (str.rstrip('-') 후 len)."""
+    keep = (arr != 0) & (arr != _GAP)
+    last = arr.shape[1] - np.argmax(keep[:, ::-1], axis=1)
+    return np.where(keep.any(axis=1), last, 0)
+
+
+def check_wobble_batch(r_arr, q_arr, anti_strand="-", wob=2, valid=None):
+    """
+    check_wobble 의 배치 버전. 모든 타일 쌍을 고정 폭 uint8 배열로 받아
+    불일치 마스크와 네 가지 wobble 클래스를 배열 연산으로 한 번에 계산합니다.
+
+    Parameters
+    ----------
+    r_arr, q_arr : numpy.ndarray[uint8] (N, W)  # encode_seqs 결과 (0 패딩)
+    anti_strand : str
+    wob : int
+    valid : numpy.ndarray[bool] (N,) or None   # False 인 행은 r/q 가 None 인 경우
+
+    Returns
+    -------
+    list
+        타일마다 check_wobble 과 동일한 dict 또는 False
+    """
+    width = max(r_arr.shape[1], q_arr.shape[1])
+    R = np.zeros((len(r_arr), width), dtype=np.uint8)
+    Q = np.zeros((len(q_arr), width), dtype=np.uint8)
+    R[:, :r_arr.shape[1]] = _UPPER_LUT[r_arr]
+    Q[:, :q_arr.shape[1]] = _UPPER_LUT[q_arr]
+    if anti_strand == '+':
+        R, Q = _COMPL_LUT[R], _COMPL_LUT[Q]
+
+    r_len, q_len = _rstrip_len(R), _rstrip_len(Q)
+    in_seq = np.arange(width)[None, :] < r_len[:, None]
+    ok = (r_len == q_len)
+    ok &= ~((R == _GAP) & in_seq).any(axis=1)
+    ok &= ~((Q == _GAP) & in_seq).any(axis=1)
+    if valid is not None:
+        ok &= valid
+
+    mism = (R != Q) & in_seq
+    ok &= mism.sum(axis=1) <= wob
+
+    gu_humanC = mism & (((R == _C) & (Q == _T)) | ((R == _A) & (Q == _G)))
+    gu_otherC = mism & (((R == _T) & (Q == _C)) | ((R == _G) & (Q == _A)))
+    i_humanC = mism & (R == _C) & (Q != _G)
+    i_otherwise = mism & (R != _G) & (R != _C) & (Q != _G)
+    ok &= ~(mism & ~(gu_humanC | gu_otherC | i_humanC | i_otherwise)).any(axis=1)
+
+    classes = (('GU_humanC', gu_humanC), ('GU_otherC', gu_otherC),
+               ('I_humanC', i_humanC), ('I_otherwise', i_otherwise))
+    has_mism = mism.any(axis=1)
+    results = []
+    for i, (passed, any_mism, length) in enumerate(zip(ok.tolist(), has_mism.tolist(), r_len.tolist())):
+        if not passed:
+            results.append(False)
+            continue
+        wobble_dict = {key: [] for key, _ in classes}
+        if any_mism:
+            for key, mask in classes:
+                idx = np.flatnonzero(mask[i])
+                if anti_strand == '-' and idx.size:
+                    idx = (length - 1 - idx)[::-1]
+                wobble_dict[key] = idx.tolist()
+        results.append(wobble_dict)
+    return results
+
+
 def build_index(maf_file, species=None):
     """
     주어진 MAF 파일에 대해 인덱스 파일(maf_file.index)을 생성합니다.
@@ -135,13 +231,18 @@ class MultipleAlignmentReader:
           - ref_assembly: 기준 유전체 (기본: 'hg38')
           - query_assembly: 비교 대상 유전체 (예: 'macFas5' 또는 다른 값)
           - maf_dir: MAF 파일이 저장된 디렉토리. 지정하지 않으면 REFERENCE에서 동적으로 가져옴.
+          - backend: 'maf' (bx-python 인덱스 조회, 기본) 또는 'track' (maf_track.build_track 으로 만든 memory-mapped 트랙)
+          - track_dir: backend='track' 일 때 트랙 디렉토리 (기본: <maf_dir>/<ref>.<query>.synNet.track)
         """
-        options = {'ref_assembly': 'hg38', 'query_assembly': None, 'maf_dir': None}
+        options = {'ref_assembly': 'hg38', 'query_assembly': None, 'maf_dir': None,
+                   'backend': 'maf', 'track_dir': None}
         options.update(kwargs)
         
         self.ref_assembly = options['ref_assembly']
         self.query_assembly = options['query_assembly']
         self.maf_dir = options['maf_dir']
+        self.backend = options['backend']
+        self.track = None
         
         if not self.query_assembly:
             raise ValueError("query_assembly must be specified.")
@@ -156,7 +257,14 @@ class MultipleAlignmentReader:
         self.maf_file = os.path.join(self.maf_dir, f'{self.ref_assembly}.{self.query_assembly}.synNet.maf')
         self.index = collections.defaultdict(dict)
         
-        if self.query_assembly.lower() != 'macfas5':
+        if self.backend == 'track':
+            # 쿼리 시점에 bx-python 을 쓰지 않는 memory-mapped 트랙
+            from asopipe.utils.align.maf_track import MafTrack, default_track_dir
+            track_dir = options['track_dir'] or default_track_dir(self.maf_dir, self.ref_assembly, self.query_assembly)
+            self.track = MafTrack(track_dir)
+        elif self.backend != 'maf':
+            raise ValueError(f"Unknown backend {self.backend!r} – choose 'maf' or 'track'.")
+        elif self.query_assembly.lower() != 'macfas5':
             self.load_mafnidx(self.maf_file)
         else:
             # macFas5의 경우 염색체별로 인덱스를 개별적으로 로드
@@ -200,6 +308,8 @@ class MultipleAlignmentReader:
         결과:
           - 해당 영역의 정렬된 서열 정보를 포함하는 딕셔너리 (없는 경우 None)
         """
+        if self.track is not None:
+            return self.track.query(loc.chrom, loc.chrSta - 1, loc.chrEnd, verbose=verbose)
         idx = self._get_index(loc.chrom)
         region_name = f"{self.ref_assembly}.{loc.chrom}"
         s, e = loc.chrSta - 1, loc.chrEnd  # 0-base 좌표로 보정
@@ -231,46 +341,254 @@ class MultipleAlignmentReader:
         """
         fallback 메서드로, 영역 내의 각 베이스를 개별적으로 조회하여 정렬된 서열을 얻습니다.
         결과적으로 각 위치의 결과를 병합하여 전체 서열을 구성합니다.
+        영역에 겹치는 블록은 한 번만 읽고, 같은 블록에 속하는 베이스들은 한 번에 잘라서 병합합니다.
         """
-        idx = self._get_index(loc.chrom)
-        region_name = f"{self.ref_assembly}.{loc.chrom}"
         sta, end = loc.chrSta - 1, loc.chrEnd
-        
-        results = []
-        for pos in range(sta, end):
-            for alignment in idx.get(region_name, pos, pos + 1):
-                try:
-                    region_alignment = alignment.slice_by_component(region_name, pos, pos + 1)
-                except ValueError:
-                    continue
-                seqs_by_org = {}
-                for component in region_alignment.components:
-                    if component.src.startswith((self.ref_assembly, self.query_assembly)):
-                        seqs_by_org[component.src] = component.text
-                if not verbose:
-                    seqs_by_org = {k.split('.')[0]: v for k, v in seqs_by_org.items()}
-                
-                if len(seqs_by_org) < 2:
-                    results.append(None)
-                    break
-                results.append(seqs_by_org)
-                break
-        #print('results:', results)
-        if not results:
-            return None
-        if len(results) == 1:
-            return results[0]
-        
-        merged = results[0]
-        if not merged:
+        if self.track is not None:
+            return self.track.query_one_by_one(loc.chrom, sta, end, verbose=verbose)
+        return self.load_span(loc.chrom, sta, end, verbose=verbose).query_one_by_one(sta, end)
+
+    def load_span(self, chrom, start, end, verbose=True):
+        """
+        [start, end) (0-base) 구간에 겹치는 MAF 블록을 한 번만 읽어서 AlignmentSpan 으로 반환합니다.
+        """
+        idx = self._get_index(chrom)
+        region_name = f"{self.ref_assembly}.{chrom}"
+        return AlignmentSpan(idx.get(region_name, start, end), region_name, start, end,
+                             species=(self.ref_assembly, self.query_assembly), verbose=verbose)
+
+    def query_span(self, chrom, start, end, tile_length, verbose=False):
+        """
+        전사체 구간 전체를 한 번에 조회하는 sweep 모드입니다.
+        [start, end) (0-base) 구간의 블록을 한 번만 읽어 ref 좌표 → alignment column 맵을 만든 뒤,
+        tile_length 크기의 모든 타일(시작 좌표 start ~ end-tile_length)을 그 맵에서 잘라냅니다.
+        결과:
+          - 타일 순서대로 query() 와 동일한 딕셔너리(또는 None)의 리스트
+        """
+        if self.track is not None:
+            return self.track.tiles(chrom, start, end, tile_length, verbose=verbose)
+        return self.load_span(chrom, start, end, verbose=verbose).tiles(tile_length)
+
+    def query_span_multi(self, chrom, start, end, tile_lengths, verbose=False):
+        """
+        query_span 의 여러 tile_length 버전입니다. 블록은 한 번만 읽고 길이별로 타일을 잘라냅니다.
+        결과:
+          - {tile_length: query_span(chrom, start, end, tile_length) 와 같은 리스트}
+        """
+        if self.track is not None:
+            return {L: self.track.tiles(chrom, start, end, L, verbose=verbose) for L in tile_lengths}
+        span = self.load_span(chrom, start, end, verbose=verbose)
+        return {L: span.tiles(L) for L in tile_lengths}
+
+
+def _merge_pieces(pieces, n_covered):
+    """
+    블록별로 잘라 낸 조각(딕셔너리)들을 베이스 단위 병합과 같은 규칙으로 합칩니다.
+    n_covered 는 조각들이 덮는 ref 베이스 수이며, 1 이면 조각을 그대로 반환합니다.
+    값이 None 이거나 키가 맞지 않는 조각이 있으면 None 을 반환합니다.
+    """
+    if not pieces:
+        return None
+    if n_covered == 1:
+        return pieces[0]
+
+    merged = pieces[0]
+    if any(v is None for v in merged.values()):
+        return None
+    for d in pieces[1:]:
+        for key in merged.keys():
+            if d.get(key) is None:
+                return None
+    return {key: ''.join(d[key] for d in pieces) for key in merged.keys()}
+
+
+# pack_results 의 kind 코드
+_PACK_NONE, _PACK_REF, _PACK_QRY_NONE, _PACK_BOTH = 0, 1, 2, 3
+
+
+def pack_results(results, keys):
+    """
+    query() 결과(딕셔너리 또는 None) 리스트를 워커 → 부모 전송용 배열 묶음으로 바꿉니다.
+    keys = (ref 키, query 키). 결과마다 kind 코드와 고정 폭 bytes 배열 두 개(ref, query)로 담는다.
+      kind 0 = None, 1 = {ref}, 2 = {ref, query: None}, 3 = {ref, query}
+    이 형태가 아닌 결과가 있으면 리스트를 그대로 반환한다 (unpack_results 가 둘 다 받는다).
+    """
+    ref_key, qry_key = keys
+    kind = np.zeros(len(results), dtype=np.uint8)
+    refs, qrys = [], []
+    for i, res in enumerate(results):
+        ref, qry = b'', b''
+        if res is not None:
+            res_keys = list(res)
+            if res_keys == [ref_key]:
+                kind[i] = _PACK_REF
+            elif res_keys == [ref_key, qry_key]:
+                if res[qry_key] is None:
+                    kind[i] = _PACK_QRY_NONE
+                else:
+                    kind[i] = _PACK_BOTH
+                    qry = res[qry_key].encode('ascii')
+            else:
+                return results
+            if res[ref_key] is None:
+                return results
+            ref = res[ref_key].encode('ascii')
+        refs.append(ref)
+        qrys.append(qry)
+    return {'keys': keys, 'kind': kind,
+            'ref': np.array(refs, dtype='S'), 'qry': np.array(qrys, dtype='S')}
+
+
+def unpack_results(packed):
+    """pack_results 의 역변환. 리스트가 오면 그대로 반환."""
+    if isinstance(packed, list):
+        return packed
+    ref_key, qry_key = packed['keys']
+    results = []
+    for kind, ref, qry in zip(packed['kind'].tolist(), packed['ref'].tolist(), packed['qry'].tolist()):
+        if kind == _PACK_NONE:
+            results.append(None)
+        elif kind == _PACK_REF:
+            results.append({ref_key: ref.decode('ascii')})
+        elif kind == _PACK_QRY_NONE:
+            results.append({ref_key: ref.decode('ascii'), qry_key: None})
+        else:
+            results.append({ref_key: ref.decode('ascii'), qry_key: qry.decode('ascii')})
+    return results
+
+
+class _AlignmentBlock:
+    """
+    MAF 블록 하나에서 필요한 정보만 뽑아 둔 객체.
+      - start, end : ref 컴포넌트의 forward strand 좌표 (0-base, [start, end))
+      - cols       : ref 좌표(start ~ end) → alignment column 배열 (bx coord_to_col 과 동일)
+      - seqs       : query() 가 반환하는 키 → 컴포넌트 전체 text
+    """
+    __slots__ = ("start", "end", "cols", "minus", "seqs")
+
+    def __init__(self, alignment, region_name, species, verbose=True):
+        ref = alignment.get_component_by_src(region_name)
+        self.start = ref.get_forward_strand_start()
+        self.end = ref.get_forward_strand_end()
+        self.minus = ref.strand == "-"
+
+        text = np.frombuffer(ref.text.encode("ascii"), dtype=np.uint8)
+        if self.minus:
+            # bx 와 동일하게 - strand 는 한 칸 큰 column 을 가리키고 slice 시 양 끝을 뒤집는다
+            cols = (len(text) - np.flatnonzero(text[::-1] != ord("-")))
+            self.cols = np.append(cols, 0)
+        else:
+            self.cols = np.append(np.flatnonzero(text != ord("-")), len(text))
+
+        seqs_by_org = {}
+        for component in alignment.components:
+            if component.src.startswith(species):
+                seqs_by_org[component.src] = None if component.empty else component.text
+        if not verbose:
+            seqs_by_org = {k.split('.')[0]: v for k, v in seqs_by_org.items()}
+        self.seqs = seqs_by_org
+
+    @property
+    def complete(self):
+        return len(self.seqs) >= 2
+
+    def contains(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def slice(self, start, end):
+        c0, c1 = self.cols[start - self.start], self.cols[end - self.start]
+        if self.minus:
+            c0, c1 = c1, c0
+        return {k: (v[c0:c1] if v is not None else None) for k, v in self.seqs.items()}
+
+
+class AlignmentSpan:
+    """
+    한 구간에 겹치는 MAF 블록들을 메모리에 들고 있으면서,
+    그 안의 임의 구간을 MultipleAlignmentReader.query() / query_one_by_one() 과
+    동일한 결과로 잘라 주는 객체입니다. (idx.get 호출 없이 블록 재사용)
+    """
+
+    def __init__(self, alignments, region_name, start, end, species, verbose=True):
+        self.region_name = region_name
+        self.start, self.end = start, end
+        self.blocks = []
+        for alignment in alignments:
+            if alignment.get_component_by_src(region_name) is None:
+                continue
+            self.blocks.append(_AlignmentBlock(alignment, region_name, species, verbose=verbose))
+
+    def query(self, start, end):
+        """MultipleAlignmentReader.query() 와 동일 (좌표는 0-base [start, end))."""
+        for block in self.blocks:
+            if not block.contains(start, end):
+                continue
+            if not block.complete:
+                return self.query_one_by_one(start, end)
+            return block.slice(start, end)
+        return self.query_one_by_one(start, end)
+
+    def query_one_by_one(self, start, end):
+        """
+        MultipleAlignmentReader.query_one_by_one() 과 동일 (좌표는 0-base [start, end)).
+        각 베이스를 담당하는 첫 번째 블록을 배열로 배정한 뒤, 같은 블록이 이어지는 구간(run)을
+        한 번에 잘라 붙인다. 비용은 베이스 수가 아니라 블록 수에 비례한다.
+        """
+        n_pos = end - start
+        if n_pos <= 0:
             return None
-        
-        for d in results[1:]:
-            if not d:
+        owner = np.full(n_pos, -1, dtype=np.int64)
+        for bi, block in enumerate(self.blocks):
+            lo = max(block.start, start) - start
+            hi = min(block.end, end) - start
+            if hi > lo:
+                seg = owner[lo:hi]
+                seg[seg < 0] = bi
+
+        breaks = np.flatnonzero(np.diff(owner)) + 1
+        run_sta = np.concatenate(([0], breaks)).tolist()
+        run_end = np.concatenate((breaks, [n_pos])).tolist()
+
+        pieces, n_covered = [], 0
+        for rs, re_, bi in zip(run_sta, run_end, owner[run_sta].tolist()):
+            if bi < 0:
+                # 어떤 블록에도 없는 베이스는 원래 구현처럼 건너뛴다
+                continue
+            block = self.blocks[bi]
+            if not block.complete:
+                # 베이스 하나라도 None 이면 병합 결과는 None
                 return None
-            for key in merged.keys():
-                try:
-                    merged[key] += d[key]
-                except Exception:
-                    return None
-        return merged
+            if block.minus:
+                # - strand 기준 컴포넌트는 베이스 단위 조각을 이어 붙여야 결과가 같다
+                pieces.extend(block.slice(pos, pos + 1) for pos in range(start + rs, start + re_))
+            else:
+                pieces.append(block.slice(start + rs, start + re_))
+            n_covered += re_ - rs
+
+        return _merge_pieces(pieces, n_covered)
+
+    def tiles(self, tile_length):
+        """
+        span 안의 모든 tile_length 타일에 대한 query() 결과 리스트.
+        각 타일을 완전히 포함하는 첫 번째 블록을 배열 연산으로 한 번에 배정한다.
+        """
+        n_tiles = self.end - self.start - tile_length + 1
+        if n_tiles <= 0:
+            return []
+        owner = np.full(n_tiles, -1, dtype=np.int64)
+        for bi, block in enumerate(self.blocks):
+            lo = max(block.start, self.start) - self.start
+            hi = min(block.end, self.end) - tile_length - self.start + 1
+            if hi > lo:
+                seg = owner[lo:hi]
+                seg[seg < 0] = bi
+
+        results = []
+        for offset, bi in enumerate(owner.tolist()):
+            s = self.start + offset
+            block = self.blocks[bi] if bi >= 0 else None
+            if block is None or not block.complete:
+                results.append(self.query_one_by_one(s, s + tile_length))
+            else:
+                results.append(block.slice(s, s + tile_length))
+        return results
@@ -0,0 +1,300 @@
+"""
+synNet MAF 를 염색체별 memory-mapped 배열(per-base alignment track)로 미리 변환하고,
+그 배열만으로 MultipleAlignmentReader.query() 와 같은 결과를 돌려주는 모듈입니다.
+
+트랙 디렉토리 구성 (염색체마다):
+  - <chrom>.ref.npy      uint8[chrom_size] : ref 베이스가 놓인 column 의 ref 문자 (0 = 정렬 없음)
+  - <chrom>.qry.npy      uint8[chrom_size] : 같은 column 의 query 문자 ('-' = query 갭)
+  - <chrom>.blocks.npy   int64[n_block, 4] : (start, end, kind, qsrc_id), start 기준 정렬
+                         kind 0 = query 컴포넌트 없음, 1 = 있음, 2 = 빈(e) 컴포넌트
+  - <chrom>.ins_pos.npy  int64[n_ins]      : 삽입(ref 갭) column 이 뒤따르는 ref 좌표
+  - <chrom>.ins_off.npy  int64[n_ins+1]    : ins_seq 안의 오프셋
+  - <chrom>.ins_seq.npy  uint8[...]        : 삽입 column 의 query 문자
+  - meta.json            : 어셈블리, 염색체 목록, query src 이름, 원본 MAF 정보
+
+쿼리 시점에는 bx-python 을 쓰지 않으며, 여러 워커가 OS page cache 로 같은 페이지를 공유합니다.
+ref 컴포넌트는 + strand, 한 블록에는 종마다 컴포넌트가 하나(pairwise synNet)라고 가정합니다.
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+
+import bx.align.maf
+
+from asopipe.utils.align.maf_th import _merge_pieces
+
+_GAP = ord('-')
+
+
+def default_track_dir(maf_dir, ref_assembly, query_assembly):
+    return os.path.join(maf_dir, f'{ref_assembly}.{query_assembly}.synNet.track')
+
+
+def build_track(maf_files, track_dir, ref_assembly='hg38', query_assembly=None):
+    """
+    MAF 파일(들)을 읽어서 track_dir 에 염색체별 트랙을 만듭니다. (오프라인 1회 작업)
+
+    Parameters
+    ----------
+    maf_files : str or list of str
+    track_dir : str
+    ref_assembly : str
+    query_assembly : str
+    """
+    if not query_assembly:
+        raise ValueError("query_assembly must be specified.")
+    if isinstance(maf_files, str):
+        maf_files = [maf_files]
+    os.makedirs(track_dir, exist_ok=True)
+
+    chroms = {}
+    qsrc_names, qsrc_id = [], {}
+    n_overlap = 0
+    for maf_file in maf_files:
+        with open(maf_file) as f:
+            maf_reader = bx.align.maf.Reader(f)
+            for block in iter(lambda: next(maf_reader), None):
+                ref, qry = None, None
+                for component in block.components:
+                    species = component.src.split('.')[0]
+                    if species == ref_assembly and ref is None:
+                        ref = component
+                    elif species == query_assembly:
+                        qry = component
+                if ref is None or ref.empty or ref.size == 0:
+                    continue
+                if ref.strand == '-':
+                    raise ValueError(f"reference component on - strand is not supported: {ref.src}")
+
+                chrom = ref.src.split('.', 1)[1]
+                if chrom not in chroms:
+                    chroms[chrom] = _new_chrom(track_dir, chrom, ref.src_size)
+                c = chroms[chrom]
+                bs, be = ref.forward_strand_start, ref.forward_strand_end
+                if c['ref'][bs:be].any():
+                    # synNet 에서는 없어야 하는 경우. 먼저 나온 블록을 유지한다
+                    n_overlap += 1
+                    continue
+
+                if qry is None:
+                    kind, qid, qtext = 0, -1, None
+                else:
+                    kind, qtext = (2, None) if qry.empty else (1, qry.text)
+                    if qry.src not in qsrc_id:
+                        qsrc_id[qry.src] = len(qsrc_names)
+                        qsrc_names.append(qry.src)
+                    qid = qsrc_id[qry.src]
+                c['blocks'].append((bs, be, kind, qid))
+                _paint_block(c, bs, ref.text, qtext)
+
+    for chrom, c in chroms.items():
+        _finalize_chrom(track_dir, chrom, c)
+    if n_overlap:
+        print(f"[build_track] skipped {n_overlap} blocks overlapping an earlier block")
+
+    meta = {
+        'ref_assembly': ref_assembly,
+        'query_assembly': query_assembly,
+        'chroms': {chrom: int(c['size']) for chrom, c in chroms.items()},
+        'qsrc_names': qsrc_names,
+        'maf_files': [{'path': os.path.realpath(p), 'size': os.path.getsize(p),
+                       'mtime': os.path.getmtime(p)} for p in maf_files],
+    }
+    with open(os.path.join(track_dir, 'meta.json'), 'w') as out:
+        json.dump(meta, out, indent=1)
+    return track_dir
+
+
+def _new_chrom(track_dir, chrom, size):
+    path = os.path.join(track_dir, chrom)
+    return {
+        'size': size,
+        'ref': np.lib.format.open_memmap(f'{path}.ref.npy', mode='w+', dtype=np.uint8, shape=(size,)),
+        'qry': np.lib.format.open_memmap(f'{path}.qry.npy', mode='w+', dtype=np.uint8, shape=(size,)),
+        'blocks': [],
+        'ins': [],            # 블록별 (start, ins_pos, ins_len, ins_seq)
+    }
+
+
+def _paint_block(c, bs, rtext, qtext):
+    r = np.frombuffer(rtext.encode('ascii'), dtype=np.uint8)
+    nongap = r != _GAP
+    be = bs + int(nongap.sum())
+    c['ref'][bs:be] = r[nongap]
+    if qtext is None:
+        q = np.full(r.shape, _GAP, dtype=np.uint8)
+    else:
+        q = np.frombuffer(qtext.encode('ascii'), dtype=np.uint8)
+    c['qry'][bs:be] = q[nongap]
+
+    # 첫 ref 베이스 뒤에 나오는 ref 갭 column 은 바로 앞 ref 베이스에 붙는 삽입이다
+    first = int(np.argmax(nongap))
+    gap_cols = np.flatnonzero(~nongap)
+    gap_cols = gap_cols[gap_cols > first]
+    if gap_cols.size == 0:
+        return
+    owner = bs + np.cumsum(nongap)[gap_cols] - 1
+    ins_pos, ins_len = np.unique(owner, return_counts=True)
+    c['ins'].append((bs, ins_pos, ins_len, q[gap_cols].tobytes()))
+
+
+def _finalize_chrom(track_dir, chrom, c):
+    path = os.path.join(track_dir, chrom)
+    c['ref'].flush()
+    c['qry'].flush()
+    blocks = np.array(sorted(c['blocks']), dtype=np.int64).reshape(-1, 4)
+    np.save(f'{path}.blocks.npy', blocks)
+
+    ins = sorted(c['ins'], key=lambda x: x[0])
+    if ins:
+        ins_pos = np.concatenate([x[1] for x in ins])
+        ins_len = np.concatenate([x[2] for x in ins])
+        ins_seq = np.frombuffer(b''.join(x[3] for x in ins), dtype=np.uint8)
+    else:
+        ins_pos = np.zeros(0, dtype=np.int64)
+        ins_len = np.zeros(0, dtype=np.int64)
+        ins_seq = np.zeros(0, dtype=np.uint8)
+    np.save(f'{path}.ins_pos.npy', ins_pos.astype(np.int64))
+    np.save(f'{path}.ins_off.npy', np.concatenate(([0], np.cumsum(ins_len))).astype(np.int64))
+    np.save(f'{path}.ins_seq.npy', ins_seq)
+
+
+class _ChromTrack:
+    __slots__ = ("ref", "qry", "starts", "ends", "kind", "qsrc", "ins_pos", "ins_off", "ins_seq")
+
+    def __init__(self, track_dir, chrom):
+        path = os.path.join(track_dir, chrom)
+        self.ref = np.load(f'{path}.ref.npy', mmap_mode='r')
+        self.qry = np.load(f'{path}.qry.npy', mmap_mode='r')
+        blocks = np.load(f'{path}.blocks.npy')
+        self.starts, self.ends = blocks[:, 0], blocks[:, 1]
+        self.kind, self.qsrc = blocks[:, 2], blocks[:, 3]
+        self.ins_pos = np.load(f'{path}.ins_pos.npy', mmap_mode='r')
+        self.ins_off = np.load(f'{path}.ins_off.npy', mmap_mode='r')
+        self.ins_seq = np.load(f'{path}.ins_seq.npy', mmap_mode='r')
+
+
+class MafTrack:
+    """
+    build_track() 로 만든 트랙을 읽어 MultipleAlignmentReader 와 같은 형식의 결과를 반환합니다.
+    염색체 배열은 처음 조회할 때 memory-map 으로 연다.
+    """
+
+    def __init__(self, track_dir):
+        self.track_dir = track_dir
+        with open(os.path.join(track_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        self.ref_assembly = meta['ref_assembly']
+        self.query_assembly = meta['query_assembly']
+        self.chrom_sizes = meta['chroms']
+        self.qsrc_names = meta['qsrc_names']
+        self._chroms = {}
+
+    def _chrom(self, chrom):
+        if chrom not in self._chroms:
+            if chrom not in self.chrom_sizes:
+                self._chroms[chrom] = None
+            else:
+                self._chroms[chrom] = _ChromTrack(self.track_dir, chrom)
+        return self._chroms[chrom]
+
+    def _keys(self, chrom, qsrc, verbose):
+        if verbose:
+            return f'{self.ref_assembly}.{chrom}', self.qsrc_names[qsrc] if qsrc >= 0 else None
+        return self.ref_assembly, self.query_assembly
+
+    def _slice(self, t, chrom, bi, start, end, verbose, ref_bytes=None, qry_bytes=None, offset=0):
+        """블록 bi 안의 [start, end) 를 slice_by_component 결과와 같은 딕셔너리로 만든다."""
+        ref_key, qry_key = self._keys(chrom, int(t.qsrc[bi]), verbose)
+        kind = int(t.kind[bi])
+        if ref_bytes is None:
+            ref_bytes, qry_bytes, offset = t.ref[start:end].tobytes(), t.qry[start:end].tobytes(), start
+        r = ref_bytes[start - offset:end - offset]
+        q = qry_bytes[start - offset:end - offset]
+        i0, i1 = np.searchsorted(t.ins_pos, (start, end))
+        if i1 > i0:
+            r_parts, q_parts, prev = [], [], start
+            for pos, o0, o1 in zip(t.ins_pos[i0:i1].tolist(), t.ins_off[i0:i1].tolist(), t.ins_off[i0 + 1:i1 + 1].tolist()):
+                cut = pos + 1 - start
+                r_parts.append(r[prev - start:cut])
+                q_parts.append(q[prev - start:cut])
+                r_parts.append(b'-' * (o1 - o0))
+                q_parts.append(t.ins_seq[o0:o1].tobytes())
+                prev = pos + 1
+            r_parts.append(r[prev - start:])
+            q_parts.append(q[prev - start:])
+            r, q = b''.join(r_parts), b''.join(q_parts)
+        if kind == 0:
+            return {ref_key: r.decode('ascii')}
+        if kind == 2:
+            return {ref_key: r.decode('ascii'), qry_key: None}
+        return {ref_key: r.decode('ascii'), qry_key: q.decode('ascii')}
+
+    def query(self, chrom, start, end, verbose=True):
+        """MultipleAlignmentReader.query() 와 동일 (좌표는 0-base [start, end))."""
+        t = self._chrom(chrom)
+        if t is None:
+            return None
+        bi = int(np.searchsorted(t.starts, start, side='right')) - 1
+        if bi < 0 or end > t.ends[bi] or t.kind[bi] == 0:
+            return self.query_one_by_one(chrom, start, end, verbose=verbose)
+        return self._slice(t, chrom, bi, start, end, verbose)
+
+    def query_one_by_one(self, chrom, start, end, verbose=True):
+        """MultipleAlignmentReader.query_one_by_one() 과 동일 (좌표는 0-base [start, end))."""
+        t = self._chrom(chrom)
+        if t is None or end <= start:
+            return None
+        b0 = int(np.searchsorted(t.ends, start, side='right'))
+        b1 = int(np.searchsorted(t.starts, end, side='left'))
+        pieces, n_covered = [], 0
+        for bi in range(b0, b1):
+            if t.kind[bi] == 0:
+                return None
+            s, e = max(int(t.starts[bi]), start), min(int(t.ends[bi]), end)
+            pieces.append(self._slice(t, chrom, bi, s, e, verbose))
+            n_covered += e - s
+        return _merge_pieces(pieces, n_covered)
+
+    def tiles(self, chrom, start, end, tile_length, verbose=False):
+        """MultipleAlignmentReader.query_span() 과 동일: [start, end) 안의 모든 타일 결과 리스트."""
+        n_tiles = end - start - tile_length + 1
+        if n_tiles <= 0:
+            return []
+        t = self._chrom(chrom)
+        if t is None:
+            return [None] * n_tiles
+        tstarts = np.arange(start, start + n_tiles, dtype=np.int64)
+        bi = np.searchsorted(t.starts, tstarts, side='right') - 1
+        ok = bi >= 0
+        ok[ok] &= (tstarts[ok] + tile_length <= t.ends[bi[ok]]) & (t.kind[bi[ok]] != 0)
+
+        # span 전체를 한 번에 읽어 두고 타일마다 잘라 쓴다
+        ref_bytes, qry_bytes = t.ref[start:end].tobytes(), t.qry[start:end].tobytes()
+        results = []
+        for s, b, good in zip(tstarts.tolist(), bi.tolist(), ok.tolist()):
+            if good:
+                results.append(self._slice(t, chrom, b, s, s + tile_length, verbose,
+                                           ref_bytes=ref_bytes, qry_bytes=qry_bytes, offset=start))
+            else:
+                results.append(self.query_one_by_one(chrom, s, s + tile_length, verbose=verbose))
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped per-base alignment track from synNet MAF.")
+    parser.add_argument('--maf', nargs='+', required=True, help="MAF file(s), e.g. hg38.mm39.synNet.maf")
+    parser.add_argument('--ref-assembly', default='hg38')
+    parser.add_argument('--query-assembly', required=True)
+    parser.add_argument('--out', default=None, help="track directory (default: <maf_dir>/<ref>.<query>.synNet.track)")
+    args = parser.parse_args()
+    out = args.out or default_track_dir(os.path.dirname(os.path.realpath(args.maf[0])),
+                                        args.ref_assembly, args.query_assembly)
+    build_track(args.maf, out, ref_assembly=args.ref_assembly, query_assembly=args.query_assembly)
+    print(f"[build_track] {out}")
+
+
+if __name__ == "__main__":
+    main()
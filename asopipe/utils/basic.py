@@ -91,24 +91,41 @@ def _processBlatLine(line):
     """
     tokL = line.rstrip().split('\t')
 
+    exnList = list(map(lambda x,y: (int(x),int(y)), tokL[9].split(',')[:-1], tokL[10].split(',')[:-1]))
+    geneName = tokL[12] if len(tokL) > 12 else None
+
+    return _makeBlatRecord(tokL[0], tokL[1], tokL[2], tokL[3], int(tokL[4]), int(tokL[5]),
+                           int(tokL[6]), int(tokL[7]), exnList, geneName)
+
+
+def _makeBlatRecord(transName, transID, chrom, strand, txnSta, txnEnd, cdsSta, cdsEnd, exnList, geneName=None):
+    """
+    user not use this method
+    _processBlatLine 의 필드 값으로 같은 딕셔너리를 만든다. (RefFlatStore 에서도 사용)
+
+    Results
+    -------
+    h : dictionary
+
+    """
     h = {}
 
-    h['transName'] = tokL[0]
-    h['transID'] = tokL[1]
-    h['chrom'] = tokL[2]
-    h['chrNum'] = tokL[2][3:]
-    h['strand'] = tokL[3]
-    h['txnSta'] = int(tokL[4])
-    h['txnEnd'] = int(tokL[5])
+    h['transName'] = transName
+    h['transID'] = transID
+    h['chrom'] = chrom
+    h['chrNum'] = chrom[3:]
+    h['strand'] = strand
+    h['txnSta'] = txnSta
+    h['txnEnd'] = txnEnd
     h['txnLen'] = h['txnEnd'] - h['txnSta']
-    h['cdsSta'] = int(tokL[6])
-    h['cdsEnd'] = int(tokL[7])
-    h['exnList'] = list(map(lambda x,y: (int(x),int(y)), tokL[9].split(',')[:-1], tokL[10].split(',')[:-1]))
+    h['cdsSta'] = cdsSta
+    h['cdsEnd'] = cdsEnd
+    h['exnList'] = exnList
     h['exnLenList'] = [e-s for (s,e) in h['exnList']]
     h['exnLen'] = sum(h['exnLenList'])
 
-    if len(tokL) > 12:
-        h['geneName'] = tokL[12]
+    if geneName is not None:
+        h['geneName'] = geneName
 
     h['cdsList'] = []
     frontL, backL = [],[]
@@ -0,0 +1,16 @@
+"""
+디스크 캐시(RNAcofold 결과, 게놈 구간 MAF 결과)를 둘 기본 디렉토리를 정하는 모듈입니다.
+
+저장소 / 설치 디렉토리 안에 쓰지 않도록 사용자 캐시 디렉토리 아래에 둔다.
+  $ASOPIPE_CACHE_DIR/<name>                     (설정한 경우)
+  ${XDG_CACHE_HOME:-~/.cache}/asopipe/<name>    (기본)
+spawn 으로 뜬 워커도 같은 환경 변수를 물려받으므로 부모와 같은 디렉토리를 쓴다.
+"""
+import os
+
+
+def user_cache_dir(name):
+    root = os.environ.get("ASOPIPE_CACHE_DIR")
+    if not root:
+        root = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "asopipe")
+    return os.path.join(root, name)
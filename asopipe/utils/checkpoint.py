@@ -0,0 +1,141 @@
+"""
+긴 전사체 실행을 조각(chunk) 단위로 디스크에 남겨 두고, 같은 설정으로 다시 실행하면 끝난 조각은 건너뛰는 체크포인트 모듈입니다.
+
+실행 디렉토리 구성 (전사체마다 하나):
+  <run_dir>/manifest.json                                : 실행 설정(params) / 끝난 조각 키 / 끝난 k
+  <run_dir>/k=<k>/assembly=<asm>/tiles-<a>-<b>.pkl       : 0-base 시작 좌표 [a, b) 타일의 MAF 결과 (pack_results 묶음)
+  <run_dir>/k=<k>/locinfo/tiles-<a>-<b>.pkl              : 같은 타일들의 getlocInfo 컬럼 (ResultColumns)
+조각 키가 타일 좌표라서 max_workers 가 바뀌어 구간 경계가 달라지면 맞는 조각만 다시 쓰고 나머지는 새로 계산한다.
+조각 파일은 임시 파일에 쓴 뒤 이름을 바꾸고, 그 다음에 manifest 에 올리므로 중간에 죽어도 반쯤 쓴 조각은 쓰지 않는다.
+coverage / wobble / gapmer / 결과 파일은 값싸므로 저장하지 않고 다시 실행할 때 조각에서 새로 만든다.
+"""
+import os
+import json
+import pickle
+import threading
+import concurrent.futures
+
+
+def path_fingerprint(path):
+    """
+    입력 파일 / 디렉토리(refFlat 스토어, SNP 인덱스 등) 의 [이름, 크기, 수정 시각] 리스트. 디렉토리면 안의 파일마다.
+    체크포인트 params 에 넣어 입력이 바뀌면 이전 조각을 쓰지 않게 한다. path 가 None 이면 None.
+    """
+    if path is None:
+        return None
+    path = os.fspath(path)
+    if not os.path.exists(path):
+        return [[os.path.basename(path), -1, -1]]
+    if os.path.isdir(path):
+        files = sorted(os.path.join(root, f) for root, _, names in os.walk(path) for f in names)
+    else:
+        files = [path]
+    out = []
+    for p in files:
+        st = os.stat(p)
+        name = os.path.relpath(p, path) if p != path else os.path.basename(p)
+        out.append([name, st.st_size, st.st_mtime_ns])
+    return out
+
+
+def tile_key(k, part, start, stop):
+    """part = 어셈블리 이름 (MAF) 또는 'locinfo'."""
+    part = part if part == "locinfo" else f"assembly={part}"
+    return f"k={k}/{part}/tiles-{start}-{stop}"
+
+
+class RunCheckpoint:
+    """
+    run_dir 하나의 체크포인트.
+      - map(ex, fn, tasks, keys) : 끝난 조각은 읽고, 나머지만 ex (None 이면 현재 프로세스) 로 계산해 끝나는 대로 저장
+      - finish(k)                : k 하나의 결과 파일까지 다 썼다고 기록
+    params 가 기존 manifest 와 다르면 ValueError (다른 설정의 조각을 섞지 않는다).
+    """
+
+    def __init__(self, run_dir, params):
+        self.run_dir = run_dir
+        self.params = json.loads(json.dumps(params))   # JSON 으로 저장한 값과 비교할 수 있게 (tuple → list 등)
+        self.lock = threading.Lock()
+        self.manifest_path = os.path.join(run_dir, "manifest.json")
+        os.makedirs(run_dir, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["params"] != self.params:
+                raise ValueError(f"{run_dir} was created with different parameters "
+                                 f"({manifest['params']} != {self.params}); use another checkpoint directory")
+            self.done = set(manifest["chunks"])
+            self.finished = set(manifest["finished_k"])
+        else:
+            self.done, self.finished = set(), set()
+            self._write_manifest()
+        if self.done:
+            print(f"[checkpoint] {run_dir}: resuming, {len(self.done)} chunks done")
+
+    def _path(self, key):
+        return os.path.join(self.run_dir, f"{key}.pkl")
+
+    def _write_manifest(self):
+        tmp = f"{self.manifest_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"params": self.params, "chunks": sorted(self.done), "finished_k": sorted(self.finished)}, f)
+        os.replace(tmp, self.manifest_path)
+
+    def has(self, key):
+        return key in self.done
+
+    def load(self, key):
+        with open(self._path(key), "rb") as f:
+            return pickle.load(f)
+
+    def save(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp", path)
+        with self.lock:
+            self.done.add(key)
+            self._write_manifest()
+
+    def finish(self, k):
+        with self.lock:
+            self.finished.add(k)
+            self._write_manifest()
+
+    def map(self, ex, fn, tasks, keys):
+        """
+        ex.map(fn, tasks) 처럼 task 순서대로 결과 리스트를 돌려준다.
+        keys[i] 가 문자열이면 결과 전체를, {k: key} 딕셔너리면 결과 {k: ...} 를 k 마다 따로 저장 / 읽는다.
+        """
+        results = [None] * len(tasks)
+        todo = []
+        for i, key in enumerate(keys):
+            if isinstance(key, dict):
+                if all(self.has(v) for v in key.values()):
+                    results[i] = {k: self.load(v) for k, v in key.items()}
+                    continue
+            elif self.has(key):
+                results[i] = self.load(key)
+                continue
+            todo.append(i)
+        if len(todo) < len(tasks):
+            print(f"[checkpoint] {len(tasks) - len(todo)}/{len(tasks)} chunks from {self.run_dir}")
+
+        def store(i, result):
+            key = keys[i]
+            if isinstance(key, dict):
+                for k, v in key.items():
+                    self.save(v, result[k])
+            else:
+                self.save(key, result)
+            results[i] = result
+
+        if ex is None:
+            for i in todo:
+                store(i, fn(tasks[i]))
+        else:
+            futures = {ex.submit(fn, tasks[i]): i for i in todo}
+            for fut in concurrent.futures.as_completed(futures):
+                store(futures[fut], fut.result())
+        return results
@@ -0,0 +1,243 @@
+"""
+타일 결과를 컬럼 단위로 모으는 모듈입니다.
+
+getlocInfo 결과(타일별 딕셔너리)와 어셈블리별 MAF 결과를 만들어지는 대로 컬럼 리스트에 채우고,
+숫자 컬럼 / coverage 는 값 배열과 None 마스크로, maf_seq_<asm> 의 ref / query 서열은 고정 폭 bytes 배열로
+따로 들고 있다가 내보낼 때만 "ref:query" 로 잇는다.
+to_dict() 는 process_main 의 기존 결과 딕셔너리와 같은 키 순서 / 값이고,
+to_dataframe() 은 같은 컬럼을 그 배열에서 바로 (복사 없이) DataFrame 으로 만든다.
+"""
+import numpy as np
+import pandas as pd
+
+from asopipe.utils.align.maf_th import check_wobble_batch
+
+# getlocInfo 의 선택 가능한 컬럼 (Gene / TranscriptID / ASO_Locus / ASO_Sequence / Length 는 항상 나온다)
+FEATURE_COLUMNS = ('Type', 'RegionType', 'CommonSNP', 'Gquad', 'CpG', 'GC_Content', 'Homo_Dimer', 'Monomer')
+# 이름 묶음: region (RegionAnnotator), snp (dbSNP), sequence (누적합 표), cofold (ViennaRNA),
+# conservation (어셈블리별 maf_seq / coverage / wobble, MAF 조회)
+FEATURE_GROUPS = {
+    'region': ('Type', 'RegionType'),
+    'snp': ('CommonSNP',),
+    'sequence': ('Gquad', 'CpG', 'GC_Content'),
+    'cofold': ('Homo_Dimer', 'Monomer'),
+    'conservation': ('conservation',),
+}
+ALL_FEATURES = frozenset(FEATURE_COLUMNS) | {'conservation'}
+# getlocInfo 결과 딕셔너리의 키 순서 (타일이 하나도 없을 때도 같은 컬럼을 내보내기 위해)
+LOCINFO_COLUMNS = ('Type', 'Gene', 'TranscriptID', 'ASO_Locus', 'ASO_Sequence', 'Length', 'RegionType',
+                   'CommonSNP', 'Gquad', 'CpG', 'GC_Content', 'Homo_Dimer', 'Monomer')
+
+
+def select_features(features=None):
+    """
+    컬럼 / 묶음 이름 리스트 → 계산할 컬럼 이름 집합. None 이면 전부 (기존 결과).
+    예) ['conservation', 'GC_Content'] → GC 와 MAF 만 계산한다.
+    """
+    if features is None:
+        return ALL_FEATURES
+    if isinstance(features, str):
+        features = [features]
+    selected = set()
+    for name in features:
+        if name in FEATURE_GROUPS:
+            selected.update(FEATURE_GROUPS[name])
+        elif name in ALL_FEATURES:
+            selected.add(name)
+        else:
+            raise ValueError(f"Unknown feature: {name} (choose from {sorted(ALL_FEATURES | set(FEATURE_GROUPS))})")
+    return frozenset(selected)
+
+
+# 숫자/불리언 컬럼: (값 배열, None 마스크) 로 들고 있는다
+_NUMERIC_DTYPES = {'Length': np.int64, 'CpG': np.int64, 'Gquad': np.bool_,
+                   'GC_Content': np.float64, 'Homo_Dimer': np.float64, 'Monomer': np.float64}
+# None 이 있는 숫자 컬럼을 DataFrame 에 넘길 때 쓰는 pandas 마스크 배열
+_MASKED_ARRAYS = {np.int64: pd.arrays.IntegerArray, np.float64: pd.arrays.FloatingArray, np.bool_: pd.arrays.BooleanArray}
+
+
+class _Column:
+    """
+    컬럼 하나. dtype 이 있으면 (값 배열, None 마스크) 조각들로, 없으면 파이썬 리스트로 들고 있는다.
+    숫자로 바꿀 수 없는 값이 들어오면 그때부터 리스트로 바꾼다.
+    """
+    __slots__ = ('dtype', 'parts', 'items')
+
+    def __init__(self, dtype=None):
+        self.dtype = dtype
+        self.parts = []     # [(values, null)]
+        self.items = []
+
+    def append(self, values):
+        values = list(values)
+        if self.dtype is not None:
+            null = np.fromiter((v is None for v in values), dtype=bool, count=len(values))
+            try:
+                arr = np.array([0 if v is None else v for v in values], dtype=self.dtype)
+            except (TypeError, ValueError):
+                arr = None
+            if arr is not None and arr.ndim == 1:
+                self.parts.append((arr, null))
+                return self
+            self._to_list()
+        self.items.extend(values)
+        return self
+
+    def pad(self, n):
+        """None 인 행 n 개."""
+        if self.dtype is None:
+            self.items.extend([None] * n)
+        else:
+            self.parts.append((np.zeros(n, dtype=self.dtype), np.ones(n, dtype=bool)))
+
+    def extend(self, other):
+        if self.dtype is not None and self.dtype == other.dtype:
+            self.parts.extend(other.parts)
+        else:
+            self._to_list()
+            self.items.extend(other.tolist())
+
+    def _to_list(self):
+        if self.dtype is not None:
+            self.items = self.tolist()
+            self.dtype, self.parts = None, []
+
+    def arrays(self):
+        """(값 배열, None 마스크). 조각은 처음 부를 때 하나로 합친다."""
+        if len(self.parts) != 1:
+            values = np.concatenate([v for v, _ in self.parts]) if self.parts else np.zeros(0, dtype=self.dtype)
+            null = np.concatenate([m for _, m in self.parts]) if self.parts else np.zeros(0, dtype=bool)
+            self.parts = [(values, null)]
+        return self.parts[0]
+
+    def tolist(self):
+        if self.dtype is None:
+            return self.items
+        values, null = self.arrays()
+        out = values.tolist()
+        for i in np.flatnonzero(null).tolist():
+            out[i] = None
+        return out
+
+    def to_pandas(self):
+        """DataFrame 컬럼: None 이 없으면 값 배열 그대로, 있으면 pandas 마스크 배열 (복사 없이)."""
+        if self.dtype is None:
+            return self.items
+        values, null = self.arrays()
+        return _MASKED_ARRAYS[self.dtype](values, null) if null.any() else values
+
+
+def _encode(seqs):
+    """서열 리스트 → (고정 폭 bytes 배열, None 마스크)."""
+    null = np.fromiter((s is None for s in seqs), dtype=bool, count=len(seqs))
+    return np.array([b'' if s is None else s.encode('ascii') for s in seqs], dtype='S'), null
+
+
+def _none_filled(seqs, null):
+    """None 자리를 b'None' 으로 채운 bytes 배열 (기존 str(None) 과 같은 값)."""
+    return np.where(null, b'None', seqs) if null.any() else seqs
+
+
+class ResultColumns:
+    """
+    ASOdesign 결과 컬럼 빌더.
+      - add_records(records)      : getlocInfo 딕셔너리 리스트 (None / 에러 결과는 모든 값이 None 인 행)
+      - extend(other)             : 다른 ResultColumns (워커가 만든 구간) 를 뒤에 붙인다
+      - add_assembly(asm, ...)    : 한 어셈블리의 MAF 결과 / coverage
+      - add_wobble(asm, ...)      : ref / query 서열 배열에서 바로 wobble 계산 (문자열 join/split 없이)
+    숫자 컬럼과 coverage 는 (값 배열, None 마스크), ref / query 서열은 고정 폭 bytes 배열과 None 마스크로 들고 있다.
+    """
+
+    def __init__(self, ref_assembly='hg38'):
+        self.ref_assembly = ref_assembly
+        self.n_rows = 0
+        self.columns = {}       # locInfo 컬럼 이름 -> _Column (키 순서 = 처음 나온 순서)
+        self.assemblies = {}    # asm -> {'ref', 'qry': (bytes 배열, None 마스크), 'coverage': _Column, 'wobble'}
+
+    @classmethod
+    def from_records(cls, records, ref_assembly='hg38', columns=()):
+        """columns: 레코드가 없어도 (이 순서로) 만들어 둘 컬럼 이름."""
+        builder = cls(ref_assembly)
+        for k in columns:
+            builder._add_column(k)
+        builder.add_records(records)
+        return builder
+
+    def _add_column(self, key):
+        if key not in self.columns:
+            self.columns[key] = _Column(_NUMERIC_DTYPES.get(key))
+            if self.n_rows:
+                self.columns[key].pad(self.n_rows)
+
+    def add_records(self, records):
+        records = [rec if isinstance(rec, dict) else None for rec in records]
+        for rec in records:
+            if rec is not None:
+                for k in rec:
+                    self._add_column(k)
+        for k, col in self.columns.items():
+            col.append(None if rec is None else rec.get(k) for rec in records)
+        self.n_rows += len(records)
+        return self
+
+    def extend(self, other):
+        for k in other.columns:
+            self._add_column(k)
+        for k, col in self.columns.items():
+            if k in other.columns:
+                col.extend(other.columns[k])
+            else:
+                col.pad(other.n_rows)
+        self.n_rows += other.n_rows
+        return self
+
+    def add_assembly(self, asm, maf_results, coverage):
+        """maf_results: 타일별 {ref: 서열, asm: 서열} 또는 None, coverage: 타일별 편집 거리."""
+        if len(maf_results) != self.n_rows or len(coverage) != self.n_rows:
+            raise ValueError(f"{asm}: {len(maf_results)} MAF results / {len(coverage)} coverage for {self.n_rows} tiles")
+        ref = _encode([None if d is None else d.get(self.ref_assembly) for d in maf_results])
+        qry = _encode([None if d is None else d.get(asm) for d in maf_results])
+        self.assemblies[asm] = {'ref': ref, 'qry': qry, 'coverage': _Column(np.int64).append(coverage), 'wobble': None}
+
+    def add_wobble(self, asm, anti_strand, wobble):
+        """check_wobble_batch 결과를 wobble_<asm> 컬럼으로. 서열이 없는 타일은 기존 "None:None" 과 같이 'None' 으로 본다."""
+        cols = self.assemblies[asm]
+        _human, _other = (_none_filled(*cols[key]) for key in ('ref', 'qry'))
+        cols['wobble'] = check_wobble_batch(_human.view(np.uint8).reshape(self.n_rows, _human.itemsize),
+                                            _other.view(np.uint8).reshape(self.n_rows, _other.itemsize),
+                                            anti_strand=anti_strand, wob=wobble)
+
+    def maf_seq(self, asm):
+        """maf_seq_<asm> 값 ("ref:query", 없는 쪽은 'None') 의 문자열 배열."""
+        cols = self.assemblies[asm]
+        ref, qry = (_none_filled(*cols[key]) for key in ('ref', 'qry'))
+        return np.char.add(np.char.add(ref, b':'), qry).astype(str)
+
+    def _assembly_columns(self, asm, to_pandas=False):
+        cols = self.assemblies[asm]
+        maf_seq = self.maf_seq(asm)
+        out = {f"maf_seq_{asm}": maf_seq if to_pandas else maf_seq.tolist(),
+               f"coverage_{asm}": cols['coverage'].to_pandas() if to_pandas else cols['coverage'].tolist()}
+        if cols['wobble'] is not None:
+            out[f"wobble_{asm}"] = cols['wobble']
+        return out
+
+    def to_dict(self):
+        """
+        process_main 결과 딕셔너리: locInfo 컬럼, 그 뒤로 어셈블리마다 maf_seq / coverage / wobble.
+        값은 리스트 (gapmer / save_csv_pyarrow 가 그대로 쓴다).
+        """
+        data = {k: col.tolist() for k, col in self.columns.items()}
+        for asm in self.assemblies:
+            data.update(self._assembly_columns(asm))
+        return data
+
+    def to_dataframe(self):
+        """
+        to_dict() 과 같은 컬럼의 DataFrame. 숫자 컬럼 / coverage 는 값 배열에서 바로 만든다
+        (None 이 있으면 pandas 마스크 배열 Int64 / Float64 / boolean).
+        """
+        frame = {k: col.to_pandas() for k, col in self.columns.items()}
+        for asm in self.assemblies:
+            frame.update(self._assembly_columns(asm, to_pandas=True))
+        return pd.DataFrame(frame, copy=False)
@@ -1,3 +1,21 @@
+import warnings
+
+import numpy as np
+
+#  Optional Numba backend ----------------------------------------------------
+# 설치가 깨진 경우(llvmlite / numpy 버전 불일치 등)는 ImportError 로 올라오고,
+# 컴파일(타입 추론 / lowering) 실패는 커널의 첫 호출에서 NumbaError 로 잡아서 순수 Python 구현으로 돌아간다.
+try:
+    from numba import njit, prange  # type: ignore
+    from numba.core.errors import NumbaError  # type: ignore
+
+    _HAS_NUMBA = True
+except ImportError:  # pragma: no cover
+    _HAS_NUMBA = False
+
+_compiled = set()   # 첫 호출(JIT 컴파일)을 통과한 커널 이름
+
+
 
 def levenshtein_distance(s1, s2, cost_sub=1, cost_ins=1, cost_del=1):
     """
@@ -62,4 +80,110 @@ def average_edit_distance(msa, cost_sub=1, cost_ins=1, cost_del=1):
             total_distance += d
             count += 1
     avg_distance = total_distance / count
-    return int(avg_distance)
\ No newline at end of file
+    return int(avg_distance)
+
+
+def _encode(seqs):
+    """문자열 리스트 → (0 패딩 uint8 배열 (N, W), 길이 배열). None 은 길이 0."""
+    encoded = [x.encode('ascii') if x is not None else b'' for x in seqs]
+    width = max(max((len(x) for x in encoded), default=0), 1)
+    arr = np.array(encoded, dtype=f'S{width}').view(np.uint8).reshape(len(encoded), width)
+    lens = np.fromiter((len(x) for x in encoded), dtype=np.int64, count=len(encoded))
+    return arr, lens
+
+
+if _HAS_NUMBA:
+
+    @njit(cache=True)
+    def _levenshtein_row(a, m, b, n, cost_sub, cost_ins, cost_del, prev, cur):
+        for j in range(n + 1):
+            prev[j] = j * cost_ins
+        for i in range(1, m + 1):
+            cur[0] = i * cost_del
+            for j in range(1, n + 1):
+                cost = 0 if a[i - 1] == b[j - 1] else cost_sub
+                v = prev[j] + cost_del
+                w = cur[j - 1] + cost_ins
+                if w < v:
+                    v = w
+                w = prev[j - 1] + cost
+                if w < v:
+                    v = w
+                cur[j] = v
+            for j in range(n + 1):
+                prev[j] = cur[j]
+        return prev[n]
+
+    @njit(cache=True)
+    def _levenshtein_batch(A, a_len, B, b_len, cost_sub, cost_ins, cost_del):
+        out = np.empty(A.shape[0], dtype=np.int64)
+        prev = np.empty(B.shape[1] + 1, dtype=np.int64)
+        cur = np.empty(B.shape[1] + 1, dtype=np.int64)
+        for k in range(A.shape[0]):
+            out[k] = _levenshtein_row(A[k], a_len[k], B[k], b_len[k], cost_sub, cost_ins, cost_del, prev, cur)
+        return out
+
+    @njit(cache=True, parallel=True)
+    def _levenshtein_batch_parallel(A, a_len, B, b_len, cost_sub, cost_ins, cost_del):
+        out = np.empty(A.shape[0], dtype=np.int64)
+        for k in prange(A.shape[0]):
+            prev = np.empty(B.shape[1] + 1, dtype=np.int64)
+            cur = np.empty(B.shape[1] + 1, dtype=np.int64)
+            out[k] = _levenshtein_row(A[k], a_len[k], B[k], b_len[k], cost_sub, cost_ins, cost_del, prev, cur)
+        return out
+
+
+def levenshtein_batch(seqs1, seqs2, cost_sub=1, cost_ins=1, cost_del=1, parallel=False):
+    """
+    levenshtein_distance 의 배치 버전. 두 서열 리스트의 같은 위치끼리 편집 거리를 계산합니다.
+    Numba 가 있으면 컴파일된 DP 커널(parallel=True 이면 prange 병렬 루프)을 사용하고,
+    없거나 커널의 첫 호출에서 컴파일에 실패하면 (RuntimeWarning 후) levenshtein_distance 를 순서대로 호출합니다.
+    컴파일 오류가 아닌 예외는 그대로 올린다.
+    (파이프라인의 타일 작업은 이미 워커 프로세스로 나뉘어 있어 parallel=False 로 부른다)
+
+    Parameters:
+      seqs1, seqs2 (list of str): 같은 길이의 서열 리스트
+      cost_sub, cost_ins, cost_del: edit distance 계산 시 각 연산의 비용
+      parallel (bool): Numba 병렬 루프 사용 여부
+
+    Returns:
+      numpy.ndarray[int64]: 쌍마다의 편집 거리
+    """
+    global _HAS_NUMBA
+    if len(seqs1) != len(seqs2):
+        raise ValueError("seqs1 and seqs2 must have the same length")
+    if _HAS_NUMBA:
+        A, a_len = _encode(seqs1)
+        B, b_len = _encode(seqs2)
+        kernel = _levenshtein_batch_parallel if parallel else _levenshtein_batch
+        args = (A, a_len, B, b_len, int(cost_sub), int(cost_ins), int(cost_del))
+        if kernel.__name__ in _compiled:
+            return kernel(*args)
+        try:
+            out = kernel(*args)
+        except NumbaError as e:
+            # JIT 컴파일 실패 (지원하지 않는 CPU / numba 버전 등) → 이후로는 순수 Python
+            warnings.warn(f"numba could not compile {kernel.__name__} ({type(e).__name__}: {e}); "
+                          f"using the pure Python levenshtein", RuntimeWarning)
+            _HAS_NUMBA = False
+        else:
+            _compiled.add(kernel.__name__)
+            return out
+    return np.array([levenshtein_distance(a, b, cost_sub, cost_ins, cost_del)
+                     for a, b in zip(seqs1, seqs2)], dtype=np.int64)
+
+
+def average_edit_distance_batch(seqs1, seqs2, cost_sub=1, cost_ins=1, cost_del=1, parallel=False):
+    """
+    정렬된 두 서열(ref, query) 쌍 리스트에 대해 average_edit_distance([s1, s2]) 와 같은 정수 값을 반환합니다.
+    어느 한 쪽이 None 인 쌍은 None 으로 채웁니다.
+
+    Returns:
+      list of int or None
+    """
+    valid = [a is not None and b is not None for a, b in zip(seqs1, seqs2)]
+    s1 = [a for a, ok in zip(seqs1, valid) if ok]
+    s2 = [b for b, ok in zip(seqs2, valid) if ok]
+    dists = iter(levenshtein_batch(s1, s2, cost_sub, cost_ins, cost_del, parallel=parallel).tolist())
+    # 서열 두 개의 평균 편집 거리 = 그 쌍의 편집 거리
+    return [next(dists) if ok else None for ok in valid]
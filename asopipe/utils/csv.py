@@ -17,10 +17,10 @@ def save_csv_std(data_dict, path):
 
 
 def save_csv_pyarrow(data_dict, path, toString=False):
+    # toString: wobble/CommonSNP 컬럼만 str() 로 바꾼 새 딕셔너리로 쓴다 (입력은 바꾸지 않는다)
     if toString:
-        for _key, _value in data_dict.items():
-            if 'wobble' in _key or 'CommonSNP' in _key:
-                data_dict[_key] = [str(_value_item) for _value_item in _value ]
+        data_dict = {_key: [str(_value_item) for _value_item in _value] if 'wobble' in _key or 'CommonSNP' in _key else _value
+                     for _key, _value in data_dict.items()}
 
     table = pa.Table.from_pydict(data_dict)
     pacsv.write_csv(
@@ -31,4 +31,70 @@ def save_csv_pyarrow(data_dict, path, toString=False):
     
 
 def save_csv_polars(data_dict, path):
-    pl.DataFrame(data_dict).write_csv(path)  
\ No newline at end of file
+    pl.DataFrame(data_dict).write_csv(path)  
+
+# 스트리밍 출력에서 컬럼 타입을 청크와 무관하게 고정하기 위한 이름 규칙 (나머지는 첫 청크에서 추론)
+_INT_COLUMNS = ('Length', 'CpG')
+_FLOAT_COLUMNS = ('GC_Content', 'Homo_Dimer', 'Monomer')
+_BOOL_COLUMNS = ('Gquad',)
+
+
+def _column_type(name, values):
+    if name in _INT_COLUMNS or name.startswith('coverage_'):
+        return pa.int64()
+    if name in _FLOAT_COLUMNS:
+        return pa.float64()
+    if name in _BOOL_COLUMNS or name.startswith('gapmer_filtered_'):
+        return pa.bool_()
+    inferred = pa.array(values).type
+    return pa.string() if pa.types.is_null(inferred) else inferred
+
+
+class StreamingTableWriter:
+    """
+    결과를 청크(컬럼 딕셔너리) 단위로 받아 RecordBatch 로 이어 쓰는 writer.
+    fmt = 'csv' (헤더는 처음 한 번) | 'ipc' (Arrow IPC 파일)
+    스키마는 첫 청크로 정하고, 이후 청크는 같은 스키마로 변환해서 쓴다.
+    toString=True 이면 save_csv_pyarrow 와 같이 wobble/CommonSNP 컬럼을 str() 로 바꾼다 (입력은 바꾸지 않는다).
+    """
+
+    def __init__(self, path, fmt='csv', toString=True):
+        if fmt not in ('csv', 'ipc'):
+            raise ValueError(f"fmt must be 'csv' or 'ipc' (Now: {fmt})")
+        self.path = path
+        self.fmt = fmt
+        self.toString = toString
+        self.schema = None
+        self._writer = None
+        self.n_rows = 0
+
+    def _open(self, data_dict):
+        self.schema = pa.schema([(k, _column_type(k, v)) for k, v in data_dict.items()])
+        if self.fmt == 'csv':
+            self._writer = pacsv.CSVWriter(self.path, self.schema,
+                                           write_options=pacsv.WriteOptions(include_header=True))
+        else:
+            self._writer = pa.ipc.new_file(self.path, self.schema)
+
+    def write(self, data_dict):
+        if self.toString:
+            data_dict = {k: ([str(x) for x in v] if ('wobble' in k or 'CommonSNP' in k) else v)
+                         for k, v in data_dict.items()}
+        if self._writer is None:
+            self._open(data_dict)
+        batch = pa.RecordBatch.from_arrays(
+            [pa.array(data_dict[f.name], type=f.type) for f in self.schema], schema=self.schema)
+        self._writer.write_batch(batch)
+        self.n_rows += batch.num_rows
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
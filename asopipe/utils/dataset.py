@@ -0,0 +1,145 @@
+"""
+ASOdesign 결과를 타입이 있는 Parquet / Arrow IPC 데이터셋으로 쓰는 모듈입니다.
+
+CSV(save_csv_pyarrow(toString=True)) 와 달리 wobble / CommonSNP 를 문자열로 바꾸지 않고 Arrow 중첩 타입으로 둔다.
+  - wobble    : struct<GU_humanC, GU_otherC, I_humanC, I_otherwise : list<int16>>, check_wobble 이 False 면 null
+  - CommonSNP : list<struct<chrom, pos, ref, alt, info: list<struct<key, value>>>> (snp_mode='records')
+                snp_mode='count' / 'bool' 이면 int64 / bool
+데이터셋 구성 (hive 파티션):
+  <root>/transcript=<transID>/k=<tile_length>/assembly=<asm>/part-0.(parquet|arrow)
+어셈블리마다 한 파일이고, 행은 타일 하나. 어셈블리별 컬럼(maf_seq_<asm> 등)은 접미사 없이
+maf_ref / maf_query / coverage / wobble (/ gapmer_filtered / gapmer_coords) 로 쓴다.
+어셈블리별 컬럼이 하나도 없으면 (features 에서 conservation 을 뺀 실행) 같은 행을 어셈블리마다 복사하지 않고
+assembly=__HIVE_DEFAULT_PARTITION__ (읽으면 assembly 가 null) 파티션 하나에만 쓴다.
+"""
+import os
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+DATASET_FORMATS = ('parquet', 'ipc')
+
+_WOBBLE_KEYS = ('GU_humanC', 'GU_otherC', 'I_humanC', 'I_otherwise')
+WOBBLE_TYPE = pa.struct([(k, pa.list_(pa.int16())) for k in _WOBBLE_KEYS])
+SNP_TYPE = pa.list_(pa.struct([('chrom', pa.string()), ('pos', pa.int64()), ('ref', pa.string()), ('alt', pa.string()),
+                               ('info', pa.list_(pa.struct([('key', pa.string()), ('value', pa.string())])))]))
+# 어셈블리별 컬럼 접두어 → 데이터셋 컬럼 이름 (maf_seq 는 maf_ref / maf_query 로 나눈다)
+_ASSEMBLY_COLUMNS = ('maf_seq', 'coverage', 'wobble', 'gapmer_filtered', 'gapmer_coords')
+# 어셈블리별 컬럼이 없는 결과의 파티션 값 (pyarrow hive 파티션의 null 값)
+NO_ASSEMBLY = '__HIVE_DEFAULT_PARTITION__'
+# 파티션 컬럼 타입 (assembly 가 모두 null 인 데이터셋도 읽을 수 있도록 추론하지 않고 고정)
+PARTITION_SCHEMA = pa.schema([('transcript', pa.string()), ('k', pa.int32()), ('assembly', pa.string())])
+
+
+def _info_value(value):
+    if isinstance(value, (tuple, list)):
+        return ','.join(map(str, value))
+    return None if value is None else str(value)
+
+
+def wobble_array(values):
+    """check_wobble(_batch) 결과 리스트 (dict 또는 False) → struct 배열."""
+    return pa.array([v if isinstance(v, dict) else None for v in values], type=WOBBLE_TYPE)
+
+
+def snp_array(values):
+    """CommonSNP 컬럼 → Arrow 배열. 레코드 리스트면 list<struct>, count / bool 모드면 그 스칼라 타입."""
+    if all(v is None or isinstance(v, (list, tuple)) for v in values):
+        return pa.array([None if v is None else
+                         [{'chrom': chrom, 'pos': pos, 'ref': ref, 'alt': alt,
+                           'info': [{'key': k, 'value': _info_value(val)} for k, val in info]}
+                          for chrom, pos, ref, alt, info in v]
+                         for v in values], type=SNP_TYPE)
+    return pa.array(values)
+
+
+def _split_maf_seq(values):
+    """"ref:query" 문자열 → (ref, query). 서열이 없던 쪽 ("None") 은 null."""
+    ref, qry = [], []
+    for v in values:
+        a, b = v.split(':', 1) if isinstance(v, str) else (None, None)
+        ref.append(None if a == 'None' else a)
+        qry.append(None if b == 'None' else b)
+    return pa.array(ref, type=pa.string()), pa.array(qry, type=pa.string())
+
+
+def _column_array(name, values):
+    if name == 'CommonSNP':
+        return snp_array(values)
+    if name == 'wobble':
+        return wobble_array(values)
+    if name == 'coverage':
+        return pa.array(values, type=pa.int64())
+    if isinstance(values, pa.Array):
+        return values
+    array = pa.array(values)
+    return array.cast(pa.string()) if pa.types.is_null(array.type) else array
+
+
+def _is_assembly_column(name, assemblies):
+    suffixes = tuple(f"_{a}" for a in assemblies)
+    return any(name.startswith(f"{c}_") and name.endswith(suffixes) for c in _ASSEMBLY_COLUMNS)
+
+
+def assembly_table(data, asm, assemblies):
+    """
+    process_main 결과 딕셔너리 (to_dict() 형식) 에서 asm 하나의 테이블.
+    다른 어셈블리의 컬럼은 빼고, asm 컬럼은 접미사를 떼어 쓴다.
+    """
+    columns = {}
+    for k, values in data.items():
+        if _is_assembly_column(k, assemblies):
+            if not k.endswith(f"_{asm}"):
+                continue
+            name = k[:-len(asm) - 1]
+            if name == 'maf_seq':
+                columns['maf_ref'], columns['maf_query'] = _split_maf_seq(values)
+                continue
+            columns[name] = values
+        else:
+            columns[k] = values
+    return pa.table({k: _column_array(k, v) for k, v in columns.items()})
+
+
+def partition_dir(root, transcript, tile_length, asm):
+    """asm=None 이면 어셈블리별 컬럼이 없는 결과의 파티션 (assembly=NO_ASSEMBLY)."""
+    return os.path.join(root, f"transcript={transcript}", f"k={tile_length}",
+                        f"assembly={NO_ASSEMBLY if asm is None else asm}")
+
+
+def write_result_dataset(data, root, transcript, tile_length, assemblies, fmt='parquet', compression='zstd'):
+    """
+    결과 딕셔너리를 어셈블리마다 파티션 파일 하나로 쓴다. 쓴 파일 경로 리스트를 반환.
+    어셈블리별 컬럼이 없으면 assembly=NO_ASSEMBLY 파티션 하나만 쓴다.
+    같은 (transcript, k, assembly) 파티션은 덮어쓴다.
+    """
+    if fmt not in DATASET_FORMATS:
+        raise ValueError(f"fmt must be one of {DATASET_FORMATS} (Now: {fmt})")
+    partitions = assemblies if any(_is_assembly_column(k, assemblies) for k in data) else [None]
+    paths = []
+    for asm in partitions:
+        table = assembly_table(data, asm, assemblies)
+        out_dir = partition_dir(root, transcript, tile_length, asm)
+        os.makedirs(out_dir, exist_ok=True)
+        if fmt == 'parquet':
+            path = os.path.join(out_dir, 'part-0.parquet')
+            pq.write_table(table, path, compression=compression)
+        else:
+            path = os.path.join(out_dir, 'part-0.arrow')
+            with pa.ipc.new_file(path, table.schema,
+                                 options=pa.ipc.IpcWriteOptions(compression=compression)) as writer:
+                writer.write_table(table)
+        paths.append(path)
+    return paths
+
+
+def read_result_dataset(root, fmt='parquet', columns=None, filter=None):
+    """
+    write_result_dataset() 으로 쓴 데이터셋을 읽는다 (transcript / k / assembly 는 파티션 컬럼).
+    어셈블리별 컬럼 없이 쓴 파티션의 행은 assembly 가 null 이다.
+    """
+    dataset = ds.dataset(root, format='parquet' if fmt == 'parquet' else 'ipc',
+                         partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'))
+    return dataset.to_table(columns=columns, filter=filter)
@@ -0,0 +1,132 @@
+"""
+게놈 좌표 기준으로 MAF 타일 결과를 저장해 두고, 같은 구간을 타일링하는 다른 전사체(isoform, 반대 가닥에서 겹치는 유전자)가
+다시 계산하지 않고 꺼내 쓰게 하는 디스크 캐시 모듈입니다.
+
+MAF 결과(query() 딕셔너리, coverage / wobble 의 입력인 ref / query 서열)는 타일의 게놈 좌표와 길이만으로 정해지고
+가닥과는 무관하므로, 키에 가닥은 넣지 않는다.
+  키 : ("maf", assembly, chrom, k, block, fingerprint)
+  값 : 0-base 시작 좌표가 [block * block_size, (block + 1) * block_size) 인 타일 block_size 개의 pack_results() 묶음
+블록은 전사체 경계와 상관없이 항상 꽉 채워 계산하므로, 경계가 다른 isoform 끼리도 같은 블록을 그대로 공유한다.
+fingerprint 는 해당 백엔드가 읽는 파일(maf: <ref>.<asm>.synNet.maf, track: 트랙 디렉토리 안의 파일)의
+이름 / 크기 / 수정 시각이라 그 파일이 바뀌면 새로 계산한다. 처음 조회할 때 만들어지는 .index 는 넣지 않는다.
+캐시 위치는 locus_cache_dir (기본: $ASOPIPE_CACHE_DIR/locus 또는 ~/.cache/asopipe/locus).
+
+cofold 는 rna.py 의 디스크 캐시(서열 키), Gquad / CpG / GC_Content 는 서열 누적합 표라 이미 위치와 무관하게 공유된다.
+dbSNP 는 캐시하지 않는다: 전사체마다 구간을 한 번만 읽고(CommonSNPSpan) 타일은 그 안에서 잘라 쓰므로
+읽는 비용이 캐시 블록을 풀어 쓰는 비용과 비슷하고, 미리 만든 SNP 인덱스(snp_index)는 이미 memory-mapped 이다.
+run_batch 의 전사체 스레드가 LocusCache 하나를 함께 쓰므로 Cache 열기 / fingerprint 계산은 lock 안에서 한 번만 한다.
+"""
+import os
+import hashlib
+import threading
+
+from diskcache import Cache
+
+from asopipe.utils.align.maf_th import unpack_results, macfas5_maf_dir
+from asopipe.utils.align.maf_track import default_track_dir
+from asopipe.utils.cache_dir import user_cache_dir
+
+LOCUS_CACHE_DIR = user_cache_dir("locus")
+
+
+def _backend_files(maf_dir, ref_assembly, asm, maf_backend):
+    """
+    MultipleAlignmentReader(backend=maf_backend) 가 asm 결과를 읽는 파일: (기준 디렉토리, 경로 리스트).
+    없는 파일도 경로는 넣는다 (나중에 생기면 fingerprint 가 바뀐다).
+    """
+    if maf_backend == "track":
+        track_dir = default_track_dir(maf_dir, ref_assembly, asm)
+        names = sorted(os.listdir(track_dir)) if os.path.isdir(track_dir) else []
+        return maf_dir, [os.path.join(track_dir, f) for f in names] or [track_dir]
+    if asm.lower() == "macfas5":
+        # macFas5 는 염색체별 <chrom>.maf
+        names = sorted(os.listdir(macfas5_maf_dir)) if os.path.isdir(macfas5_maf_dir) else []
+        return macfas5_maf_dir, [os.path.join(macfas5_maf_dir, f) for f in names if f.endswith(".maf")]
+    return maf_dir, [os.path.join(maf_dir, f"{ref_assembly}.{asm}.synNet.maf")]
+
+
+def maf_fingerprint(maf_dir, ref_assembly, asm, maf_backend="maf"):
+    """maf_backend 가 asm 에 대해 읽는 파일(.maf 또는 트랙 디렉토리 안의 파일)의 이름 / 크기 / 수정 시각 해시."""
+    h = hashlib.sha1(f"{ref_assembly}|{asm}|{maf_backend}".encode())
+    root, paths = _backend_files(maf_dir, ref_assembly, asm, maf_backend)
+    for p in paths:
+        st = os.stat(p) if os.path.exists(p) else None
+        h.update(f"{os.path.relpath(p, root)}|{st.st_size if st else -1}|{st.st_mtime_ns if st else -1}".encode())
+    return h.hexdigest()[:16]
+
+
+class LocusCache:
+    """
+    (assembly, chrom, k, block) 단위 MAF 타일 결과 캐시.
+      - blocks(start, stop)            : 0-base 타일 시작 좌표 [start, stop) 를 덮는 블록 번호들
+      - block_task(asm, chrom, b, ks)  : 블록 하나를 채울 _query_span_multi 작업
+      - get_maf / set_maf              : 블록 묶음 조회 / 저장
+      - maf_tiles(found, blocks, ...)  : 블록들에서 연속된 타일 결과 리스트를 잘라낸다
+    """
+
+    def __init__(self, directory=None, maf_dir=None, ref_assembly="hg38", maf_backend="maf",
+                 block_size=2048, size_limit=10 * 1024 ** 3):
+        self.directory    = directory or LOCUS_CACHE_DIR
+        self.maf_dir      = maf_dir
+        self.ref_asm      = ref_assembly
+        self.maf_backend  = maf_backend
+        self.block_size   = block_size
+        self.size_limit   = size_limit
+        self._cache       = None
+        self._fingerprints = {}
+        self._lock        = threading.Lock()
+
+    @property
+    def cache(self):
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    self._cache = Cache(directory=str(self.directory), size_limit=self.size_limit)
+        return self._cache
+
+    def fingerprint(self, asm):
+        if asm not in self._fingerprints:
+            with self._lock:
+                if asm not in self._fingerprints:
+                    self._fingerprints[asm] = maf_fingerprint(self.maf_dir, self.ref_asm, asm, self.maf_backend)
+        return self._fingerprints[asm]
+
+    def _key(self, asm, chrom, k, b):
+        return ("maf", asm, chrom, k, b, self.fingerprint(asm))
+
+    def blocks(self, start, stop):
+        return range(start // self.block_size, (stop - 1) // self.block_size + 1)
+
+    def block_task(self, asm, chrom, b, tile_lengths):
+        """블록 b 의 타일 block_size 개를 (모든 길이에 대해) 한 번에 읽는 작업 (asm, chrom, start, end, tile_lengths, n_tiles)."""
+        tile_lengths = sorted(tile_lengths)
+        a = b * self.block_size
+        return (asm, chrom, a, a + self.block_size - 1 + tile_lengths[-1], tile_lengths, [self.block_size] * len(tile_lengths))
+
+    def get_maf(self, asm, chrom, k, blocks):
+        """{block: packed} (캐시에 있는 블록만)."""
+        found = {}
+        with self.cache.transact():
+            for b in blocks:
+                hit = self.cache.get(self._key(asm, chrom, k, b), default=None)
+                if hit is not None:
+                    found[b] = hit
+        return found
+
+    def set_maf(self, asm, chrom, b, packed_by_k):
+        """_query_span_multi(block_task(...)) 결과 {k: packed} 를 저장."""
+        with self.cache.transact():
+            for k, packed in packed_by_k.items():
+                self.cache.set(self._key(asm, chrom, k, b), packed)
+
+    def maf_tiles(self, found, blocks, start, n):
+        """blocks 순서로 이어 붙인 타일들 중 0-base 시작 좌표 start 부터 n 개의 query() 결과 리스트."""
+        offset = start - blocks[0] * self.block_size
+        results = [r for b in blocks for r in unpack_results(found[b])]
+        return results[offset:offset + n]
+
+    def close(self):
+        with self._lock:
+            if self._cache is not None:
+                self._cache.close()
+            self._cache = None
@@ -0,0 +1,129 @@
+"""
+refFlat 텍스트를 한 번 컬럼형 바이너리(npy)로 바꿔두고, 전사체 하나만 필요할 때 바로 꺼내 쓰는 모듈입니다.
+
+저장 디렉토리 구성 (행은 transID, txnSta, txnEnd 순으로 정렬, 같은 키는 원본 파일 순서):
+  - transName.npy / transID.npy / chrom.npy / strand.npy / geneName.npy   S 배열
+  - has_gene.npy        bool[n]       : geneName 컬럼(13번째) 유무
+  - coords.npy          int64[n, 4]   : txnSta, txnEnd, cdsSta, cdsEnd
+  - exn_off.npy         int64[n+1]    : exn 배열 안의 오프셋
+  - exn.npy             int64[m, 2]   : exon (start, end)
+  - meta.json           : 행 수, blacklist, 원본 파일 정보
+
+RefFlatStore[transID] 는 loadBlatOutput(path, by='transID')[transID] 와 같은 딕셔너리 리스트를 돌려준다.
+배열은 처음 조회할 때 memory-map 으로 열고, transID 는 정렬된 배열에서 searchsorted 로 찾는다.
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+
+from asopipe.utils.basic import loadBlatOutput, _makeBlatRecord
+
+_STR_COLUMNS = ('transName', 'transID', 'chrom', 'strand', 'geneName')
+
+
+def build_refflat_store(refFlat_path, store_dir, blacklist=['NR_106988']):
+    """
+    refFlat 파일을 store_dir 에 컬럼형 배열로 저장합니다. (오프라인 1회 작업)
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    h = loadBlatOutput(refFlat_path, by='transID', blacklist=blacklist)
+    rows = [r for transID in sorted(h) for r in h[transID]]
+
+    cols = {c: [] for c in _STR_COLUMNS}
+    has_gene, coords, exn, exn_off = [], [], [], [0]
+    for r in rows:
+        for c in _STR_COLUMNS:
+            cols[c].append(r.get(c, '').encode('utf-8'))
+        has_gene.append('geneName' in r)
+        coords.append((r['txnSta'], r['txnEnd'], r['cdsSta'], r['cdsEnd']))
+        exn.extend(r['exnList'])
+        exn_off.append(len(exn))
+
+    for c in _STR_COLUMNS:
+        np.save(os.path.join(store_dir, f'{c}.npy'), np.array(cols[c], dtype=bytes))
+    np.save(os.path.join(store_dir, 'has_gene.npy'), np.array(has_gene, dtype=bool))
+    np.save(os.path.join(store_dir, 'coords.npy'), np.array(coords, dtype=np.int64).reshape(-1, 4))
+    np.save(os.path.join(store_dir, 'exn_off.npy'), np.array(exn_off, dtype=np.int64))
+    np.save(os.path.join(store_dir, 'exn.npy'), np.array(exn, dtype=np.int64).reshape(-1, 2))
+
+    meta = {
+        'n_rows': len(rows),
+        'blacklist': list(blacklist),
+        'refFlat': {'path': os.path.realpath(refFlat_path), 'size': os.path.getsize(refFlat_path),
+                    'mtime': os.path.getmtime(refFlat_path)},
+    }
+    with open(os.path.join(store_dir, 'meta.json'), 'w') as out:
+        json.dump(meta, out, indent=1)
+    return store_dir
+
+
+class RefFlatStore:
+    """
+    build_refflat_store() 로 만든 저장소를 transID 로 조회합니다.
+    loadBlatOutput 결과(defaultdict)처럼 없는 transID 는 빈 리스트를 돌려준다.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._arrays = {}
+
+    def _array(self, name):
+        if name not in self._arrays:
+            self._arrays[name] = np.load(os.path.join(self.store_dir, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+    def _rows(self, transID):
+        ids = self._array('transID')
+        key = transID.encode('utf-8')
+        return range(int(np.searchsorted(ids, key, side='left')), int(np.searchsorted(ids, key, side='right')))
+
+    def _record(self, i):
+        s = {c: self._array(c)[i].decode('utf-8') for c in _STR_COLUMNS}
+        txnSta, txnEnd, cdsSta, cdsEnd = self._array('coords')[i].tolist()
+        o0, o1 = self._array('exn_off')[i:i + 2].tolist()
+        exnList = [tuple(e) for e in self._array('exn')[o0:o1].tolist()]
+        geneName = s['geneName'] if self._array('has_gene')[i] else None
+        return _makeBlatRecord(s['transName'], s['transID'], s['chrom'], s['strand'],
+                               txnSta, txnEnd, cdsSta, cdsEnd, exnList, geneName)
+
+    def __getitem__(self, transID):
+        return [self._record(i) for i in self._rows(transID)]
+
+    def __contains__(self, transID):
+        return len(self._rows(transID)) > 0
+
+    def get(self, transID, default=None):
+        return self[transID] if transID in self else default
+
+    def __len__(self):
+        return self.meta['n_rows']
+
+
+def loadRefFlat(refFlat_path, by='transID'):
+    """
+    refFlat_path 가 build_refflat_store() 디렉토리면 RefFlatStore 를, 텍스트 파일이면 loadBlatOutput 결과를 반환.
+    """
+    if os.path.isdir(refFlat_path):
+        if by != 'transID':
+            raise ValueError(f"RefFlatStore supports by='transID' only (Now: {by})")
+        return RefFlatStore(refFlat_path)
+    return loadBlatOutput(refFlat_path, by=by)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a refFlat text file into a memory-mapped binary store.")
+    parser.add_argument('--refflat', required=True, help="refFlat text file, e.g. refFlat_200817.txt")
+    parser.add_argument('--out', default=None, help="store directory (default: <refflat>.store)")
+    parser.add_argument('--blacklist', nargs='*', default=['NR_106988'])
+    args = parser.parse_args()
+    out = args.out or f'{os.path.realpath(args.refflat)}.store'
+    build_refflat_store(args.refflat, out, blacklist=args.blacklist)
+    print(f"[build_refflat_store] {out}")
+
+
+if __name__ == "__main__":
+    main()
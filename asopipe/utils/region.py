@@ -0,0 +1,141 @@
+"""
+전사체 한 개의 모든 타일에 대해 getlocInfo 의 Type / RegionType 컬럼을 한 번에 만드는 모듈입니다.
+
+getRegionType 결과의 구간 항목은 (label, (rel_start, rel_end)) 이고
+  rel_start = loc.chrSta - (구간 1-base 시작),  rel_end = (구간 끝) - loc.chrEnd
+이므로, 구간 목록(label, 시작, 끝)만 알면 타일마다의 값은 좌표 뺄셈으로 정해진다.
+구간 목록과 label(cds_m / intron / utr5 / utr3, lnc_exonN / lnc_intronN)은 전사체 전체를 덮는 locus 로
+getRegionType 을 한 번 불러 얻고, 정렬된 구간 시작 / 끝 배열에 타일 시작 / 끝을 searchsorted 해서
+타일마다 겹치는 구간 범위를 한 번에 구한다.
+
+다음 타일은 None 으로 남겨 getlocInfo 가 getRegionType 을 직접 부르게 한다.
+  - 구간 목록이 덮지 않는 염기(전사체 바깥 등)에 걸친 타일 : 구간 목록에 없는 항목이 붙을 수 있다
+  - 같은 label 의 구간 두 개 이상에 걸친 타일 : 같은 label 끼리의 순서는 getRegionType 이 값으로 정한다
+"""
+import numpy as np
+
+from jklib.genome import locus, getRegionType
+
+
+def type_flag(regionL):
+    """getRegionType 결과 → Type 컬럼 ('e' / 'i' 를 ':' 로 연결)."""
+    flag = []
+    for a in [e[3] for e in regionL]:
+        if (('cds' in a[0][0]) or ('utr' in a[0][0])): #exon flag ['cds','utr']
+            flag.append('e')
+        elif 'int' in a[0][0] : #intron
+            flag.append('i')
+    return ':'.join(flag)
+
+
+def region_string(regionL):
+    """getRegionType 결과 → RegionType 컬럼."""
+    return '/'.join(map(str, regionL))
+
+
+class _Segments:
+    """
+    한 가닥(strand)의 타일에 대한 getRegionType 구간 목록.
+      - head    : (transName, transID, 'sense' / 'antisense')
+      - labels  : 구간 label (1-base 시작 좌표 순)
+      - starts  : 구간 1-base 시작 좌표 (오름차순)
+      - ends    : 구간 1-base 끝 좌표 (포함, 오름차순)
+      - rank    : 전사체 전체 결과에서의 순서 (타일 결과도 이 순서로 나온다)
+      - gap_sta / gap_end : 구간 목록이 덮지 않는 좌표 범위 (전사체 앞뒤 포함)
+    구간이 서로 겹치면 searchsorted 로 범위를 잡을 수 없으므로 valid = False.
+    """
+
+    def __init__(self, transInfo, chrom, strand):
+        probe = locus(f"{chrom}:{transInfo['txnSta']+1}-{transInfo['txnEnd']}{strand}")
+        regionL = getRegionType({chrom: [transInfo]}, probe)
+        self.valid = len(regionL) == 1
+        if not self.valid:
+            return
+        gene, transID, sense, entries = regionL[0]
+        self.head = (gene, transID, sense)
+        rows = sorted(((probe.chrSta - rel_s, probe.chrEnd + rel_e, rank, label)
+                       for rank, (label, (rel_s, rel_e)) in enumerate(entries)))
+        self.starts = np.array([r[0] for r in rows], dtype=np.int64)
+        self.ends = np.array([r[1] for r in rows], dtype=np.int64)
+        self.rank = np.array([r[2] for r in rows], dtype=np.int64)
+        self.labels = [r[3] for r in rows]
+        self.valid = bool(rows) and bool(np.all(self.starts[1:] > self.ends[:-1]))
+        if not self.valid:
+            return
+        gaps = [(np.iinfo(np.int64).min, self.starts[0] - 1)]
+        gaps += [(e + 1, s - 1) for e, s in zip(self.ends[:-1].tolist(), self.starts[1:].tolist()) if s > e + 1]
+        gaps.append((self.ends[-1] + 1, np.iinfo(np.int64).max))
+        self.gap_sta = np.array([g[0] for g in gaps], dtype=np.int64)
+        self.gap_end = np.array([g[1] for g in gaps], dtype=np.int64)
+
+    def ranges(self, sta, end):
+        """
+        타일 [sta, end] (1-base, 포함) 마다 겹치는 구간 인덱스 범위 [first, last) 와
+        구간 목록만으로 계산할 수 있는지 여부.
+        """
+        first = np.searchsorted(self.ends, sta, side='left')      # 끝 >= sta 인 첫 구간
+        last = np.searchsorted(self.starts, end, side='right')    # 시작 <= end 인 마지막 구간 + 1
+        in_gap = np.searchsorted(self.gap_sta, end, side='right') > np.searchsorted(self.gap_end, sta, side='left')
+        ok = ~in_gap & (last > first)
+        return first, last, ok
+
+    def entries(self, sta, end, first, last):
+        """타일 하나의 getRegionType 항목 리스트. 같은 label 이 두 번 나오면 None."""
+        idx = sorted(range(first, last), key=lambda j: self.rank[j])
+        labels = [self.labels[j] for j in idx]
+        if len(set(labels)) != len(labels):
+            return None
+        return [(label, (sta - int(self.starts[j]), int(self.ends[j]) - end)) for label, j in zip(labels, idx)]
+
+
+class RegionAnnotator:
+    """
+    transInfo (loadBlatOutput 의 딕셔너리) 하나에 대해 타일들의 (Type, RegionType) 을 구한다.
+    결과는 getlocInfo 에서 타일마다 getRegionType 을 두 번(전체 locus, 양 끝을 1 씩 줄인 locus) 부른 것과 같은 문자열이다.
+    """
+
+    def __init__(self, transInfo):
+        self.transInfo = transInfo
+        self._segments = {}
+
+    def segments(self, chrom, strand):
+        if (chrom, strand) not in self._segments:
+            self._segments[(chrom, strand)] = _Segments(self.transInfo, chrom, strand)
+        return self._segments[(chrom, strand)]
+
+    def annotate(self, tiles):
+        """
+        tiles: locus 리스트 또는 TileView (ASOdesign.txn_tiles)
+        결과: 타일별 (Type, RegionType) 또는 None (getlocInfo 가 getRegionType 으로 직접 계산) 리스트
+        """
+        out = [None] * len(tiles)
+        if not len(tiles):
+            return out
+        if hasattr(tiles, 'starts'):    # TileView: locus 를 만들지 않고 좌표 배열을 쓴다
+            sta, end = np.asarray(tiles.starts), np.asarray(tiles.ends)
+            groups = {(tiles.tileset.chrom, tiles.tileset.strand): np.arange(len(tiles))}
+        else:
+            sta = np.array([t.chrSta for t in tiles], dtype=np.int64)
+            end = np.array([t.chrEnd for t in tiles], dtype=np.int64)
+            keys = [(t.chrom, t.strand) for t in tiles]
+            groups = {key: np.array([i for i, k in enumerate(keys) if k == key]) for key in dict.fromkeys(keys)}
+
+        for (chrom, strand), idx in groups.items():
+            if chrom != self.transInfo['chrom']:
+                continue
+            seg = self.segments(chrom, strand)
+            if not seg.valid:
+                continue
+            s, e = sta[idx], end[idx]
+            full = seg.ranges(s, e)
+            tmp = seg.ranges(s + 1, e - 1)
+            for n, i in enumerate(idx.tolist()):
+                if not (full[2][n] and tmp[2][n]):
+                    continue
+                a, b = int(s[n]), int(e[n])
+                full_entries = seg.entries(a, b, int(full[0][n]), int(full[1][n]))
+                tmp_entries = seg.entries(a + 1, b - 1, int(tmp[0][n]), int(tmp[1][n]))
+                if full_entries is None or tmp_entries is None:
+                    continue
+                out[i] = (type_flag([seg.head + (tmp_entries,)]), region_string([seg.head + (full_entries,)]))
+        return out
@@ -1,28 +1,66 @@
 
 import os
 import re
+import threading
 import traceback
+import concurrent.futures
 from functools import lru_cache
 
-import RNA
+import numpy as np
+
 from diskcache import Cache
 #from jklib.bioDB import CommonSNP
 
-from cyvcf2 import VCF  
+from asopipe.utils.snp_index import SNPIndex
+from asopipe.utils.cache_dir import user_cache_dir
+
+# ViennaRNA (RNA) 와 cyvcf2 는 cofold / VCF 를 처음 쓸 때 import 한다 (해당 컬럼을 끄면 필요 없다)
+# run_batch(transcript_workers > 1) 는 여러 스레드가 동시에 처음 부를 수 있으므로 초기화는 lock 안에서 한 번만 한다
+_RNA = None
+_init_lock = threading.Lock()
+
+def _vienna():
+    global _RNA
+    if _RNA is None:
+        with _init_lock:
+            if _RNA is None:
+                import RNA
+                RNA.cvar.dangles = 2
+                RNA.cvar.noLonelyPairs = 1
+                _RNA = RNA
+    return _RNA
+
+# ① 디스크 캐시: 10 GB 또는 항목 1 M개 선에서 LRU 자동 제거 (cofold 를 처음 조회할 때 연다)
+#    위치는 $ASOPIPE_COFOLD_CACHE > $ASOPIPE_CACHE_DIR/rnacofold > (있으면) 예전 위치 <repo>/.rnacofold_cache
+#    > ~/.cache/asopipe/rnacofold. 예전 위치에 쌓아 둔 캐시는 옮기기 전까지 계속 쓴다.
+LEGACY_CACHE_DIR = os.path.realpath(os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "..", ".rnacofold_cache"))
+
+def _default_cache_dir():
+    if os.environ.get("ASOPIPE_COFOLD_CACHE"):
+        return os.environ["ASOPIPE_COFOLD_CACHE"]
+    if not os.environ.get("ASOPIPE_CACHE_DIR") and os.path.isdir(LEGACY_CACHE_DIR):
+        return LEGACY_CACHE_DIR
+    return user_cache_dir("rnacofold")
 
-# ① 디스크 캐시: 10 GB 또는 항목 1 M개 선에서 LRU 자동 제거
-CACHE_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "./../../" ,".rnacofold_cache")
-disk_cache = Cache(directory=str(CACHE_DIR), size_limit=10 * 1024 ** 3)
-RNA.cvar.dangles = 2
-RNA.cvar.noLonelyPairs = 1
+CACHE_DIR = _default_cache_dir()
+_disk_cache = None
 
-def loadSNP(locStr, dbsnp_path=None):
+def _cofold_cache():
+    global _disk_cache
+    if _disk_cache is None:
+        with _init_lock:
+            if _disk_cache is None:
+                _disk_cache = Cache(directory=str(CACHE_DIR), size_limit=10 * 1024 ** 3)
+    return _disk_cache
+
+def loadSNP(locStr, dbsnp_path=None, with_coords=False):
     try:
         check_type_dbsnp = str(type(dbsnp_path)).lower()
         cSNP = dbsnp_path
         if "none" in check_type_dbsnp:
             dbsnp_path = "/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf"
             dbsnp_index_path = "/Users/dowonkim/Dropbox/data/VCF/dbsnp.bcf.csi"  
+            from cyvcf2 import VCF
             cSNP = VCF(dbsnp_path)
             cSNP.set_index(index_path=dbsnp_index_path)
             #cSNP = VCF(dbsnp_path)          # .csi 인덱스 자동 사용
@@ -32,6 +70,9 @@ def loadSNP(locStr, dbsnp_path=None):
             raise ValueError(f"Check your dpsnp_path argument.(Now: {dbsnp_path})")
         # “This format (chrom:chrSta-chrEnd) used to be accepted by dbSNP.
         locStr = locStr.rstrip('-').rstrip('+').replace("chr", "")
+        if with_coords:
+            # CommonSNPSpan 용: (레코드, 0-based start, end)
+            return [((v.CHROM, v.POS ,v.REF, v.ALT[0], [info for info in v.INFO]), v.start, v.end)  for v in cSNP(locStr)]
         resultL = [(v.CHROM, v.POS ,v.REF, v.ALT[0], [info for info in v.INFO])  for v in cSNP(locStr)] 
         return resultL
     except Exception as e:
@@ -41,6 +82,9 @@ def loadSNP(locStr, dbsnp_path=None):
 
 def containCommonSNP(loc, cSNP=None):
     try:
+        if isinstance(cSNP, SNPIndex):
+            # 미리 만든 SNP 인덱스 (utils/snp_index.py) 로 답한다
+            return cSNP.query(loc)
         locStr = loc.toString()
         resultL = loadSNP(locStr, cSNP)
         return resultL
@@ -49,12 +93,63 @@ def containCommonSNP(loc, cSNP=None):
         print(loc.toString())
         raise('Error')
 
+class CommonSNPSpan:
+    """
+    전사체 구간의 SNP 를 한 번만 읽어두고 타일별로 잘라서 돌려준다.
+    레코드 시작/끝(0-based, half-open)을 정렬된 배열로 두고 searchsorted 로 타일 구간을 찾으므로
+    결과는 타일마다 containCommonSNP 를 부른 것과 같다.
+    구간 로딩이 실패하면 타일별 containCommonSNP 로 되돌아간다.
+    """
+    def __init__(self, locStr, cSNP=None):
+        self.cSNP    = cSNP
+        self.records = None
+        if isinstance(cSNP, SNPIndex):    # 인덱스는 타일마다 조회해도 충분히 싸다
+            return
+        resultL = loadSNP(locStr, cSNP, with_coords=True)
+        if isinstance(resultL, tuple):    # loadSNP 에러 (e.args)
+            return
+        self.records = [r for r, _, _ in resultL]
+        self.start   = np.array([s for _, s, _ in resultL], dtype=np.int64)
+        self.end     = np.array([e for _, _, e in resultL], dtype=np.int64)
+        # 시작 위치 순서로 정렬돼 있어도 끝 위치는 정렬돼 있지 않으므로 누적 최대값으로 하한을 찾는다
+        self.max_end = np.maximum.accumulate(self.end) if len(self.end) else self.end
+
+    def query(self, loc):
+        if self.records is None:
+            return containCommonSNP(loc, self.cSNP)
+        beg, end = loc.chrSta - 1, loc.chrEnd
+        lo = int(np.searchsorted(self.max_end, beg, side='right'))
+        hi = int(np.searchsorted(self.start, end, side='left'))
+        return [self.records[i] for i in range(lo, hi) if self.end[i] > beg]
+
+    def slice(self, beg, end):
+        """
+        0-based [beg, end) 에 걸치는 레코드만 담은 CommonSNPSpan (워커에 보낼 때).
+        그 구간 안의 타일에 대한 query() 결과는 원래 span 과 같다. 레코드를 읽지 않은 span 이면 None.
+        """
+        if self.records is None:
+            return None
+        lo = int(np.searchsorted(self.max_end, beg, side='right'))
+        hi = int(np.searchsorted(self.start, end, side='left'))
+        keep = [i for i in range(lo, hi) if self.end[i] > beg]
+        sub = CommonSNPSpan.__new__(CommonSNPSpan)
+        sub.cSNP    = None
+        sub.records = [self.records[i] for i in keep]
+        sub.start   = self.start[keep]
+        sub.end     = self.end[keep]
+        sub.max_end = np.maximum.accumulate(sub.end) if len(sub.end) else sub.end
+        return sub
+
 def containGquad(sequence):
     return 'GGGG' in sequence or 'CCCC' in sequence
 
-def containGquad2(sequence, loop=7):
+@lru_cache(maxsize=None)
+def _gquad_re(loop=7):
     reg_seq = f"(G{3,})[ATCG]{1,loop}(G{3,})[ATCG]{1,loop}(G{3,})[ATCG]{1,loop}(G{3,})"
-    G4_RE = re.compile(reg_seq)
+    return re.compile(reg_seq)
+
+def containGquad2(sequence, loop=7):
+    G4_RE = _gquad_re(loop)
     return bool(G4_RE.search(sequence))
 
 def countCpG(sequence):
@@ -64,9 +159,40 @@ def GCcontent(sequence):
     comp = dict([(x, sequence.count(x)/len(sequence)) for x in 'ATCG'])
     return comp['G'] + comp['C']
 
+def sequence_features(txn_seq, tile_lengths, loop=7):
+    """
+    전사체 서열에서 잘라낸 모든 타일(길이 tile_lengths)의 (Gquad, CpG, GC_Content) 를 한 번에 계산한다.
+    GC/CpG 는 누적합으로 구하고, G4 는 전사체 전체에서 한 번 찾아 매치가 없으면 모든 타일이 False.
+    (타일은 전사체의 부분 문자열이므로 전체에 매치가 없으면 어느 타일에도 없다.)
+    결과는 {타일 서열: (containGquad2, countCpG, GCcontent)} 이며 값은 기존 함수와 같다.
+    """
+    seq = np.frombuffer(txn_seq.encode('ascii'), dtype=np.uint8)
+    n_seq = len(seq)
+    is_g, is_c = seq == ord('G'), seq == ord('C')
+    cum_g = np.concatenate(([0], np.cumsum(is_g)))
+    cum_c = np.concatenate(([0], np.cumsum(is_c)))
+    # CpG 는 겹칠 수 없으므로 str.count('CG') == 시작 위치 개수
+    cum_cg = np.concatenate(([0], np.cumsum(is_c[:-1] & is_g[1:])))
+    has_g4 = bool(_gquad_re(loop).search(txn_seq))
+
+    table = {}
+    for L in tile_lengths:
+        n = n_seq - L + 1
+        if n <= 0:
+            continue
+        g = cum_g[L:L+n] - cum_g[:n]
+        c = cum_c[L:L+n] - cum_c[:n]
+        cpg = (cum_cg[L-1:L-1+n] - cum_cg[:n]).tolist()
+        gc = (g / L + c / L).tolist()          # GCcontent 와 같은 연산 순서
+        for i in range(n):
+            tile_seq = txn_seq[i:i+L]
+            if tile_seq not in table:
+                table[tile_seq] = (containGquad2(tile_seq, loop) if has_g4 else False, cpg[i], gc[i])
+    return table
+
 def RNAcofold(sequence):
     seq = sequence + '&' + sequence
-    tokL = RNA.co_pf_fold(seq)
+    tokL = _vienna().co_pf_fold(seq)
     return tokL[4], tokL[2]
 
 @lru_cache(maxsize=1024)
@@ -76,16 +202,16 @@ def _cofold_in_memory(dimer):
     miss이면 diskcache → 계산 순으로 진행.
     """
     # ── 1) 디스크 캐시 조회
-    hit = disk_cache.get(dimer, default=None)
+    hit = _cofold_cache().get(dimer, default=None)
     if hit is not None:
         return hit  # (FB, FcAB) tuple
 
     # ── 2) 실제 계산
-    tokL = RNA.co_pf_fold(dimer)
+    tokL = _vienna().co_pf_fold(dimer)
     result = (tokL[4], tokL[2])      # FB, FcAB
 
     # ── 3) 디스크 캐시 저장 후 반환
-    disk_cache.set(dimer, result)
+    _cofold_cache().set(dimer, result)
     return result
 
 def RNAcofold2(sequence):
@@ -102,4 +228,62 @@ def RNAcofold2(sequence):
     seq = sequence.upper().replace('T', 'U')
     dimer = f"{seq}&{seq}"
     homo, mono = _cofold_in_memory(dimer)
-    return homo, mono
\ No newline at end of file
+    return homo, mono
+
+
+def _cofold_raw(dimer):
+    """워커 프로세스에서 실행되는 순수 계산 (캐시 접근 없음)."""
+    tokL = _vienna().co_pf_fold(dimer)
+    return (tokL[4], tokL[2])      # FB, FcAB
+
+
+def RNAcofold_batch(sequences, max_workers=1, chunksize=None, executor=None):
+    """
+    RNAcofold2 의 배치 버전.
+    중복 서열을 제거하고 diskcache 를 한 번에 조회한 뒤, 캐시에 없는 서열만
+    프로세스 풀(max_workers)로 계산하여 캐시에 저장하고 입력 순서대로 되돌려 줍니다.
+
+    Parameters
+    ----------
+    sequences : list of str  ― 단량체 서열 (A/C/G/T/U)
+    max_workers : int        ― 1 이면 현재 프로세스에서 순차 계산
+    chunksize : int or None  ― 프로세스 풀 작업 묶음 크기 (None 이면 자동)
+    executor : Executor or None ― 주어지면 새 풀을 만들지 않고 이 풀(예: ASOcontext.executor())에서 계산
+
+    Returns
+    -------
+    list of (FB, FcAB)
+        RNAcofold2 와 동일한 값, 입력 순서 그대로
+    """
+    dimers = [f"{seq}&{seq}" for seq in (s.upper().replace('T', 'U') for s in sequences)]
+    unique = list(dict.fromkeys(dimers))
+
+    # ── 1) 디스크 캐시 일괄 조회
+    table = {}
+    with _cofold_cache().transact():
+        for dimer in unique:
+            hit = _cofold_cache().get(dimer, default=None)
+            if hit is not None:
+                table[dimer] = hit
+    misses = [dimer for dimer in unique if dimer not in table]
+
+    # ── 2) 캐시에 없는 서열만 계산
+    if misses:
+        if max_workers > 1 and len(misses) > max_workers:
+            if chunksize is None:
+                chunksize = max(1, len(misses) // (max_workers * 8))
+            if executor is not None:
+                computed = list(executor.map(_cofold_raw, misses, chunksize=chunksize))
+            else:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as ex:
+                    computed = list(ex.map(_cofold_raw, misses, chunksize=chunksize))
+        else:
+            computed = [_cofold_raw(dimer) for dimer in misses]
+
+        # ── 3) 디스크 캐시 일괄 저장
+        with _cofold_cache().transact():
+            for dimer, result in zip(misses, computed):
+                _cofold_cache().set(dimer, result)
+                table[dimer] = result
+
+    return [table[dimer] for dimer in dimers]
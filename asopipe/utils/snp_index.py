@@ -0,0 +1,170 @@
+"""
+dbSNP BCF/VCF 에서 SNP 위치와 (REF, ALT, INFO) 를 염색체별 배열로 미리 뽑아두고,
+cyvcf2 없이 타일 구간 조회에 답하는 모듈입니다.
+
+인덱스 디렉토리 구성 (염색체마다, 염색체 이름은 VCF 의 CHROM 그대로):
+  - <chrom>.start.npy    int64[n]   : 레코드 시작 (0-based), 파일 순서 = 시작 위치 순서
+  - <chrom>.end.npy      int64[n]   : 레코드 끝 (half-open, cyvcf2 Variant.end)
+  - <chrom>.max_end.npy  int64[n]   : end 의 누적 최대값 (구간 하한 탐색용)
+  - <chrom>.rec_off.npy  int64[n+1] : rec 안의 오프셋
+  - <chrom>.rec.npy      uint8[...] : 레코드별 JSON [POS, REF, ALT, [[key, value], ...]]
+  - meta.json            : 염색체별 레코드 수, 필터 옵션, 원본 dbSNP 정보
+
+조회는 searchsorted 두 번 (O(log n)) 이고, count/bool 모드에서는 레코드를 디코딩하지 않는다.
+records 모드의 결과는 loadSNP() 와 같은 (CHROM, POS, REF, ALT, [(key, value), ...]) 리스트.
+"""
+import os
+import json
+import argparse
+
+import numpy as np
+
+SNP_MODES = ('records', 'count', 'bool')
+
+
+def build_snp_index(dbsnp_path, index_dir, common_only=False, info_fields=None):
+    """
+    dbSNP 파일을 한 번 훑어서 index_dir 에 염색체별 배열을 만듭니다. (오프라인 1회 작업)
+
+    Parameters
+    ----------
+    dbsnp_path : str
+    index_dir : str
+    common_only : bool
+        True 이면 INFO 에 COMMON 플래그가 있는 레코드만 넣는다.
+    info_fields : list of str or None
+        None 이면 INFO 전체를 저장 (loadSNP 와 같은 결과). 주어지면 그 키만 남긴다.
+    """
+    from cyvcf2 import VCF   # 인덱스를 만들 때만 필요 (조회는 cyvcf2 없이)
+    os.makedirs(index_dir, exist_ok=True)
+    keep = set(info_fields) if info_fields else None
+
+    chroms = {}
+    chrom, c = None, None
+    for v in VCF(dbsnp_path):
+        if common_only and not v.INFO.get('COMMON'):
+            continue
+        if v.CHROM != chrom:
+            if c is not None:
+                chroms[chrom] = _finalize_chrom(index_dir, chrom, c)
+            if v.CHROM in chroms:
+                raise ValueError(f"{dbsnp_path} is not sorted by chromosome: {v.CHROM}")
+            chrom, c = v.CHROM, {'start': [], 'end': [], 'rec': []}
+        info = [[k, val] for k, val in v.INFO if keep is None or k in keep]
+        alt = v.ALT[0] if v.ALT else None
+        c['start'].append(v.start)
+        c['end'].append(v.end)
+        c['rec'].append(json.dumps([v.POS, v.REF, alt, info], separators=(',', ':')).encode('utf-8'))
+    if c is not None:
+        chroms[chrom] = _finalize_chrom(index_dir, chrom, c)
+
+    meta = {
+        'chroms': chroms,
+        'common_only': bool(common_only),
+        'info_fields': list(info_fields) if info_fields else None,
+        'dbsnp': {'path': os.path.realpath(dbsnp_path), 'size': os.path.getsize(dbsnp_path),
+                  'mtime': os.path.getmtime(dbsnp_path)},
+    }
+    with open(os.path.join(index_dir, 'meta.json'), 'w') as out:
+        json.dump(meta, out, indent=1)
+    return index_dir
+
+
+def _finalize_chrom(index_dir, chrom, c):
+    path = os.path.join(index_dir, chrom)
+    end = np.array(c['end'], dtype=np.int64)
+    np.save(f'{path}.start.npy', np.array(c['start'], dtype=np.int64))
+    np.save(f'{path}.end.npy', end)
+    np.save(f'{path}.max_end.npy', np.maximum.accumulate(end) if len(end) else end)
+    lens = np.array([len(r) for r in c['rec']], dtype=np.int64)
+    np.save(f'{path}.rec_off.npy', np.concatenate(([0], np.cumsum(lens))).astype(np.int64))
+    np.save(f'{path}.rec.npy', np.frombuffer(b''.join(c['rec']), dtype=np.uint8))
+    return len(end)
+
+
+def _as_tuple(value):
+    # cyvcf2 는 값이 여러 개인 INFO 를 tuple 로 돌려준다 (JSON 에서는 list)
+    return tuple(value) if isinstance(value, list) else value
+
+
+class _ChromSNP:
+    __slots__ = ("start", "end", "max_end", "rec_off", "rec")
+
+    def __init__(self, index_dir, chrom):
+        path = os.path.join(index_dir, chrom)
+        self.start = np.load(f'{path}.start.npy', mmap_mode='r')
+        self.end = np.load(f'{path}.end.npy', mmap_mode='r')
+        self.max_end = np.load(f'{path}.max_end.npy', mmap_mode='r')
+        self.rec_off = np.load(f'{path}.rec_off.npy', mmap_mode='r')
+        self.rec = np.load(f'{path}.rec.npy', mmap_mode='r')
+
+
+class SNPIndex:
+    """
+    build_snp_index() 로 만든 인덱스를 읽어 containCommonSNP 와 같은 형식으로 답합니다.
+    염색체 배열은 처음 조회할 때 memory-map 으로 연다. VCF 핸들을 들고 있지 않으므로 워커 간 공유가 가볍다.
+
+    mode : 'records' (레코드 리스트) | 'count' (겹치는 레코드 수) | 'bool' (하나라도 있는지)
+    """
+
+    def __init__(self, index_dir, mode='records'):
+        if mode not in SNP_MODES:
+            raise ValueError(f"mode must be one of {SNP_MODES} (Now: {mode})")
+        self.index_dir = index_dir
+        self.mode = mode
+        with open(os.path.join(index_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        self.chrom_counts = meta['chroms']
+        self._chroms = {}
+
+    def _chrom(self, chrom):
+        if chrom not in self._chroms:
+            if chrom not in self.chrom_counts:
+                self._chroms[chrom] = None
+            else:
+                self._chroms[chrom] = _ChromSNP(self.index_dir, chrom)
+        return self._chroms[chrom]
+
+    def _range(self, t, beg, end):
+        lo = int(np.searchsorted(t.max_end, beg, side='right'))
+        hi = int(np.searchsorted(t.start, end, side='left'))
+        return lo, hi
+
+    def query_range(self, chrom, beg, end, mode=None):
+        """chrom 의 [beg, end) (0-based) 와 겹치는 레코드."""
+        mode = mode or self.mode
+        chrom = chrom.replace("chr", "")
+        t = self._chrom(chrom)
+        if t is None:
+            return {'records': [], 'count': 0, 'bool': False}[mode]
+        lo, hi = self._range(t, beg, end)
+        hits = np.flatnonzero(np.asarray(t.end[lo:hi]) > beg) + lo
+        if mode == 'count':
+            return int(hits.size)
+        if mode == 'bool':
+            return bool(hits.size)
+        resultL = []
+        for i in hits.tolist():
+            pos, ref, alt, info = json.loads(t.rec[t.rec_off[i]:t.rec_off[i + 1]].tobytes())
+            resultL.append((chrom, pos, ref, alt, [(k, _as_tuple(val)) for k, val in info]))
+        return resultL
+
+    def query(self, loc, mode=None):
+        """loc (jklib locus) 타일과 겹치는 레코드. loadSNP 와 같이 chrSta-chrEnd 를 1-based 닫힌 구간으로 본다."""
+        return self.query_range(loc.chrom, loc.chrSta - 1, loc.chrEnd, mode=mode)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a memory-mapped common-SNP index from dbSNP BCF/VCF.")
+    parser.add_argument('--dbsnp', required=True, help="dbSNP BCF/VCF, e.g. dbsnp.bcf")
+    parser.add_argument('--out', default=None, help="index directory (default: <dbsnp>.snpidx)")
+    parser.add_argument('--common-only', action='store_true', help="keep only records with the COMMON INFO flag")
+    parser.add_argument('--info-fields', nargs='+', default=None, help="INFO keys to keep (default: all)")
+    args = parser.parse_args()
+    out = args.out or f'{os.path.realpath(args.dbsnp)}.snpidx'
+    build_snp_index(args.dbsnp, out, common_only=args.common_only, info_fields=args.info_fields)
+    print(f"[build_snp_index] {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+전사체 구간의 타일들을 (시작 좌표 배열 + 공유 전사체 서열 하나) 로 들고 있는 모듈입니다.
+
+타일마다 locus 객체와 서열 문자열을 미리 만들지 않고, 필요할 때만 만든다.
+ASOdesign.txn_tiles / txn_tile_seq 는 기존 리스트처럼 len / 인덱싱 / 슬라이싱 / 순회가 되는 TileView 이다.
+"""
+import numpy as np
+
+from jklib.genome import locus
+
+
+class TileSet:
+    """
+    chrom:{s}-{s+L-1}{strand} (s = txnSta ~ txnEnd-L) 타일들.
+      - starts   : 타일 시작 좌표 배열 (오름차순, locus 문자열의 chrSta 와 같은 값)
+      - txn_seq  : chrom:{txnSta}-{txnEnd-1}{strand} 의 서열. strand 가 '-' 면 역상보 서열이라
+                   i 번째 타일의 서열은 뒤에서부터 잘라낸다 (기존 _tile_txn_seq 와 같은 순서)
+    """
+    __slots__ = ("chrom", "strand", "tile_length", "starts", "txn_seq")
+
+    def __init__(self, chrom, strand, txnSta, txnEnd, tile_length, txn_seq=None):
+        self.chrom = chrom
+        self.strand = strand
+        self.tile_length = tile_length
+        self.starts = np.arange(txnSta, txnEnd - tile_length + 1, dtype=np.int64)
+        self.txn_seq = txn_seq
+
+    def __len__(self):
+        return len(self.starts)
+
+    def locus(self, i):
+        s = int(self.starts[i])
+        return locus(f"{self.chrom}:{s}-{s+self.tile_length-1}{self.strand}")   # inclusive end = s+L-1
+
+    def seq(self, i):
+        w = len(self.starts) - 1 - i if self.strand == '-' else i
+        return self.txn_seq[w:w+self.tile_length]
+
+    def window_span(self, lo, hi):
+        """[lo, hi) 타일들을 모두 담는 txn_seq 구간 (a, b)."""
+        n = len(self.starts)
+        if self.strand == '-':
+            lo, hi = n - hi, n - lo
+        return lo, hi - 1 + self.tile_length
+
+    def subset(self, lo, hi):
+        """[lo, hi) 타일만 담은 TileSet. txn_seq 도 그 타일들이 쓰는 구간만 잘라 둔다 (워커에 보낼 때)."""
+        sub = TileSet.__new__(TileSet)
+        sub.chrom, sub.strand, sub.tile_length = self.chrom, self.strand, self.tile_length
+        sub.starts = self.starts[lo:hi].copy()
+        a, b = self.window_span(lo, hi)
+        sub.txn_seq = self.txn_seq[a:b] if self.txn_seq is not None else None
+        return sub
+
+    def loci(self):
+        return TileView(self, 'locus', 0, len(self))
+
+    def seqs(self):
+        return TileView(self, 'seq', 0, len(self))
+
+
+class TileView:
+    """TileSet 의 [lo, hi) 구간을 locus 또는 서열 리스트처럼 보여주는 호환용 뷰."""
+    __slots__ = ("tileset", "kind", "lo", "hi")
+
+    def __init__(self, tileset, kind, lo, hi):
+        self.tileset = tileset
+        self.kind = kind
+        self.lo = lo
+        self.hi = hi
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def __getitem__(self, key):
+        n = self.hi - self.lo
+        if isinstance(key, slice):
+            start, stop, step = key.indices(n)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            return TileView(self.tileset, self.kind, self.lo + start, self.lo + max(start, stop))
+        if key < 0:
+            key += n
+        if not 0 <= key < n:
+            raise IndexError("tile index out of range")
+        return getattr(self.tileset, self.kind)(self.lo + key)
+
+    def __iter__(self):
+        get = getattr(self.tileset, self.kind)
+        for i in range(self.lo, self.hi):
+            yield get(i)
+
+    @property
+    def starts(self):
+        """뷰에 속한 타일들의 시작 좌표 (chrSta) 배열."""
+        return self.tileset.starts[self.lo:self.hi]
+
+    @property
+    def ends(self):
+        """뷰에 속한 타일들의 끝 좌표 (chrEnd) 배열."""
+        return self.starts + (self.tileset.tile_length - 1)
@@ -0,0 +1,65 @@
+"""
+script/test_*.py 가 함께 쓰는 작은 고정 데이터(script/fixture) 경로와 실행 인자입니다.
+
+fixture (hg38 chr1 의 30 kb 구간):
+  refFlat.txt                 : NM_000001 (+, 3 exon), NM_000002 (-, 4 exon), NR_000003 (+, noncoding),
+                                NM_000004 (NM_000001 의 isoform), NM_000005 (NM_000001 과 겹치는 - 가닥)
+  hg38.{mm39,rn7}.synNet.maf  : chr1:1000-27000 정도를 덮는 synNet 블록 (빈 구간 / - 가닥 블록 포함)
+  hg38.{mm39,rn7}.synNet.maf.index : bx-python 의 maf_build_index 로 만든 인덱스
+  snp.vcf.gz(.csi)            : COMMON / 비 COMMON SNP
+MAF 트랙 / 캐시가 저장소 안에 생기지 않도록 copy_fixture() 로 임시 디렉토리에 복사해서 쓴다.
+"""
+import os
+import sys
+import shutil
+import atexit
+import tempfile
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)   # 상위 디렉토리 추가
+
+FIXTURE_DIR = os.path.join(ROOT, "script", "fixture")
+TRANSCRIPTS = ["NM_000001", "NM_000002", "NR_000003", "NM_000004", "NM_000005"]
+QUERY_ASSEMBLY = ["mm39", "rn7"]
+
+_copy = None
+
+
+def copy_fixture():
+    """fixture 를 임시 디렉토리에 한 번 복사해서 그 경로를 반환 (프로세스가 끝나면 지운다)."""
+    global _copy
+    if _copy is None:
+        _copy = tempfile.mkdtemp(prefix="asopipe_fixture_")
+        atexit.register(shutil.rmtree, _copy, True)
+        for name in os.listdir(FIXTURE_DIR):
+            shutil.copy(os.path.join(FIXTURE_DIR, name), _copy)
+    return _copy
+
+
+def tmpdir():
+    """테스트 하나가 쓰고 버릴 임시 디렉토리."""
+    path = tempfile.mkdtemp(prefix="asopipe_test_")
+    atexit.register(shutil.rmtree, path, True)
+    return path
+
+
+def design_kwargs(**kwargs):
+    """run_ASOdesign / ASOdesign / run_batch 에 넘길 fixture 경로 인자."""
+    d = copy_fixture()
+    options = dict(refFlat_path=os.path.join(d, "refFlat.txt"), maf_dir=d,
+                   dbsnp_path=os.path.join(d, "snp.vcf.gz"), dbsnp_index_path=os.path.join(d, "snp.vcf.gz.csi"),
+                   query_assembly=list(QUERY_ASSEMBLY), ref_assembly="hg38")
+    options.update(kwargs)
+    return options
+
+
+def run_tests(namespace):
+    """python script/test_xxx.py 로 실행할 때 모듈 안의 test_* 함수를 차례로 부른다 (pytest 로도 돌릴 수 있다)."""
+    import multiprocessing as mp
+    mp.set_start_method("spawn", force=True)   # macOS/Linux 안전
+    tests = [(name, fn) for name, fn in namespace.items() if name.startswith("test_") and callable(fn)]
+    for name, fn in tests:
+        fn()
+        print(f"ok  {name}")
+    print(f"{len(tests)} passed")
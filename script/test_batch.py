@@ -0,0 +1,93 @@
+"""
+run_batch 를 전사체마다 run_ASOdesign 을 부른 결과와 비교하고 (refFlat 에 없는 전사체는 error 로 기록),
+여러 스레드가 동시에 처음 불러도 ViennaRNA / cofold 디스크 캐시가 한 번만 초기화되는지 확인합니다.
+  python script/test_batch.py   또는   python -m pytest script/test_batch.py
+"""
+import os
+import time
+import filecmp
+import threading
+
+from _fixture import design_kwargs, tmpdir, run_tests
+
+from asopipe.batch import run_batch, load_manifest
+from asopipe.main import run_ASOdesign
+from asopipe.utils import rna
+
+
+def test_load_manifest():
+    path = os.path.join(tmpdir(), "manifest.txt")
+    with open(path, "w") as f:
+        f.write("# comment\nNR_000003\nNM_000001, 18, 20\nNM_000002\t19  # k=19\n\nNR_000003 17 18\n")
+    assert load_manifest(path, k_min=17, k_max=21) == [("NR_000003", 17, 18), ("NM_000001", 18, 20), ("NM_000002", 19, 19)]
+    for line in ("NM_000001 17 18 19\n", "NM_000001 16\n", "NM_000001 20 18\n"):
+        with open(path, "w") as f:
+            f.write(line)
+        try:
+            load_manifest(path)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(line)
+
+
+def test_run_batch_matches_run_ASOdesign():
+    expected_dir = tmpdir()
+    for transid, k_min, k_max in (("NR_000003", 17, 18), ("NM_000004", 17, 17)):
+        run_ASOdesign(transid=transid, k_min=k_min, k_max=k_max, max_workers=2, wobble=2, gapmer_filtered=True,
+                      to_csv=True, output_path=expected_dir, **design_kwargs())
+    out = tmpdir()
+    manifest = os.path.join(out, "manifest.txt")
+    with open(manifest, "w") as f:
+        f.write("NR_000003 17 18\nNM_999999\nNM_000004\n")
+    summary = run_batch(manifest, k_min=17, k_max=17, max_workers=2, transcript_workers=2, wobble=2,
+                        gapmer_filtered=True, output_path=out, **design_kwargs())
+    assert {k: v["status"] for k, v in summary.items()} == {"NR_000003": "ok", "NM_999999": "error", "NM_000004": "ok"}
+    assert summary["NM_999999"]["error"] == "transcript not found in refFlat"
+    assert summary["NR_000003"]["k"] == (17, 18) and summary["NR_000003"]["tiles"] == 2 * 2000 - 17 - 18 + 2
+    expected = sorted(f for f in os.listdir(expected_dir) if f.endswith(".csv"))
+    assert len(expected) == 6
+    assert sorted(f for f in os.listdir(out) if f.endswith(".csv")) == expected
+    for name in expected:
+        assert filecmp.cmp(os.path.join(out, name), os.path.join(expected_dir, name), shallow=False), name
+    with open(os.path.join(out, "batch_status.tsv")) as f:
+        rows = [line.split("\t") for line in f.read().splitlines()]
+    assert rows[0][:2] == ["transID", "status"] and sorted(r[0] for r in rows[1:]) == ["NM_000004", "NM_999999", "NR_000003"]
+
+
+def test_lazy_globals_initialized_once():
+    created = []
+    cache_cls = rna.Cache
+
+    def slow_cache(*args, **kwargs):
+        time.sleep(0.05)     # 다른 스레드가 같은 구간에 들어오게
+        created.append(1)
+        return cache_cls(*args, **kwargs)
+
+    saved = (rna._RNA, rna._disk_cache, rna.CACHE_DIR)
+    try:
+        rna._RNA, rna._disk_cache, rna.CACHE_DIR = None, None, tmpdir()
+        rna.Cache = slow_cache
+        got = []
+        barrier = threading.Barrier(8)
+
+        def worker():
+            barrier.wait()
+            got.append((rna._vienna(), rna._cofold_cache()))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(created) == 1
+        assert len({id(v) for v, _ in got}) == 1 and len({id(c) for _, c in got}) == 1
+        assert got[0][0].cvar.dangles == 2
+        got[0][1].close()
+    finally:
+        rna.Cache = cache_cls
+        rna._RNA, rna._disk_cache, rna.CACHE_DIR = saved
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
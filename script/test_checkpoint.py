@@ -0,0 +1,118 @@
+"""
+checkpoint_dir 로 끊긴 실행을 다시 돌렸을 때 남은 조각만 계산하고 체크포인트 없이 돌린 결과와 같은 파일을 쓰는지,
+입력 파일(refFlat / MAF / dbSNP) 이 바뀌면 이전 조각을 쓰지 않는지, lazy=True / stream=True 와 함께 주면 거부하는지 확인합니다.
+  python script/test_checkpoint.py   또는   python -m pytest script/test_checkpoint.py
+"""
+import os
+import json
+import filecmp
+
+from _fixture import design_kwargs, tmpdir, run_tests
+
+from asopipe.batch import run_batch
+from asopipe.main import run_ASOdesign, design_transcript, _checkpoint_params
+from asopipe.utils.checkpoint import RunCheckpoint, path_fingerprint
+
+
+def _run(output_path, checkpoint_dir=None, **kwargs):
+    return run_ASOdesign(transid="NR_000003", k_min=17, k_max=18, max_workers=2, wobble=2, gapmer_filtered=True,
+                         to_csv=True, output_path=output_path, checkpoint_dir=checkpoint_dir, **kwargs)
+
+
+def _csvs(path):
+    return sorted(f for f in os.listdir(path) if f.endswith(".csv"))
+
+
+def _touch(path, seconds=100):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_resume_matches_fresh_run():
+    kwargs = design_kwargs()
+    expected = tmpdir()
+    _run(expected, **kwargs)
+    checkpoint_dir = tmpdir()
+    _run(tmpdir(), checkpoint_dir, **kwargs)
+    run_dir = os.path.join(checkpoint_dir, "NR_000003")
+    manifest_path = os.path.join(run_dir, "manifest.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    chunks = manifest["chunks"]
+    assert manifest["finished_k"] == [17, 18]
+    assert any("/locinfo/" in c for c in chunks) and any("/assembly=rn7/" in c for c in chunks)
+
+    # 중간에 죽은 실행: 조각 절반과 끝난 k 기록이 없다
+    kept, dropped = chunks[::2], chunks[1::2]
+    manifest.update(chunks=kept, finished_k=[])
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+    for key in dropped:
+        os.remove(os.path.join(run_dir, f"{key}.pkl"))
+    mtimes = {key: os.stat(os.path.join(run_dir, f"{key}.pkl")).st_mtime_ns for key in kept}
+
+    out = tmpdir()
+    _run(out, checkpoint_dir, **kwargs)
+    assert _csvs(out) == _csvs(expected) and len(_csvs(out)) == 4
+    for name in _csvs(out):
+        assert filecmp.cmp(os.path.join(out, name), os.path.join(expected, name), shallow=False), name
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    assert sorted(manifest["chunks"]) == sorted(chunks) and manifest["finished_k"] == [17, 18]
+    # 남아 있던 조각은 다시 쓰지 않는다
+    assert all(os.stat(os.path.join(run_dir, f"{key}.pkl")).st_mtime_ns == mtimes[key] for key in kept)
+
+
+def test_params_follow_input_files():
+    d = tmpdir()
+    kwargs = {}
+    for key, name in (("refFlat_path", "refFlat.txt"), ("dbsnp_path", "snp.vcf.gz"), ("dbsnp_index_path", "snp.vcf.gz.csi")):
+        with open(design_kwargs()[key], "rb") as src, open(os.path.join(d, name), "wb") as dst:
+            dst.write(src.read())
+        kwargs[key] = os.path.join(d, name)
+    kwargs = design_kwargs(**kwargs)
+    params = _checkpoint_params("NR_000003", kwargs)
+    assert params == _checkpoint_params("NR_000003", dict(kwargs))
+    run_dir = os.path.join(tmpdir(), "NR_000003")
+    RunCheckpoint(run_dir, params)
+    for key in ("refFlat_path", "dbsnp_path", "dbsnp_index_path"):
+        _touch(kwargs[key])
+        changed = _checkpoint_params("NR_000003", kwargs)
+        assert changed != params, key
+        try:
+            RunCheckpoint(run_dir, changed)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(key)
+        params = changed
+        RunCheckpoint(os.path.join(tmpdir(), "NR_000003"), params)
+    # CommonSNP 를 계산하지 않으면 dbSNP 는 상관없다
+    no_snp = design_kwargs(features=["conservation", "region"], dbsnp_path=kwargs["dbsnp_path"])
+    before = _checkpoint_params("NR_000003", no_snp)
+    _touch(kwargs["dbsnp_path"])
+    assert _checkpoint_params("NR_000003", no_snp) == before
+    # 디렉토리 (refFlat 스토어 / SNP 인덱스) 는 안의 파일마다
+    with open(os.path.join(d, "extra"), "w") as f:
+        f.write("x")
+    listing = path_fingerprint(d)
+    assert [row[0] for row in listing] == sorted(os.listdir(d))
+    assert path_fingerprint(None) is None and path_fingerprint(os.path.join(d, "missing"))[0][1] == -1
+
+
+def test_lazy_and_stream_reject_checkpoint():
+    for mode in ("lazy", "stream"):
+        for call in (lambda: design_transcript("NR_000003", [17], design_kwargs=design_kwargs(), checkpoint_dir=tmpdir(),
+                                               **{mode: True}),
+                     lambda: run_batch(["NR_000003"], checkpoint_dir=tmpdir(), output_path=tmpdir(),
+                                       **{mode: True}, **design_kwargs())):
+            try:
+                call()
+            except ValueError as e:
+                assert mode in str(e)
+            else:
+                raise AssertionError(f"checkpoint_dir with {mode}=True")
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
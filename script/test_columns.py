@@ -0,0 +1,110 @@
+"""
+ResultColumns (값 배열 + None 마스크 / 고정 폭 서열 배열) 의 to_dict / to_dataframe / wobble 을
+리스트로 모으던 기존 방식(문자열 "ref:query", str(None) 인코딩)과 비교하고,
+process_main(to_csv=True) 이 돌려주는 결과가 CSV 를 쓰면서 바뀌지 않는지 확인합니다.
+  python script/test_columns.py   또는   python -m pytest script/test_columns.py
+"""
+import random
+
+import numpy as np
+import pandas as pd
+
+from _fixture import design_kwargs, tmpdir, run_tests
+
+from asopipe.main import ASOdesign
+from asopipe.utils.align.maf_th import check_wobble_batch, encode_seqs
+from asopipe.utils.columns import ResultColumns
+
+
+def _records(n, seed):
+    rng = random.Random(seed)
+    records = []
+    for i in range(n):
+        if rng.random() < 0.1:
+            records.append(None)        # 에러 결과 = 모든 값이 None 인 행
+            continue
+        rec = {"ASO_Locus": f"chr1:{i}-{i+16}+", "ASO_Sequence": "ACGT" * 4 + "A", "Length": 17,
+               "CommonSNP": [] if rng.random() < 0.7 else [f"rs{i}"], "Gquad": rng.random() < 0.1,
+               "CpG": rng.randint(0, 3), "GC_Content": rng.random()}
+        if rng.random() < 0.8:
+            rec["Homo_Dimer"], rec["Monomer"] = -rng.random() * 10, -rng.random() * 5
+        records.append(rec)
+    return records
+
+
+def _maf(n, seed, asm="mm39"):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        ref = ''.join(rng.choice('ACGTacgt-') for _ in range(17))
+        if r < 0.1:
+            out.append(None)
+        elif r < 0.2:
+            out.append({"hg38": ref})
+        elif r < 0.3:
+            out.append({"hg38": ref, asm: None})
+        else:
+            qry = list(ref)
+            qry[rng.randrange(17)] = rng.choice('ACGT')
+            out.append({"hg38": ref, asm: ''.join(qry)})
+    return out
+
+
+def test_columns_match_lists():
+    records = _records(500, 1)
+    builder = ResultColumns.from_records(records[:200])
+    builder.extend(ResultColumns.from_records(records[200:300])).extend(ResultColumns.from_records([]))
+    builder.add_records(records[300:])
+    keys = list(dict.fromkeys(k for rec in records if rec for k in rec))
+    expected = {k: [None if rec is None else rec.get(k) for rec in records] for k in keys}
+    maf = _maf(500, 2)
+    coverage = [None if d is None or d.get("mm39") is None else i % 4 for i, d in enumerate(maf)]
+    builder.add_assembly("mm39", maf, coverage)
+    builder.add_wobble("mm39", anti_strand="-", wobble=2)
+    ref = [None if d is None else d.get("hg38") for d in maf]
+    qry = [None if d is None else d.get("mm39") for d in maf]
+    expected["maf_seq_mm39"] = [f"{a}:{b}" for a, b in zip(ref, qry)]
+    expected["coverage_mm39"] = coverage
+    # 기존 add_wobble: 서열이 없는 타일은 str(None) = 'None' 으로 인코딩
+    expected["wobble_mm39"] = check_wobble_batch(encode_seqs([str(s) for s in ref])[0], encode_seqs([str(s) for s in qry])[0],
+                                                 anti_strand="-", wob=2)
+    got = builder.to_dict()
+    assert got == expected and list(got) == list(expected)
+    assert all(type(v) is int for v in got["CpG"] if v is not None)
+
+    df = builder.to_dataframe()
+    assert list(df.columns) == list(expected)
+    assert df["Length"].dtype == "Int64" and df["CpG"].isna().sum() == expected["CpG"].count(None)
+    assert df["coverage_mm39"].tolist() == [pd.NA if v is None else v for v in coverage]
+    assert df["maf_seq_mm39"].tolist() == expected["maf_seq_mm39"]
+    full = ResultColumns.from_records([rec for rec in records if rec])
+    assert full.to_dataframe()["GC_Content"].dtype == np.float64
+
+
+def test_untyped_values_fall_back_to_lists():
+    builder = ResultColumns.from_records([{"Length": 17, "CpG": 1}, {"Length": 18, "CpG": "n/a"}])
+    builder.extend(ResultColumns.from_records([{"Length": 19, "CpG": 2}]))
+    builder.add_records([{"Length": 20}])
+    assert builder.to_dict() == {"Length": [17, 18, 19, 20], "CpG": [1, "n/a", 2, None]}
+    empty = ResultColumns.from_records([], columns=("ASO_Sequence", "Length"))
+    empty.add_assembly("mm39", [], [])
+    empty.add_wobble("mm39", anti_strand="+", wobble=2)
+    assert empty.to_dict() == {"ASO_Sequence": [], "Length": [], "maf_seq_mm39": [], "coverage_mm39": [], "wobble_mm39": []}
+    assert len(empty.to_dataframe()) == 0
+
+
+def test_process_main_result_not_stringified():
+    aso = ASOdesign(transid="NR_000003", tile_length=17, **design_kwargs())
+    expected = aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=True)
+    got = aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=True, to_csv=True, output_path=tmpdir())
+    assert got == expected
+    assert any(isinstance(w, dict) for w in got["default"]["wobble_mm39"])
+    assert not any(k.startswith("gapmer_") for k in got["default"])
+    df = aso.process_main(max_workers=1, wobble=2, to_df=True, gapmer_filtered=True, to_csv=True, output_path=tmpdir())
+    assert list(df["default"].columns) == list(expected["default"])
+    assert df["default"]["wobble_mm39"].tolist() == expected["default"]["wobble_mm39"]
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,101 @@
+"""
+levenshtein_batch / average_edit_distance_batch 를 levenshtein_distance / average_edit_distance 와 비교하고,
+Numba 가 없거나 컴파일에 실패할 때 순수 Python 구현으로 돌아가고, 그 밖의 커널 예외는 그대로 올라오는지 확인합니다.
+  python script/test_coverage.py   또는   python -m pytest script/test_coverage.py
+"""
+import random
+import warnings
+
+from _fixture import run_tests
+
+from asopipe.utils import coverage
+from asopipe.utils.coverage import (levenshtein_distance, levenshtein_batch,
+                                    average_edit_distance, average_edit_distance_batch)
+
+
+def _seqs(n=3000, seed=9):
+    rng = random.Random(seed)
+    return ([''.join(rng.choice('ACGT-') for _ in range(rng.randint(0, 30))) for _ in range(n)],
+            [''.join(rng.choice('ACGT-') for _ in range(rng.randint(0, 30))) for _ in range(n)])
+
+
+def test_levenshtein_batch_matches():
+    A, B = _seqs()
+    for costs in [(1, 1, 1), (2, 1, 3)]:
+        expected = [levenshtein_distance(a, b, *costs) for a, b in zip(A, B)]
+        assert levenshtein_batch(A, B, *costs).tolist() == expected
+        assert levenshtein_batch(A, B, *costs, parallel=True).tolist() == expected
+
+
+def test_average_edit_distance_batch_matches():
+    A, B = _seqs(500)
+    A[3], B[7] = None, None
+    expected = [average_edit_distance([a, b]) if a is not None and b is not None else None for a, b in zip(A, B)]
+    assert average_edit_distance_batch(A, B) == expected
+    assert average_edit_distance_batch([], []) == []
+    try:
+        levenshtein_batch(["A"], [])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("length mismatch")
+
+
+def test_fallback_without_numba():
+    A, B = _seqs(200)
+    expected = [levenshtein_distance(a, b) for a, b in zip(A, B)]
+    has_numba = coverage._HAS_NUMBA
+    try:
+        coverage._HAS_NUMBA = False
+        assert levenshtein_batch(A, B).tolist() == expected
+    finally:
+        coverage._HAS_NUMBA = has_numba
+
+
+def test_fallback_on_jit_failure():
+    if not coverage._HAS_NUMBA:
+        return
+    from numba.core.errors import TypingError
+    A, B = _seqs(200)
+    expected = [levenshtein_distance(a, b) for a, b in zip(A, B)]
+    kernel = coverage._levenshtein_batch
+
+    def broken(*args):
+        raise TypingError("simulated compilation failure")
+
+    try:
+        coverage._levenshtein_batch = broken
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            assert levenshtein_batch(A, B).tolist() == expected
+        assert [w.category for w in caught] == [RuntimeWarning]
+        assert coverage._HAS_NUMBA is False
+    finally:
+        coverage._levenshtein_batch = kernel
+        coverage._HAS_NUMBA = True
+
+
+def test_kernel_errors_propagate():
+    if not coverage._HAS_NUMBA:
+        return
+    kernel = coverage._levenshtein_batch
+
+    def buggy(*args):
+        raise IndexError("not a compilation error")
+
+    try:
+        coverage._levenshtein_batch = buggy
+        try:
+            levenshtein_batch(["ACGT"], ["ACGA"])
+        except IndexError:
+            pass
+        else:
+            raise AssertionError("kernel error was swallowed")
+        assert coverage._HAS_NUMBA is True
+    finally:
+        coverage._levenshtein_batch = kernel
+    assert levenshtein_batch(["ACGT"], ["ACGA"]).tolist() == [1]
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,60 @@
+"""
+write_result_dataset / read_result_dataset 로 쓴 Parquet / IPC 데이터셋을 process_main 결과 딕셔너리와 비교합니다.
+어셈블리별 컬럼이 없는 결과(conservation 제외)는 파티션 하나에만 쓰이는지도 확인한다.
+  python script/test_dataset.py   또는   python -m pytest script/test_dataset.py
+"""
+import os
+
+import pyarrow.compute as pc
+
+from _fixture import QUERY_ASSEMBLY, design_kwargs, tmpdir, run_tests
+
+from asopipe.main import ASOdesign
+from asopipe.utils.dataset import read_result_dataset, write_result_dataset, partition_dir, NO_ASSEMBLY
+
+
+def _result(transid="NR_000003", tile_length=18, features=None):
+    aso = ASOdesign(transid=transid, tile_length=tile_length, **design_kwargs(features=features))
+    return aso.process_main(max_workers=1, wobble=1, to_df=False)["default"]
+
+
+def test_roundtrip_per_assembly():
+    data = _result()
+    for fmt in ("parquet", "ipc"):
+        root = tmpdir()
+        paths = write_result_dataset(data, root, "NR_000003", 18, QUERY_ASSEMBLY, fmt=fmt)
+        assert len(paths) == len(QUERY_ASSEMBLY)
+        table = read_result_dataset(root, fmt=fmt)
+        assert table.num_rows == len(QUERY_ASSEMBLY) * len(data["ASO_Locus"])
+        for asm in QUERY_ASSEMBLY:
+            rows = table.filter(pc.field("assembly") == asm).to_pylist()
+            assert [r["ASO_Locus"] for r in rows] == data["ASO_Locus"]
+            for i, row in enumerate(rows):
+                assert f"{row['maf_ref']}:{row['maf_query']}" == data[f"maf_seq_{asm}"][i]
+                assert row["coverage"] == data[f"coverage_{asm}"][i]
+                wobble = data[f"wobble_{asm}"][i]
+                assert (row["wobble"] is None) if wobble is False else (row["wobble"] == wobble)
+                assert [(s["chrom"], s["pos"], s["ref"], s["alt"]) for s in row["CommonSNP"]] == \
+                       [tuple(x[:4]) for x in data["CommonSNP"][i]]
+            assert f"maf_seq_{asm}" not in table.column_names
+
+
+def test_single_partition_without_assembly_columns():
+    data = _result(features=["Type", "RegionType", "GC_Content", "CommonSNP"])
+    assert not any(k.endswith(tuple(QUERY_ASSEMBLY)) for k in data)
+    for fmt in ("parquet", "ipc"):
+        root = tmpdir()
+        paths = write_result_dataset(data, root, "NR_000003", 18, QUERY_ASSEMBLY, fmt=fmt)
+        assert len(paths) == 1
+        assert os.path.dirname(paths[0]) == partition_dir(root, "NR_000003", 18, None)
+        assert os.path.basename(os.path.dirname(paths[0])) == f"assembly={NO_ASSEMBLY}"
+        assert sorted(os.listdir(os.path.join(root, "transcript=NR_000003", "k=18"))) == [f"assembly={NO_ASSEMBLY}"]
+        table = read_result_dataset(root, fmt=fmt)
+        assert table.num_rows == len(data["ASO_Locus"])
+        assert table.column("assembly").null_count == table.num_rows
+        assert table.column("ASO_Locus").to_pylist() == data["ASO_Locus"]
+        assert table.column("GC_Content").to_pylist() == data["GC_Content"]
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,122 @@
+"""
+배열 연산 gapmer() / gap_cpg_mask() 를 타일마다 판정하던 기존 gapmer 구현(_reference_gapmer)과 비교합니다.
+짝수 / 홀수 길이, 64 nt 이상 타일, gapmer_coord 지정, coverage 0 / None, wobble False / 빈 dict 를 섞어 본다.
+  python script/test_gapmer.py   또는   python -m pytest script/test_gapmer.py
+"""
+import copy
+import random
+
+from _fixture import run_tests
+
+from asopipe.pipeline.gapmer import gapmer, gap_cpg_mask, filter_gapmer, _getWingCoord, flaten_list
+
+_WOBBLE_KEYS = ('GU_humanC', 'GU_otherC', 'I_humanC', 'I_otherwise')
+
+
+def _reference_gapmer(result, middle_size=10, gapmer_coord='', target_assembly=["mm39"]):
+    """배열 연산 이전의 gapmer (타일 / 어셈블리마다 판정)."""
+    wingcoordL = _getWingCoord(result=result, middle_size=middle_size, gapmer_coord=gapmer_coord)
+    for assembly in target_assembly:
+        gapmer_filtered = []
+        for _coverage, _wobble, coords in zip(result[f"coverage_{assembly}"], result[f"wobble_{assembly}"], wingcoordL):
+            gapL = [True for _item in [item[1].upper() for item in coords if item != None] if "CG" in _item]
+            wingL = [item[0] for item in coords if item != None]
+            if True in gapL:
+                gapmer_filtered.append(False)
+                continue
+            if str(_coverage) == "0" or str(_coverage) == "None":
+                if not _wobble or not _wobble["GU_humanC"]:
+                    gapmer_filtered.append(False)
+                    continue
+                if any(wing_coord[0] <= i < wing_coord[0] + wing_coord[1]
+                       for i in _wobble['GU_humanC'] for wing_coord in wingL):
+                    gapmer_filtered.append(False)
+                    continue
+                if len(set(flaten_list([v for k, v in _wobble.items() if k != 'GU_humanC'])) - set(_wobble['GU_humanC'])) > 0:
+                    gapmer_filtered.append(False)
+                    continue
+                gapmer_filtered.append(True)
+            else:
+                gapmer_filtered.append(True)
+        result[f"gapmer_filtered_{assembly}"] = gapmer_filtered
+        result[f'gapmer_coords_{assembly}'] = [":".join(['_'.join(map(str, wing_coord)) for wing_coord in wingL])] * len(gapmer_filtered)
+    keep = [any(result[f"gapmer_filtered_{asm}"][i] for asm in target_assembly) for i in range(len(result["Length"]))]
+    return {k: [v for v, kp in zip(lst, keep) if kp] for k, lst in result.items()}
+
+
+def _wobble(rng, length):
+    r = rng.random()
+    if r < 0.2:
+        return False
+    if r < 0.25:
+        return {}
+    positions = lambda p: sorted(rng.sample(range(length), rng.randint(0, 3))) if rng.random() < p else []
+    w = {k: positions(0.8 if k == 'GU_humanC' else 0.3) for k in _WOBBLE_KEYS}
+    if w['GU_humanC'] and rng.random() < 0.3:    # 다른 클래스가 GU_humanC 위치와 겹치는 경우
+        w['GU_otherC'] = list(w['GU_humanC'])
+    return w
+
+
+def _result(n, lengths, seed, assemblies=("mm39", "rn7")):
+    rng = random.Random(seed)
+    L = [rng.choice(lengths) for _ in range(n)]
+    result = {"ASO_Sequence": [''.join(rng.choice('ACGTacgt' if rng.random() < 0.3 else 'ACGT') for _ in range(l)) for l in L],
+              "Length": L}
+    for asm in assemblies:
+        result[f"coverage_{asm}"] = [rng.choice([0, 0, None, "0", 1, 3, 12]) for _ in range(n)]
+        result[f"wobble_{asm}"] = [_wobble(rng, l) for l in L]
+    return result
+
+
+def _check(result, **kwargs):
+    expected = _reference_gapmer(copy.deepcopy(result), **kwargs)
+    got = gapmer(copy.deepcopy(result), **kwargs)
+    assert got == expected
+    return got
+
+
+def test_gapmer_matches_reference():
+    for seed, lengths in enumerate(([17], [18, 19, 20], list(range(10, 30)), [63, 64, 65, 70])):
+        got = _check(_result(3000, lengths, seed), target_assembly=["mm39", "rn7"])
+        assert 0 < len(got["Length"]) < 3000
+    _check(_result(500, [20, 21], 7), target_assembly=["rn7"])
+    _check(_result(500, [17, 20], 8), middle_size=8, target_assembly=["mm39", "rn7"])
+
+
+def test_gapmer_coord():
+    for coord in ("5_10_5", "3_10_4", "4_9_0"):
+        _check(_result(1000, [17, 18, 19, 20], 11), gapmer_coord=coord, target_assembly=["mm39", "rn7"])
+
+
+def test_gap_cpg_mask():
+    result = _result(2000, list(range(10, 25)), 13)
+    wings = _getWingCoord(result=result)
+    expected = [any("CG" in item[1].upper() for item in coords if item is not None) for coords in wings]
+    assert gap_cpg_mask(result["ASO_Sequence"], result["Length"]).tolist() == expected
+    assert gap_cpg_mask([], []).tolist() == []
+
+
+def test_filter_gapmer_and_errors():
+    result = {"a": [1, 2, 3, 4], "gapmer_filtered_x": [True, False, False, True], "gapmer_filtered_y": [False, False, True, True]}
+    assert filter_gapmer(dict(result)) == {"a": [1, 3, 4], "gapmer_filtered_x": [True, False, True],
+                                           "gapmer_filtered_y": [False, True, True]}
+    assert filter_gapmer(dict(result), keep_rule=all)["a"] == [4]
+    for bad in ({"a": [1]}, dict(result, a=[1, 2])):
+        try:
+            filter_gapmer(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(bad)
+    try:
+        gapmer(_result(10, [9], 1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("length < middle_size")
+    empty = gapmer({"ASO_Sequence": [], "Length": [], "coverage_mm39": [], "wobble_mm39": []})
+    assert empty["gapmer_filtered_mm39"] == [] and empty["Length"] == []
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,65 @@
+"""
+process_main(lazy=True) 를 모든 타일을 계산하는 process_main 과 비교하고,
+필터를 통과한 타일이 하나도 없어도 같은 컬럼(스키마)의 빈 결과 / CSV 를 내는지 확인합니다.
+  python script/test_lazy.py   또는   python -m pytest script/test_lazy.py
+"""
+import os
+
+import numpy as np
+import pyarrow.csv as pacsv
+
+from _fixture import design_kwargs, tmpdir, run_tests
+
+from asopipe.main import ASOdesign
+from asopipe.pipeline.filters import TileFilter, gc_filter
+
+_DROP_ALL = TileFilter('drop_all', 0, lambda tiles: np.zeros(len(tiles), dtype=bool))
+
+
+def _aso(transid="NR_000003", tile_length=17, **kwargs):
+    return ASOdesign(transid=transid, tile_length=tile_length, **design_kwargs(**kwargs))
+
+
+def _eager(aso, gapmer_filtered):
+    result = aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=gapmer_filtered)
+    return result["gapmer"] if gapmer_filtered else result["default"]
+
+
+def _rows(data, keep):
+    return {k: [v for v, kp in zip(values, keep) if kp] for k, values in data.items()}
+
+
+def test_lazy_matches_eager():
+    aso = _aso()
+    expected = _eager(aso, True)
+    for max_workers in (1, 2):
+        got = aso.process_main(max_workers=max_workers, wobble=2, to_df=False, gapmer_filtered=True, lazy=True)
+        assert got["gapmer"] == expected
+    # 필터만 (gapmer 판정 없이): 모든 타일 결과에서 필터를 통과한 행과 같다
+    default = _eager(aso, False)
+    got = aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=False, lazy=True,
+                           filters=[gc_filter(0.4, 0.6)])
+    assert got["default"] == _rows(default, [0.4 <= gc <= 0.6 for gc in default["GC_Content"]])
+
+
+def test_zero_survivors_keep_schema():
+    for features in (None, ["conservation", "GC_Content", "CommonSNP"]):
+        aso = _aso(features=features)
+        for gapmer_filtered in (True, False):
+            expected = _eager(aso, gapmer_filtered)
+            assert expected["ASO_Locus"]
+            out = tmpdir()
+            result = aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=gapmer_filtered, lazy=True,
+                                      filters=[_DROP_ALL], to_csv=True, output_path=out)
+            got = result["gapmer" if gapmer_filtered else "default"]
+            assert list(got) == list(expected), (features, gapmer_filtered)
+            assert all(values == [] for values in got.values())
+            suffix = "_gapmer_filtered" if gapmer_filtered else "_filtered"
+            table = pacsv.read_csv(os.path.join(out, os.path.basename(aso._output_path(out, 2, suffix=suffix))))
+            assert table.num_rows == 0 and table.column_names == list(expected)
+    df = aso.process_main(max_workers=1, wobble=2, to_df=True, gapmer_filtered=True, lazy=True, filters=[_DROP_ALL])["gapmer"]
+    assert len(df) == 0 and list(df.columns) == list(_eager(aso, True))
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,93 @@
+"""
+워커 풀 getlocInfo (_locinfo_parallel) 가 구간 몫의 타일 / SNP / feature 표만 보내고도
+한 프로세스에서 _locinfo_range 로 계산한 결과와 같은지 확인합니다.
+  python script/test_locinfo.py   또는   python -m pytest script/test_locinfo.py
+"""
+import concurrent.futures
+
+from _fixture import design_kwargs, run_tests
+
+import asopipe.main as main
+from asopipe.main import ASOdesign, _locinfo_chunk
+from asopipe.utils.columns import ResultColumns
+from asopipe.utils.rna import CommonSNPSpan
+
+
+class _InlineExecutor:
+    """ex.map 을 현재 프로세스에서 돌리고 받은 작업을 기록한다."""
+
+    def __init__(self):
+        self.tasks = []
+
+    def map(self, fn, tasks):
+        tasks = list(tasks)
+        self.tasks.extend(tasks)
+        return [fn(task) for task in tasks]
+
+
+def _aso(transid, tile_length=17, **kwargs):
+    return ASOdesign(transid=transid, tile_length=tile_length, **design_kwargs(**kwargs))
+
+
+def test_tileset_subset():
+    for transid in ("NM_000001", "NM_000002"):
+        aso = _aso(transid, 19)
+        tiles = aso.tiles
+        for lo, hi in ((0, 1), (0, 500), (1234, 3000), (len(tiles) - 7, len(tiles))):
+            sub = tiles.subset(lo, hi)
+            assert len(sub) == hi - lo
+            assert list(sub.seqs()) == list(tiles.seqs()[lo:hi])
+            assert [l.toString() for l in sub.loci()] == [l.toString() for l in tiles.loci()[lo:hi]]
+            assert len(sub.txn_seq) == hi - lo - 1 + tiles.tile_length
+
+
+def test_snp_span_slice():
+    aso = _aso("NM_000001")
+    span = aso.snp_span()
+    assert span.records
+    L = aso.tile_length
+    for lo, hi in ((0, 700), (700, 4000), (4000, len(aso.tiles))):
+        sub = span.slice(int(aso.tiles.starts[lo]) - 1, int(aso.tiles.starts[hi - 1]) + L - 1)
+        assert len(sub.records) <= len(span.records)
+        for loc in aso.tiles.loci()[lo:hi]:
+            assert sub.query(loc) == span.query(loc)
+    empty = CommonSNPSpan.__new__(CommonSNPSpan)
+    empty.records = None
+    assert empty.slice(0, 10) is None
+
+
+def test_parallel_matches_single_process():
+    for transid in ("NM_000001", "NM_000002"):
+        aso = _aso(transid)
+        cofold_map = aso.cofold_table()
+        expected = ResultColumns.from_records(aso._locinfo_range(aso.tiles, 0, len(aso.tiles), cofold_map=cofold_map),
+                                              aso.ref_asm).to_dict()
+        main._snp_handles.clear()
+        ex = _InlineExecutor()
+        got = aso._locinfo_parallel(ex, 4, cofold_map=cofold_map).to_dict()
+        assert got == expected
+        # 워커는 자기 구간의 타일 / 표만 받고, SNP 를 다시 읽지 않는다
+        assert len(ex.tasks) > 1 and not main._snp_handles
+        for transInfo, tiles, snp_args, sub_cofold, sub_snp, sub_features, features in ex.tasks:
+            assert len(tiles.txn_seq) == len(tiles) - 1 + tiles.tile_length < len(aso.txn_seq)
+            assert set(sub_cofold) == set(sub_features) == set(tiles.seqs())
+            assert sub_snp is not None and sub_snp.cSNP is None
+        # 구간 [lo, hi) 만 (process_stream)
+        got = aso._locinfo_parallel(_InlineExecutor(), 4, cofold_map=cofold_map, lo=1000, hi=2500).to_dict()
+        assert got == {key: values[1000:2500] for key, values in expected.items()}
+
+
+def test_parallel_in_worker_pool():
+    aso = _aso("NM_000002", 20)
+    expected = ResultColumns.from_records(aso._locinfo_range(aso.tiles, 0, len(aso.tiles)), aso.ref_asm).to_dict()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=2) as ex:
+        assert aso._locinfo_parallel(ex, 2).to_dict() == expected
+    # SNP 를 넘기지 못하면 (None) 워커가 자기 VCF 핸들로 읽는다
+    main._snp_handles.clear()
+    part = _locinfo_chunk((aso.transInfo, aso.tiles.subset(0, 300), aso.snp_args, None, None, None, aso.features))
+    assert main._snp_handles
+    assert part.to_dict() == {key: values[:300] for key, values in expected.items()}
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,123 @@
+"""
+LocusCache 를 켠 MAF 결과(maf_table / lazy 의 _maf_subset)를 캐시 없이 구한 결과와 비교하고,
+maf_fingerprint 가 백엔드가 읽는 파일(.maf 또는 트랙)에만 반응하는지 확인합니다.
+  python script/test_locus_cache.py   또는   python -m pytest script/test_locus_cache.py
+"""
+import os
+import time
+import shutil
+import threading
+
+from _fixture import ROOT, FIXTURE_DIR, design_kwargs, tmpdir, run_tests
+
+from asopipe.main import ASOcontext, ASOdesign
+from asopipe.utils.align.maf_track import build_track, default_track_dir
+from asopipe.utils.locus_cache import LocusCache, maf_fingerprint
+
+
+def _touch(path, seconds=100):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + seconds * 10 ** 9))
+
+
+def test_fingerprint_backend_files():
+    maf_dir = tmpdir()
+    for name in os.listdir(FIXTURE_DIR):
+        if ".synNet." in name:
+            shutil.copy(os.path.join(FIXTURE_DIR, name), maf_dir)
+    maf = os.path.join(maf_dir, "hg38.mm39.synNet.maf")
+    fp = maf_fingerprint(maf_dir, "hg38", "mm39")
+    rn7 = maf_fingerprint(maf_dir, "hg38", "rn7")
+    assert fp != rn7 and fp == maf_fingerprint(maf_dir, "hg38", "mm39", "maf")
+    # 처음 조회할 때 만들어지는 .index 는 넣지 않는다
+    _touch(f"{maf}.index")
+    assert maf_fingerprint(maf_dir, "hg38", "mm39") == fp
+    os.remove(f"{maf}.index")
+    assert maf_fingerprint(maf_dir, "hg38", "mm39") == fp
+    _touch(maf)
+    fp_maf = maf_fingerprint(maf_dir, "hg38", "mm39")
+    assert fp_maf != fp and maf_fingerprint(maf_dir, "hg38", "rn7") == rn7
+
+    # track: 트랙 디렉토리 안의 파일만 본다 (.maf 가 바뀌어도 트랙을 다시 만들기 전에는 같은 결과)
+    missing = maf_fingerprint(maf_dir, "hg38", "mm39", "track")
+    track_dir = default_track_dir(maf_dir, "hg38", "mm39")
+    build_track([maf], track_dir, ref_assembly="hg38", query_assembly="mm39")
+    fp_track = maf_fingerprint(maf_dir, "hg38", "mm39", "track")
+    assert fp_track not in (missing, fp_maf)
+    _touch(maf)
+    assert maf_fingerprint(maf_dir, "hg38", "mm39", "track") == fp_track
+    _touch(os.path.join(track_dir, sorted(os.listdir(track_dir))[0]))
+    assert maf_fingerprint(maf_dir, "hg38", "mm39", "track") != fp_track
+
+
+def test_cached_maf_matches_uncached():
+    kwargs = design_kwargs()
+    cache_dir = tmpdir()
+    context_kwargs = {k: kwargs[k] for k in ("refFlat_path", "maf_dir", "dbsnp_path", "dbsnp_index_path", "ref_assembly")}
+    tile_lengths = [17, 19]
+    expected = {}
+    with ASOcontext(max_workers=2, **context_kwargs) as context:
+        for transid in ("NM_000001", "NM_000004", "NM_000005"):
+            expected[transid] = ASOdesign(transid=transid, context=context, **kwargs).maf_table(tile_lengths, max_workers=2)
+    # 첫 실행은 NM_000001 이 블록을 채우고 같은 구간의 isoform / 반대 가닥 전사체가 다시 쓴다, 두 번째는 모두 캐시에서
+    for _ in range(2):
+        with ASOcontext(max_workers=2, locus_cache_dir=cache_dir, **context_kwargs) as context:
+            for transid in ("NM_000001", "NM_000004", "NM_000005"):
+                aso = ASOdesign(transid=transid, context=context, **kwargs)
+                assert aso.maf_table(tile_lengths, max_workers=2) == expected[transid], transid
+            assert len(context.locus_cache.cache) > 0
+    # 캐시 블록 일부만 쓰는 lazy 경로 (_maf_subset)
+    with ASOcontext(max_workers=2, locus_cache_dir=cache_dir, **context_kwargs) as context:
+        aso = ASOdesign(transid="NM_000004", tile_length=17, context=context, **kwargs)
+        got = aso.process_main(max_workers=2, wobble=2, to_df=False, gapmer_filtered=True, lazy=True)
+    aso = ASOdesign(transid="NM_000004", tile_length=17, **kwargs)
+    assert got == aso.process_main(max_workers=2, wobble=2, to_df=False, gapmer_filtered=True, lazy=True)
+
+
+def test_shared_across_threads():
+    # run_batch 의 전사체 스레드가 동시에 처음 불러도 Cache / fingerprint 는 한 번만 만든다
+    import asopipe.utils.locus_cache as locus_cache
+    created, fingerprints = [], []
+    cache_cls, fingerprint_fn = locus_cache.Cache, locus_cache.maf_fingerprint
+
+    def slow_cache(*args, **kwargs):
+        time.sleep(0.05)
+        created.append(1)
+        return cache_cls(*args, **kwargs)
+
+    def slow_fingerprint(*args):
+        time.sleep(0.05)
+        fingerprints.append(args)
+        return fingerprint_fn(*args)
+
+    cache = LocusCache(tmpdir(), FIXTURE_DIR)
+    got = []
+    barrier = threading.Barrier(8)
+
+    def worker():
+        barrier.wait()
+        got.append((cache.cache, cache.fingerprint("mm39")))
+
+    try:
+        locus_cache.Cache, locus_cache.maf_fingerprint = slow_cache, slow_fingerprint
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        locus_cache.Cache, locus_cache.maf_fingerprint = cache_cls, fingerprint_fn
+    assert len(created) == 1 and len(fingerprints) == 1
+    assert len({id(c) for c, _ in got}) == 1 and len({f for _, f in got}) == 1
+    cache.close()
+
+
+def test_cache_default_dir():
+    # 기본 위치는 사용자 캐시 디렉토리 (저장소 밖)
+    directory = LocusCache(maf_dir=FIXTURE_DIR).directory
+    assert os.path.basename(directory) == "locus"
+    assert os.path.commonpath([os.path.realpath(directory), ROOT]) != ROOT
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,129 @@
+"""
+MultipleAlignmentReader 의 span 조회(query_span / query_span_multi / AlignmentSpan)와 pack_results 를
+타일마다 bx 인덱스를 다시 읽는 원래 구현(_reference_query)과 비교합니다.
+  python script/test_maf.py   또는   python -m pytest script/test_maf.py
+"""
+import random
+
+from _fixture import copy_fixture, run_tests
+
+from asopipe.utils.align.maf_th import MultipleAlignmentReader, pack_results, unpack_results
+
+
+def _reader(asm="mm39", **kwargs):
+    return MultipleAlignmentReader(ref_assembly="hg38", query_assembly=asm, maf_dir=copy_fixture(), **kwargs)
+
+
+def _slice(reader, alignment, region_name, s, e, verbose):
+    """원래 query() 의 블록 하나 처리: 잘리지 않으면 None, 컴포넌트가 모자라면 {} (fallback 신호)."""
+    try:
+        region_alignment = alignment.slice_by_component(region_name, s, e)
+    except ValueError:
+        return None
+    seqs = {c.src: c.text for c in region_alignment.components
+            if c.src.startswith((reader.ref_assembly, reader.query_assembly))}
+    if not verbose:
+        seqs = {k.split('.')[0]: v for k, v in seqs.items()}
+    return seqs if len(seqs) >= 2 else {}
+
+
+def _reference_query(reader, chrom, s, e, verbose):
+    """타일 하나를 블록 단위로, 안 되면 베이스 단위로 조회해 병합하는 원래 구현 (0-base [s, e))."""
+    idx = reader._get_index(chrom)
+    region_name = f"{reader.ref_assembly}.{chrom}"
+    for alignment in idx.get(region_name, s, e):
+        seqs = _slice(reader, alignment, region_name, s, e, verbose)
+        if seqs is None:
+            continue
+        if seqs:
+            return seqs
+        break
+    return _reference_one_by_one(reader, chrom, s, e, verbose)
+
+
+def _reference_one_by_one(reader, chrom, s, e, verbose):
+    """원래 query_one_by_one(): 베이스마다 첫 블록을 조회해 병합."""
+    idx = reader._get_index(chrom)
+    region_name = f"{reader.ref_assembly}.{chrom}"
+    results = []
+    for pos in range(s, e):
+        for alignment in idx.get(region_name, pos, pos + 1):
+            seqs = _slice(reader, alignment, region_name, pos, pos + 1, verbose)
+            if seqs is None:
+                continue
+            results.append(seqs or None)
+            break
+    if not results:
+        return None
+    merged = results[0]
+    for d in results[1:]:
+        if not merged or not d:
+            return None
+        try:
+            merged = {key: merged[key] + d[key] for key in merged}
+        except KeyError:
+            return None
+    return merged or None
+
+
+def test_query_span_matches_reference():
+    for asm in ("mm39", "rn7"):
+        reader = _reader(asm)
+        for L, start, end in ((1, 900, 5000), (17, 900, 5000), (300, 1800, 2600)):
+            span = reader.query_span("chr1", start, end, L)
+            ref = [_reference_query(reader, "chr1", s, s + L, False) for s in range(start, end - L + 1)]
+            assert len(span) == len(ref)
+            bad = [i for i, (a, b) in enumerate(zip(span, ref)) if a != b]
+            assert not bad, (asm, L, bad[:3], span[bad[0]], ref[bad[0]])
+            assert any(r is None for r in ref) and any(r is not None for r in ref)
+
+
+def test_query_matches_reference():
+    reader = _reader("mm39")
+    rng = random.Random(1)
+    for _ in range(300):
+        s = rng.randint(800, 27000)
+        L = rng.choice([1, 2, 17, 60, 400])
+        verbose = rng.random() < .5
+        expected = _reference_query(reader, "chr1", s, s + L, verbose)
+        span = reader.load_span("chr1", s, s + L, verbose=verbose)
+        assert span.query(s, s + L) == expected, (s, L, verbose)
+        assert span.query_one_by_one(s, s + L) == _reference_one_by_one(reader, "chr1", s, s + L, verbose), (s, L)
+
+
+def test_query_span_multi_matches_query_span():
+    reader = _reader("rn7")
+    multi = reader.query_span_multi("chr1", 11000, 21000, [17, 18, 25])
+    for L, tiles in multi.items():
+        assert tiles == reader.query_span("chr1", 11000, 21000, L)
+
+
+def test_span_edges():
+    reader = _reader("mm39")
+    assert reader.query_span("chr1", 1000, 1010, 17) == []
+    assert reader.query_span("chr2", 0, 100, 17) == [None] * 84
+
+
+def test_pack_roundtrip():
+    reader = _reader("mm39")
+    tiles = reader.query_span("chr1", 900, 9000, 17)
+    packed = pack_results(tiles, ("hg38", "mm39"))
+    assert isinstance(packed, dict)
+    assert unpack_results(packed) == tiles
+    odd = [{"hg38": "ACGT", "mm39": None}, None, {"hg38": "AC"}, {"mm39": "AC", "hg38": "AC"}]
+    assert unpack_results(pack_results(odd, ("hg38", "mm39"))) == odd   # 키 순서가 다르면 리스트 그대로
+    assert unpack_results(pack_results(odd[:3], ("hg38", "mm39"))) == odd[:3]
+    assert unpack_results(pack_results([], ("hg38", "mm39"))) == []
+
+
+def test_reader_errors():
+    for kwargs in ({"query_assembly": None}, {"query_assembly": "mm39", "backend": "bogus"}):
+        try:
+            MultipleAlignmentReader(ref_assembly="hg38", maf_dir=copy_fixture(), **kwargs)
+        except ValueError:
+            continue
+        raise AssertionError(f"no ValueError for {kwargs}")
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
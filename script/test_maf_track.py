@@ -0,0 +1,78 @@
+"""
+build_track() 로 만든 memory-mapped 트랙(backend='track')의 조회 결과를 bx-python 인덱스(backend='maf')와 비교합니다.
+  python script/test_maf_track.py   또는   python -m pytest script/test_maf_track.py
+"""
+import os
+import random
+
+from _fixture import copy_fixture, tmpdir, run_tests
+
+from jklib.genome import locus
+
+from asopipe.utils.align.maf_th import MultipleAlignmentReader
+from asopipe.utils.align.maf_track import build_track, MafTrack
+
+_readers = {}
+
+
+def _readers_for(asm):
+    """(backend='maf', backend='track') reader 쌍. 트랙은 임시 디렉토리에 한 번만 만든다."""
+    if asm not in _readers:
+        d = copy_fixture()
+        track_dir = os.path.join(tmpdir(), f"hg38.{asm}.synNet.track")
+        build_track(os.path.join(d, f"hg38.{asm}.synNet.maf"), track_dir, "hg38", asm)
+        _readers[asm] = (MultipleAlignmentReader(ref_assembly="hg38", query_assembly=asm, maf_dir=d),
+                         MultipleAlignmentReader(ref_assembly="hg38", query_assembly=asm, maf_dir=d,
+                                                 backend="track", track_dir=track_dir))
+    return _readers[asm]
+
+
+def test_track_tiles_match_maf():
+    for asm in ("mm39", "rn7"):
+        maf, track = _readers_for(asm)
+        for L in (1, 17, 200):
+            for verbose in (False, True):
+                a = maf.query_span("chr1", 800, 27000, L, verbose=verbose)
+                b = track.query_span("chr1", 800, 27000, L, verbose=verbose)
+                assert len(a) == len(b)
+                bad = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+                assert not bad, (asm, L, verbose, bad[:3], a[bad[0]], b[bad[0]])
+        assert maf.query_span_multi("chr1", 11000, 21000, [17, 20]) == track.query_span_multi("chr1", 11000, 21000, [17, 20])
+
+
+def test_track_query_matches_maf():
+    maf, track = _readers_for("mm39")
+    rng = random.Random(2)
+    for _ in range(2000):
+        s = rng.randint(800, 26000)
+        L = rng.choice([1, 2, 17, 60, 400])
+        verbose = rng.random() < .5
+        loc = locus(f"chr1:{s}-{s + L - 1}+")
+        assert maf.query(loc, verbose=verbose) == track.query(loc, verbose=verbose), (s, L, verbose)
+        assert maf.query_one_by_one(loc, verbose=verbose) == track.query_one_by_one(loc, verbose=verbose), (s, L, verbose)
+
+
+def test_track_unknown_chrom():
+    _, track = _readers_for("mm39")
+    assert track.query(locus("chr2:1-20+"), verbose=False) is None
+    assert track.query_span("chr2", 0, 100, 17) == [None] * 84
+
+
+def test_track_errors():
+    d = copy_fixture()
+    try:
+        build_track(os.path.join(d, "hg38.mm39.synNet.maf"), os.path.join(tmpdir(), "t"), "hg38", None)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("build_track without query_assembly")
+    try:
+        MafTrack(os.path.join(tmpdir(), "missing"))
+    except FileNotFoundError:
+        pass
+    else:
+        raise AssertionError("MafTrack on a directory without meta.json")
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,75 @@
+"""
+RegionAnnotator.annotate() 의 (Type, RegionType) 를 타일마다 getRegionType 을 부르는 getlocInfo 방식과 비교합니다.
++ / - 가닥 전사체, 여러 exon, noncoding, 짧은 exon / intron 을 걸치는 타일과 양 가닥 타일을 모두 본다.
+  python script/test_region.py   또는   python -m pytest script/test_region.py
+"""
+import os
+
+from _fixture import FIXTURE_DIR, TRANSCRIPTS, run_tests
+
+from jklib.genome import locus, getRegionType
+
+from asopipe.utils.basic import loadBlatOutput, _makeBlatRecord
+from asopipe.utils.region import RegionAnnotator, type_flag, region_string
+from asopipe.utils.tiles import TileSet
+
+
+def _expected(transInfo, loc):
+    """getlocInfo 가 타일마다 계산하는 (Type, RegionType)."""
+    h = {transInfo['chrom']: [transInfo]}
+    loc_tmp = locus(f'{loc.chrom}:{loc.chrSta+1}-{loc.chrEnd-1}{loc.strand}')
+    return type_flag(getRegionType(h, loc_tmp)), region_string(getRegionType(h, loc))
+
+
+def _check(transInfo, tiles):
+    got = RegionAnnotator(transInfo).annotate(tiles)
+    assert len(got) == len(tiles)
+    n_direct = 0
+    for loc, region in zip(tiles, got):
+        if region is None:      # getlocInfo 가 직접 계산하는 타일
+            n_direct += 1
+            continue
+        assert region == _expected(transInfo, loc), (loc.toString(), region, _expected(transInfo, loc))
+    return n_direct
+
+
+def _transcripts():
+    refFlat = loadBlatOutput(os.path.join(FIXTURE_DIR, "refFlat.txt"), by='transID')
+    return [refFlat[tid][0] for tid in TRANSCRIPTS]
+
+
+def test_every_tile_matches_getRegionType():
+    for transInfo in _transcripts():
+        for L in (17, 20):
+            for strand in ('+', '-'):
+                tiles = TileSet(transInfo['chrom'], strand, transInfo['txnSta'], transInfo['txnEnd'], L).loci()
+                n_direct = _check(transInfo, tiles)
+                assert n_direct < 0.01 * len(tiles), (transInfo['transID'], L, strand, n_direct)
+
+
+def test_locus_list_and_subsets():
+    transInfo = _transcripts()[1]   # NM_000002 (-, 4 exon)
+    tiles = TileSet(transInfo['chrom'], '+', transInfo['txnSta'], transInfo['txnEnd'], 18)
+    loci = [tiles.locus(i) for i in range(0, len(tiles), 7)]
+    assert RegionAnnotator(transInfo).annotate(loci) == RegionAnnotator(transInfo).annotate(tiles.loci())[::7]
+    view = tiles.loci()[100:400]
+    assert RegionAnnotator(transInfo).annotate(view) == RegionAnnotator(transInfo).annotate(list(view))
+    assert RegionAnnotator(transInfo).annotate([]) == []
+    # 다른 염색체 타일은 직접 계산으로 넘긴다
+    assert RegionAnnotator(transInfo).annotate([locus("chr2:12100-12116+")]) == [None]
+
+
+def test_short_exons_and_introns():
+    # 타일보다 짧은 exon / intron: 같은 label 구간 두 개에 걸친 타일이 생긴다
+    for strand, cds in (('+', (1010, 1100)), ('-', (1005, 1090)), ('+', (1000, 1000))):
+        transInfo = _makeBlatRecord("SHORT", "NM_999999", "chr1", strand, 1000, 1120, cds[0], cds[1],
+                                    [(1000, 1030), (1035, 1040), (1046, 1052), (1060, 1120)])
+        for L in (4, 17):
+            for tile_strand in ('+', '-'):
+                tiles = TileSet("chr1", tile_strand, 1000, 1120, L).loci()
+                n_direct = _check(transInfo, tiles)
+                assert n_direct < len(tiles)
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
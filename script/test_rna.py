@@ -0,0 +1,66 @@
+"""
+RNAcofold_batch 를 RNAcofold2 와 비교하고, cofold 디스크 캐시가 저장소 밖(사용자 캐시 디렉토리)에 생기는지,
+예전 위치(<repo>/.rnacofold_cache)에 캐시가 있으면 그것을 계속 쓰는지 확인합니다.
+  python script/test_rna.py   또는   python -m pytest script/test_rna.py
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import subprocess
+
+from _fixture import ROOT, tmpdir, run_tests
+
+_PROBE = """
+import json, sys
+sys.path.insert(0, sys.argv[1])
+from asopipe.utils import rna
+print(json.dumps([rna.CACHE_DIR, rna.RNAcofold_batch(sys.argv[2:]), [list(rna.RNAcofold2(s)) for s in sys.argv[2:]]]))
+"""
+
+
+def _probe(env, seqs, root=ROOT):
+    """새 인터프리터(환경 변수 env, 패키지 위치 root)에서 CACHE_DIR 와 cofold 결과를 구한다."""
+    out = subprocess.run([sys.executable, "-c", _PROBE, root] + seqs, env=dict(os.environ, **env),
+                         check=True, capture_output=True, text=True).stdout
+    cache_dir, batch, single = json.loads(out.strip().splitlines()[-1])
+    return cache_dir, [list(x) for x in batch], single
+
+
+def test_cofold_cache_dir():
+    rng = random.Random(3)
+    seqs = [''.join(rng.choice('ACGT') for _ in range(17)) for _ in range(5)]
+    seqs.append(seqs[0].lower())   # 대소문자만 다른 중복
+
+    root = tmpdir()
+    cache_dir, batch, single = _probe({"ASOPIPE_CACHE_DIR": root}, seqs)
+    assert cache_dir == os.path.join(root, "rnacofold")
+    assert batch == single
+    assert os.path.exists(os.path.join(cache_dir, "cache.db"))
+
+    explicit = os.path.join(tmpdir(), "cofold")
+    cache_dir, batch2, _ = _probe({"ASOPIPE_COFOLD_CACHE": explicit, "ASOPIPE_CACHE_DIR": root}, seqs)
+    assert cache_dir == explicit and batch2 == batch
+
+    # 기본 위치는 저장소 (여기서는 복사본 checkout) 밖
+    checkout = tmpdir()
+    shutil.copytree(os.path.join(ROOT, "asopipe"), os.path.join(checkout, "asopipe"),
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    home = tmpdir()
+    env = {"HOME": home, "XDG_CACHE_HOME": "", "ASOPIPE_CACHE_DIR": "", "ASOPIPE_COFOLD_CACHE": ""}
+    cache_dir, _, _ = _probe(env, seqs[:1], checkout)
+    assert cache_dir == os.path.join(home, ".cache", "asopipe", "rnacofold")
+    assert os.path.commonpath([cache_dir, checkout]) != checkout
+
+    # 예전 위치에 캐시가 남아 있으면 (환경 변수가 없을 때) 그대로 쓴다
+    legacy = os.path.join(checkout, ".rnacofold_cache")
+    os.makedirs(legacy)
+    cache_dir, _, _ = _probe(env, seqs[:1], checkout)
+    assert cache_dir == os.path.realpath(legacy) and os.path.exists(os.path.join(legacy, "cache.db"))
+    cache_dir, _, _ = _probe(dict(env, ASOPIPE_CACHE_DIR=root), seqs[:1], checkout)
+    assert cache_dir == os.path.join(root, "rnacofold")
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,116 @@
+"""
+StreamingTableWriter 를 save_csv_pyarrow 와 비교하고, process_main(stream=True) 가 청크 크기와 상관없이
+stream=False 의 CSV 와 같은 파일을 쓰는지, run_ASOdesign(stream=True) 가 모든 타일의 MAF / cofold 표를 미리 만들지 않는지 확인합니다.
+  python script/test_stream.py   또는   python -m pytest script/test_stream.py
+"""
+import os
+import random
+import filecmp
+
+import pyarrow as pa
+
+from _fixture import design_kwargs, tmpdir, run_tests
+
+from asopipe.main import ASOdesign, run_ASOdesign
+from asopipe.utils.csv import save_csv_pyarrow, StreamingTableWriter
+
+
+def _columns(n=1000, seed=5):
+    """process_main 결과와 같은 모양의 컬럼 딕셔너리 (None / 리스트 / 딕셔너리 값 포함)."""
+    rng = random.Random(seed)
+    return {
+        "Locus": [f"chr1:{i}-{i+16}+" for i in range(n)],
+        "Length": [17] * n,
+        "GC_Content": [rng.random() for _ in range(n)],
+        "Gquad": [rng.random() < 0.1 for _ in range(n)],
+        "CommonSNP": [[] if rng.random() < 0.7 else [f"rs{i}"] for i in range(n)],
+        "coverage_mm39": [None if rng.random() < 0.2 else rng.randint(0, 17) for _ in range(n)],
+        "wobble_mm39": [{"wobble": rng.randint(0, 3)} for _ in range(n)],
+        "gapmer_filtered_mm39": [rng.random() < 0.5 for _ in range(n)],
+    }
+
+
+def _chunks(data, bounds):
+    for lo, hi in zip(bounds, bounds[1:]):
+        yield {k: v[lo:hi] for k, v in data.items()}
+
+
+def test_writer_matches_save_csv_pyarrow():
+    data = _columns()
+    d = tmpdir()
+    # 첫 청크의 coverage 가 모두 None 이어도 컬럼 타입은 이름으로 고정된다
+    data["coverage_mm39"][:3] = [None] * 3
+    expected = os.path.join(d, "expected.csv")
+    save_csv_pyarrow(data_dict={k: list(v) for k, v in data.items()}, path=expected, toString=True)
+    for bounds in ([0, 1000], [0, 3, 500, 501, 1000], list(range(0, 1001, 97)) + [1000]):
+        path = os.path.join(d, "stream.csv")
+        snapshot = {k: list(v) for k, v in data.items()}
+        with StreamingTableWriter(path, fmt="csv", toString=True) as writer:
+            for chunk in _chunks(data, bounds):
+                writer.write(chunk)
+        assert writer.n_rows == 1000
+        assert data == snapshot      # 입력은 바꾸지 않는다
+        assert filecmp.cmp(path, expected, shallow=False), bounds
+
+
+def test_writer_ipc():
+    data = _columns(300)
+    path = os.path.join(tmpdir(), "stream.arrow")
+    with StreamingTableWriter(path, fmt="ipc", toString=True) as writer:
+        for chunk in _chunks(data, [0, 10, 150, 300]):
+            writer.write(chunk)
+    table = pa.ipc.open_file(path).read_all()
+    assert table.num_rows == 300
+    assert table.schema.field("coverage_mm39").type == pa.int64()
+    assert table.schema.field("Gquad").type == pa.bool_()
+    assert table.column("wobble_mm39").to_pylist() == [str(x) for x in data["wobble_mm39"]]
+    assert table.column("coverage_mm39").to_pylist() == data["coverage_mm39"]
+    try:
+        StreamingTableWriter(path, fmt="json")
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("fmt='json'")
+
+
+def test_stream_matches_process_main():
+    expected_dir = tmpdir()
+    aso = ASOdesign(transid="NR_000003", tile_length=17, **design_kwargs())
+    aso.process_main(max_workers=1, wobble=2, to_df=False, gapmer_filtered=True, to_csv=True, output_path=expected_dir)
+    for max_workers, chunk_size in ((1, 333), (2, 700), (1, 20000)):
+        out = tmpdir()
+        paths = aso.process_main(max_workers=max_workers, wobble=2, gapmer_filtered=True, output_path=out,
+                                 stream=True, stream_chunk_size=chunk_size)
+        assert set(paths) == {"default", "gapmer"}
+        for path in paths.values():
+            expected = os.path.join(expected_dir, os.path.basename(path))
+            assert filecmp.cmp(path, expected, shallow=False), (max_workers, chunk_size, path)
+
+
+def test_stream_skips_precompute():
+    kwargs = dict(transid="NR_000003", k_min=17, k_max=18, max_workers=2, wobble=2, gapmer_filtered=True,
+                  output_path=None, **design_kwargs())
+    expected_dir = tmpdir()
+    run_ASOdesign(**dict(kwargs, output_path=expected_dir))
+    saved = ASOdesign.maf_table, ASOdesign.cofold_table
+
+    def precompute(*args, **kwargs):
+        raise AssertionError("stream=True precomputed a whole-transcript table")
+
+    try:
+        ASOdesign.maf_table = ASOdesign.cofold_table = precompute
+        for max_workers in (1, 2):
+            out = tmpdir()
+            result = run_ASOdesign(**dict(kwargs, max_workers=max_workers, output_path=out, stream=True,
+                                          stream_chunk_size=700, shared_context=True))
+            assert [r["tile_length"] for r in result] == [17, 18]
+            for r in result:
+                for path in r["result"].values():
+                    expected = os.path.join(expected_dir, os.path.basename(path))
+                    assert filecmp.cmp(path, expected, shallow=False), (max_workers, path)
+    finally:
+        ASOdesign.maf_table, ASOdesign.cofold_table = saved
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))
@@ -0,0 +1,68 @@
+"""
+check_wobble_batch (배열 연산) 결과를 타일마다 부르는 check_wobble 과 비교합니다.
+  python script/test_wobble.py   또는   python -m pytest script/test_wobble.py
+"""
+import random
+
+from _fixture import run_tests
+
+from asopipe.utils.align.maf_th import check_wobble, check_wobble_batch, encode_seqs
+
+
+def _pairs(n=20000, seed=4):
+    """대소문자 / N / 갭 / 길이 불일치 / None / 'None' 이 섞인 (ref, query) 쌍."""
+    rng = random.Random(seed)
+
+    def seq(k):
+        return ''.join(rng.choice('ACGTacgtN-') if rng.random() < .1 else rng.choice('ACGT') for _ in range(k))
+
+    R, Q = [], []
+    for _ in range(n):
+        k = rng.choice([17, 18, 20])
+        r = seq(k)
+        q = list(r)
+        for _ in range(rng.randint(0, 4)):
+            q[rng.randrange(k)] = rng.choice('ACGTacgt-')
+        q = ''.join(q)
+        if rng.random() < .05:
+            q = q + '--'
+        if rng.random() < .05:
+            q = q[:-1]
+        if rng.random() < .02:
+            r = None
+        if rng.random() < .02:
+            r, q = 'None', 'None'
+        R.append(r)
+        Q.append(q)
+    return R, Q
+
+
+def test_wobble_batch_matches_check_wobble():
+    R, Q = _pairs()
+    r_arr, r_valid = encode_seqs(R)
+    q_arr, q_valid = encode_seqs(Q)
+    for anti_strand in '-+':
+        for wob in (0, 1, 2, 3):
+            expected = [check_wobble(r=r, q=q, wob=wob, anti_strand=anti_strand) for r, q in zip(R, Q)]
+            got = check_wobble_batch(r_arr, q_arr, anti_strand=anti_strand, wob=wob, valid=r_valid & q_valid)
+            bad = [i for i in range(len(R)) if expected[i] != got[i]]
+            assert not bad, (anti_strand, wob, R[bad[0]], Q[bad[0]], expected[bad[0]], got[bad[0]])
+            assert any(e is not False for e in expected) and any(e is False for e in expected)
+
+
+def test_wobble_batch_widths():
+    # ref / query 배열 폭이 달라도 (짧은 쪽은 0 패딩) 같은 결과
+    R, Q = ["ACGTACGTACGTACGTA", "ACGTACGTACGTACGTA"], ["ACGTACGTACGTACGTG--", "ACGTACGTACGTACGTA"]
+    r_arr, _ = encode_seqs(R)
+    q_arr, _ = encode_seqs(Q)
+    assert check_wobble_batch(r_arr, q_arr, wob=2) == [check_wobble(r, q, wob=2) for r, q in zip(R, Q)]
+
+
+def test_wobble_batch_empty():
+    r_arr, valid = encode_seqs([])
+    assert r_arr.shape[0] == 0 and valid.shape == (0,)
+    assert check_wobble_batch(r_arr, r_arr, valid=valid) == []
+
+
+if __name__ == "__main__":
+    run_tests(dict(globals()))